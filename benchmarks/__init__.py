@@ -0,0 +1,15 @@
+"""Benchmarks del pipeline de descarga y conversión, contra un servidor HTTP local.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks [--rapido] [--solo descargas,fragmentos,conversion,indice,arranque]
+                         [--velocidad 8M] [--latencia 0.05]
+                         [--salida resultados.json] [--comparar anterior.json]
+
+Los medios se generan en una carpeta temporal (bytes al azar, o audio real con ffmpeg) y
+se sirven por HTTP con velocidad y latencia por conexión configurables, así que no se toca
+la red. Sin ffmpeg en el PATH solo corren los escenarios de índice y arranque.
+El arranque incluye abrir xd.py y leer el "Ventana lista en N ms" de su log, si hay tkinter
+y pantalla (en Linux, DISPLAY).
+Los resultados se escriben en JSON para comparar una ejecución con otra.
+"""
@@ -0,0 +1,136 @@
+import os
+import sys
+import json
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+
+from convertidor.rendimiento import parsear_tamano
+
+from . import escenarios
+from .servidor import ServidorMedios
+
+ESCENARIOS = ("descargas", "fragmentos", "conversion", "indice", "arranque")
+# Los que pasan por Descargador o convierten necesitan ffmpeg en el PATH
+NECESITAN_FFMPEG = ("descargas", "fragmentos", "conversion")
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Mide el pipeline de descarga y conversión contra un servidor local.")
+    parser.add_argument("--solo", default=",".join(ESCENARIOS),
+                        help=f"escenarios separados por coma ({', '.join(ESCENARIOS)})")
+    parser.add_argument("--rapido", action="store_true", help="menos archivos y más chicos, para probar la suite")
+    parser.add_argument("--velocidad", default="8M",
+                        help="bytes por segundo por conexión del servidor local (vacío = sin límite)")
+    parser.add_argument("--latencia", type=float, default=0.05, help="segundos de espera por pedido HTTP")
+    parser.add_argument("--salida", "-o", default=None, help="archivo JSON de resultados (por defecto, a stdout)")
+    parser.add_argument("--comparar", "-c", metavar="ANTERIOR", default=None,
+                        help="JSON de una ejecución anterior para mostrar la diferencia")
+    return parser
+
+
+def commit_actual():
+    try:
+        resultado = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=escenarios.RAIZ,
+                                   capture_output=True, text=True)
+        return resultado.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def correr(elegidos, args, base):
+    ffmpeg = shutil.which("ffmpeg")
+    medios = os.path.join(base, "medios")
+    os.makedirs(medios)
+    resultados, omitidos = [], []
+    with ServidorMedios(medios, velocidad=parsear_tamano(args.velocidad), latencia=args.latencia) as servidor:
+        for nombre in elegidos:
+            if nombre in NECESITAN_FFMPEG and not ffmpeg:
+                logging.warning(f"Se omite {nombre}: ffmpeg no está en el PATH")
+                omitidos.append(nombre)
+                continue
+            logging.warning(f"Corriendo {nombre}...")
+            if nombre == "descargas":
+                resultados += escenarios.descargas(base, medios, servidor, cantidad=4 if args.rapido else 16,
+                                                   tamano=(1 if args.rapido else 4) * 1024 ** 2)
+            elif nombre == "fragmentos":
+                resultados += escenarios.fragmentos(base, medios, servidor, ffmpeg, duracion=20 if args.rapido else 120,
+                                                    tamano=(4 if args.rapido else 32) * 1024 ** 2)
+            elif nombre == "conversion":
+                resultados += escenarios.conversion(base, medios, ffmpeg, duracion=10 if args.rapido else 60)
+            elif nombre == "indice":
+                resultados += escenarios.indice(base, (1000, 10000) if args.rapido else (1000, 10000, 100000))
+            elif nombre == "arranque":
+                resultados += escenarios.arranque(base, 3 if args.rapido else 10)
+    return resultados, omitidos
+
+
+def comparar(resultados, archivo_anterior):
+    """Imprime cada resultado junto al de la ejecución anterior con los mismos parámetros"""
+    with open(archivo_anterior, "r", encoding="utf-8") as f:
+        anteriores = json.load(f)["resultados"]
+
+    def clave(r):
+        return json.dumps({k: v for k, v in r.items() if k not in ("segundos", "mb_por_segundo", "minimo", "maximo",
+                                                                   "completados", "fallidos", "proceso")}, sort_keys=True)
+
+    por_clave = {clave(r): r for r in anteriores}
+    for r in resultados:
+        anterior = por_clave.get(clave(r))
+        parametros = ", ".join(f"{k}={v}" for k, v in r.items() if k not in ("escenario", "segundos"))
+        if anterior:
+            cambio = (r["segundos"] - anterior["segundos"]) / anterior["segundos"] * 100 if anterior["segundos"] else 0
+            print(f"{r['escenario']:32} {anterior['segundos']:9.3f} s -> {r['segundos']:9.3f} s  {cambio:+7.1f}%  "
+                  f"({parametros})", file=sys.stderr)
+        else:
+            print(f"{r['escenario']:32} {'':>9}   -> {r['segundos']:9.3f} s  (nuevo; {parametros})", file=sys.stderr)
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    elegidos = [e.strip() for e in args.solo.split(",") if e.strip()]
+    desconocidos = [e for e in elegidos if e not in ESCENARIOS]
+    if desconocidos:
+        print(f"Escenarios desconocidos: {', '.join(desconocidos)}", file=sys.stderr)
+        return 2
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    directorio_original = os.getcwd()
+    base = tempfile.mkdtemp(prefix="benchmarks_")
+    try:
+        # Descargador usa config.json, índice y caché relativos al directorio actual: que sean de la prueba
+        os.chdir(base)
+        resultados, omitidos = correr(elegidos, args, base)
+    finally:
+        os.chdir(directorio_original)
+        shutil.rmtree(base, ignore_errors=True)
+
+    informe = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit_actual(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "rapido": args.rapido,
+        "servidor": {"velocidad": args.velocidad, "latencia": args.latencia},
+        "omitidos": omitidos,
+        "resultados": resultados,
+    }
+    texto = json.dumps(informe, indent=4, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+    if args.comparar:
+        comparar(resultados, args.comparar)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+"""Escenarios de benchmark: cada uno retorna una lista de resultados (diccionarios serializables)."""
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import logging
+import threading
+import statistics
+import subprocess
+import importlib.util
+from datetime import datetime
+
+from convertidor.config import cargar_config
+from convertidor.cola import ColaDescargas, ESTADO_COMPLETADO, ESTADO_FALLIDO
+from convertidor.biblioteca import ArchivoDescargado, ColeccionArchivos, IndiceArchivos
+from convertidor.transcodificacion import EtapaTranscodificacion, convertir_a_mp3, procesar_mp3, POSPROCESO_POR_DEFECTO
+
+from .servidor import generar_descargas, generar_audios, generar_hls
+
+logger = logging.getLogger(__name__)
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def resultado(escenario, segundos, **datos):
+    logger.info(f"{escenario} {datos}: {segundos:.3f} s")
+    return {"escenario": escenario, "segundos": round(segundos, 4), **datos}
+
+
+def _config(carpeta, concurrencia, rendimiento=None):
+    """Configuración de la app con la carpeta de salida y los ajustes del escenario"""
+    config = cargar_config()
+    config.update({
+        "carpeta_descargas": carpeta,
+        "max_concurrent_downloads": concurrencia,
+        "download_archive": "",
+        "metadata_cache_ttl": 0,  # que ningún escenario aproveche los metadatos de otro
+        "ancho_banda": {},
+        "rendimiento": dict({"perfil": "equilibrado", "external_downloader": None}, **(rendimiento or {})),
+    })
+    return config
+
+
+def _lote(base, nombre, urls, formato, concurrencia, rendimiento=None):
+    """Corre un lote completo por Descargador + ColaDescargas y retorna (segundos, completados, fallidos)"""
+    from convertidor.descarga import Descargador
+
+    carpeta = os.path.join(base, "salida", nombre)
+    os.makedirs(carpeta)
+    descargador = Descargador(_config(carpeta, concurrencia, rendimiento))
+    descargador.iniciar()
+    descargador.gestor_ffmpeg.ruta()  # preparar ffmpeg no es parte de lo que se mide
+    cola = ColaDescargas(descargador.descargar, concurrencia)
+    cola.iniciar()
+    inicio = time.perf_counter()
+    for url in urls:
+        cola.agregar(url, formato)
+    cola.esperar()
+    return time.perf_counter() - inicio, cola.contar(ESTADO_COMPLETADO), cola.contar(ESTADO_FALLIDO)
+
+
+def descargas(base, medios, servidor, concurrencias=(1, 4, 16), cantidad=16, tamano=4 * 1024 ** 2):
+    """Lote de descargas de extremo a extremo con distintos workers simultáneos"""
+    nombres = generar_descargas(medios, cantidad, tamano)
+    urls = [servidor.url(nombre) for nombre in nombres]
+    resultados = []
+    for concurrencia in concurrencias:
+        segundos, completados, fallidos = _lote(base, f"descargas_{concurrencia}", urls, "mp4", concurrencia)
+        resultados.append(resultado("descargas", segundos, concurrencia=concurrencia, trabajos=cantidad,
+                                    bytes=cantidad * tamano, completados=completados, fallidos=fallidos,
+                                    mb_por_segundo=round(cantidad * tamano / 1024 ** 2 / segundos, 2)))
+    return resultados
+
+
+def fragmentos(base, medios, servidor, ffmpeg, duracion=120, tamano=32 * 1024 ** 2):
+    """Fragmentos HLS en paralelo y tamaño de bloque HTTP en un archivo grande"""
+    resultados = []
+    lista_hls = generar_hls(medios, ffmpeg, duracion) if ffmpeg else None
+    if lista_hls:
+        for fragmentos_simultaneos in (1, 4, 8):
+            segundos, completados, fallidos = _lote(
+                base, f"hls_{fragmentos_simultaneos}", [servidor.url(lista_hls)], "mp4", 1,
+                {"concurrent_fragment_downloads": fragmentos_simultaneos})
+            resultados.append(resultado("fragmentos_hls", segundos, concurrent_fragment_downloads=fragmentos_simultaneos,
+                                        completados=completados, fallidos=fallidos))
+    else:
+        logger.warning("Sin ffmpeg que genere HLS: se omiten los fragmentos en paralelo")
+
+    os.makedirs(os.path.join(medios, "grande"), exist_ok=True)
+    nombre = generar_descargas(os.path.join(medios, "grande"), 1, tamano)[0]
+    for bloque in (None, "1M", "10M"):
+        segundos, completados, fallidos = _lote(
+            base, f"bloque_{bloque or 'sin'}", [servidor.url(f"grande/{nombre}")], "mp4", 1,
+            {"http_chunk_size": bloque})
+        resultados.append(resultado("http_chunk_size", segundos, http_chunk_size=bloque, bytes=tamano,
+                                    completados=completados, fallidos=fallidos))
+    return resultados
+
+
+def conversion(base, medios, ffmpeg, cantidad=None, duracion=60):
+    """Etapa de conversión a mp3 con uno y con todos los núcleos, y con todo el posproceso activado"""
+    cantidad = cantidad or 2 * (os.cpu_count() or 2)
+    fuentes = generar_audios(medios, ffmpeg, cantidad, duracion) if ffmpeg else []
+    if not fuentes:
+        logger.warning("Sin audios de prueba: se omite la conversión")
+        return []
+    posproceso = dict(POSPROCESO_POR_DEFECTO, recortar_silencio=True, normalizar=True, etiquetas=True)
+    info = {"title": "Prueba", "uploader": "benchmarks", "upload_date": "20240101"}
+    casos = [(hilos, None) for hilos in sorted({1, os.cpu_count() or 2})] + [(os.cpu_count() or 2, posproceso)]
+    resultados = []
+    for hilos, ajustes in casos:
+        nombre_caso = "conversion_mp3_posproceso" if ajustes else "conversion_mp3"
+        carpeta = os.path.join(base, "salida", f"{nombre_caso}_{hilos}")
+        os.makedirs(carpeta)
+        origenes = []
+        for nombre in fuentes:
+            origen = os.path.join(carpeta, nombre)
+            shutil.copyfile(os.path.join(medios, nombre), origen)  # convertir_a_mp3 borra el original
+            origenes.append(origen)
+        etapa = EtapaTranscodificacion(hilos)
+        inicio = time.perf_counter()
+        if ajustes:
+            futuros = [etapa.enviar(procesar_mp3, os.path.dirname(ffmpeg), origen,
+                                    os.path.splitext(origen)[0] + ".mp3", ajustes, info) for origen in origenes]
+        else:
+            futuros = [etapa.enviar(convertir_a_mp3, os.path.dirname(ffmpeg), origen,
+                                    os.path.splitext(origen)[0] + ".mp3") for origen in origenes]
+        for futuro in futuros:
+            futuro.result()
+        segundos = time.perf_counter() - inicio
+        resultados.append(resultado(nombre_caso, segundos, conversiones_simultaneas=hilos, archivos=cantidad,
+                                    segundos_de_audio=cantidad * duracion))
+    return resultados
+
+
+def indice(base, cantidades=(1000, 10000, 100000)):
+    """Lo que hace cargar_archivos (índice, colección, filtro y orden) con carpetas de distintos tamaños"""
+    resultados = []
+    for cantidad in cantidades:
+        carpeta = os.path.join(base, "biblioteca", str(cantidad))
+        os.makedirs(carpeta)
+        for i in range(cantidad):
+            open(os.path.join(carpeta, f"Tema {i:06d}.{'mp3' if i % 3 else 'mp4'}"), "wb").close()
+        indice_archivos = IndiceArchivos(os.path.join(base, f"indice_{cantidad}.db"))
+
+        inicio = time.perf_counter()
+        indice_archivos.sincronizar(carpeta)
+        resultados.append(resultado("indice_sincronizar_inicial", time.perf_counter() - inicio, archivos=cantidad))
+
+        inicio = time.perf_counter()
+        indice_archivos.sincronizar(carpeta)
+        resultados.append(resultado("indice_sincronizar_sin_cambios", time.perf_counter() - inicio, archivos=cantidad))
+
+        inicio = time.perf_counter()
+        filas = indice_archivos.listar(carpeta)
+        coleccion = ColeccionArchivos()
+        coleccion.reemplazar(ArchivoDescargado(nombre, formato, carpeta, datetime.fromtimestamp(ctime), tamano, ctime)
+                             for nombre, formato, ctime, tamano in filas)
+        resultados.append(resultado("biblioteca_cargar", time.perf_counter() - inicio, archivos=cantidad))
+
+        inicio = time.perf_counter()
+        for texto in ("t", "te", "tem", "tema 00", "tema 001"):
+            coleccion.filtrar(texto)
+        coleccion.filtrar("")
+        resultados.append(resultado("biblioteca_filtrar", time.perf_counter() - inicio, archivos=cantidad))
+
+        inicio = time.perf_counter()
+        for orden in ("nombre", "tamano", "formato", "fecha"):
+            coleccion.ordenar(orden)
+        resultados.append(resultado("biblioteca_ordenar", time.perf_counter() - inicio, archivos=cantidad))
+    return resultados
+
+
+# Lo que anota xd.registrar_arranque cuando la ventana quedó dibujada
+_LINEA_VENTANA = re.compile(r"Ventana lista en (\d+) ms|La ventana tardó (\d+) ms")
+ESPERA_VENTANA = 60  # segundos máximos para que aparezca la ventana
+
+
+def _hay_pantalla():
+    if importlib.util.find_spec("tkinter") is None:
+        return False
+    if sys.platform.startswith("linux"):
+        return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+    return True
+
+
+def _abrir_ventana(carpeta, entorno):
+    """Lanza xd.py y retorna (ms según su log, segundos desde el lanzamiento), o None si no apareció"""
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen([sys.executable, os.path.join(RAIZ, "xd.py")], cwd=carpeta, env=entorno,
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                               encoding="utf-8", errors="replace")
+    medicion = []
+
+    def leer():
+        for linea in proceso.stdout:
+            coincidencia = _LINEA_VENTANA.search(linea)
+            if coincidencia:
+                medicion.append((int(coincidencia.group(1) or coincidencia.group(2)),
+                                 time.perf_counter() - inicio))
+                return
+
+    lector = threading.Thread(target=leer, daemon=True)
+    lector.start()
+    lector.join(ESPERA_VENTANA)
+    proceso.kill()
+    proceso.wait()
+    return medicion[0] if medicion else None
+
+
+def arranque(base, repeticiones=5):
+    """Tiempo hasta poder usar la app: la ventana de xd.py, importar la descarga y la línea de comandos"""
+    entorno = dict(os.environ, PYTHONPATH=RAIZ + os.pathsep + os.environ.get("PYTHONPATH", ""),
+                   PYTHONIOENCODING="utf-8")
+    comandos = {
+        "importar_descarga": [sys.executable, "-c", "import convertidor.descarga"],
+        "cli_ayuda": [sys.executable, "-m", "convertidor", "get", "--help"],
+    }
+    resultados = []
+    for nombre, comando in comandos.items():
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            subprocess.run(comando, env=entorno, capture_output=True, check=True)
+            tiempos.append(time.perf_counter() - inicio)
+        resultados.append(resultado(f"arranque_{nombre}", statistics.median(tiempos), repeticiones=repeticiones,
+                                    minimo=round(min(tiempos), 4), maximo=round(max(tiempos), 4)))
+
+    if not _hay_pantalla():
+        logger.warning("Sin tkinter o sin pantalla: se omite el arranque de la ventana")
+        return resultados
+    # La ventana corre en su propia carpeta: config.json, índice y cola son los de la prueba,
+    # y la carpeta de descargas está vacía para no medir el escaneo de la biblioteca del usuario
+    carpeta = os.path.join(base, "ventana")
+    descargas = os.path.join(carpeta, "descargas")
+    os.makedirs(descargas, exist_ok=True)
+    with open(os.path.join(carpeta, "config.json"), "w", encoding="utf-8") as f:
+        json.dump({"carpeta_descargas": descargas}, f, indent=4)
+    mediciones = [medicion for medicion in (_abrir_ventana(carpeta, entorno) for _ in range(repeticiones))
+                  if medicion]
+    if not mediciones:
+        logger.warning("xd.py no anotó \"Ventana lista\": se omite el arranque de la ventana")
+        return resultados
+    # segundos = lo que mide la app desde su primera línea; proceso = desde lanzar el intérprete
+    milisegundos = [ms for ms, _ in mediciones]
+    resultados.append(resultado("arranque_ventana", statistics.median(milisegundos) / 1000,
+                                repeticiones=repeticiones, minimo=round(min(milisegundos) / 1000, 4),
+                                maximo=round(max(milisegundos) / 1000, 4),
+                                proceso=round(statistics.median(s for _, s in mediciones), 4)))
+    return resultados
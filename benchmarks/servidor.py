@@ -0,0 +1,152 @@
+"""Servidor HTTP local que hace de YouTube: sirve medios con Range, velocidad limitada y latencia."""
+import os
+import time
+import shutil
+import logging
+import threading
+import subprocess
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+logger = logging.getLogger(__name__)
+
+TIPOS_MEDIOS = {
+    ".webm": "audio/webm",
+    ".m4a": "audio/mp4",
+    ".mp4": "video/mp4",
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".ts": "video/mp2t",
+}
+BLOQUE = 64 * 1024
+
+
+class ManejadorMedios(SimpleHTTPRequestHandler):
+    """Sirve archivos de una carpeta respetando Range, a `velocidad` bytes/s y con `latencia` por pedido"""
+
+    velocidad = None
+    latencia = 0.0
+    extensions_map = dict(SimpleHTTPRequestHandler.extensions_map, **TIPOS_MEDIOS)
+
+    def log_message(self, formato, *args):
+        logger.debug(formato % args)
+
+    def send_head(self):
+        ruta = self.translate_path(self.path)
+        if not os.path.isfile(ruta):
+            self.send_error(404)
+            return None
+        tamano = os.path.getsize(ruta)
+        inicio, fin = 0, tamano - 1
+        rango = self.headers.get("Range")
+        if rango and rango.startswith("bytes="):
+            desde, _, hasta = rango[len("bytes="):].split(",")[0].partition("-")
+            inicio = int(desde) if desde else max(0, tamano - int(hasta))
+            fin = min(int(hasta), tamano - 1) if desde and hasta else fin
+            if inicio >= tamano:
+                self.send_error(416)
+                return None
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {inicio}-{fin}/{tamano}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", self.guess_type(ruta))
+        self.send_header("Content-Length", str(fin - inicio + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        archivo = open(ruta, "rb")
+        archivo.seek(inicio)
+        self._restante = fin - inicio + 1
+        return archivo
+
+    def do_GET(self):
+        if self.latencia:
+            time.sleep(self.latencia)
+        archivo = self.send_head()
+        if archivo:
+            try:
+                self._enviar(archivo)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # el cliente cortó (por ejemplo, después de leer solo un rango)
+            finally:
+                archivo.close()
+
+    def _enviar(self, archivo):
+        inicio = time.monotonic()
+        enviados = 0
+        while self._restante > 0:
+            datos = archivo.read(min(BLOQUE, self._restante))
+            if not datos:
+                break
+            self.wfile.write(datos)
+            enviados += len(datos)
+            self._restante -= len(datos)
+            if self.velocidad:
+                # Dormir lo necesario para que esta conexión no pase de la velocidad pedida
+                adelanto = enviados / self.velocidad - (time.monotonic() - inicio)
+                if adelanto > 0:
+                    time.sleep(adelanto)
+
+
+class ServidorMedios:
+    """ThreadingHTTPServer en 127.0.0.1 (puerto libre) sirviendo una carpeta; usar con `with`"""
+
+    def __init__(self, carpeta, velocidad=None, latencia=0.0):
+        manejador = type("Manejador", (ManejadorMedios,), {"velocidad": velocidad, "latencia": latencia})
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), partial(manejador, directory=carpeta))
+        self._servidor.daemon_threads = True
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, name="servidor-medios", daemon=True)
+
+    def url(self, nombre):
+        host, puerto = self._servidor.server_address
+        return f"http://{host}:{puerto}/{nombre}"
+
+    def __enter__(self):
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *_):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+
+def _ffmpeg(ffmpeg, *argumentos):
+    resultado = subprocess.run([ffmpeg, "-y", "-loglevel", "error", *argumentos], capture_output=True, text=True)
+    return resultado.returncode == 0
+
+
+def generar_descargas(carpeta, cantidad, tamano):
+    """Archivos .mp4 de bytes al azar: yt-dlp los baja como enlaces directos sin procesarlos"""
+    nombres = []
+    datos = os.urandom(tamano)
+    for i in range(cantidad):
+        nombre = f"video_{i:03d}.mp4"
+        with open(os.path.join(carpeta, nombre), "wb") as f:
+            f.write(datos)
+        nombres.append(nombre)
+    return nombres
+
+
+def generar_audios(carpeta, ffmpeg, cantidad, duracion):
+    """Audios opus reales (un tono) para medir la conversión; [] si ffmpeg no puede generarlos"""
+    nombres = []
+    for i in range(cantidad):
+        nombre = f"audio_{i:03d}.webm"
+        if not _ffmpeg(ffmpeg, "-f", "lavfi", "-i", f"sine=frequency={220 + i * 20}:duration={duracion:g}",
+                       "-ac", "2", "-c:a", "libopus", "-b:a", "128k", os.path.join(carpeta, nombre)):
+            logger.warning("ffmpeg no pudo generar audio de prueba (¿sin lavfi o libopus?)")
+            return []
+        nombres.append(nombre)
+    return nombres
+
+
+def generar_hls(carpeta, ffmpeg, duracion, segundos_segmento=2):
+    """Lista HLS con segmentos .ts (audio aac) para medir la descarga por fragmentos; None si falla"""
+    subcarpeta = os.path.join(carpeta, "hls")
+    os.makedirs(subcarpeta, exist_ok=True)
+    if not _ffmpeg(ffmpeg, "-f", "lavfi", "-i", f"sine=duration={duracion:g}", "-c:a", "aac",
+                   "-b:a", "256k", "-f", "hls", "-hls_time", str(segundos_segmento), "-hls_playlist_type", "vod",
+                   os.path.join(subcarpeta, "audio.m3u8")):
+        logger.warning("ffmpeg no pudo generar la lista HLS de prueba")
+        shutil.rmtree(subcarpeta, ignore_errors=True)
+        return None
+    return "hls/audio.m3u8"
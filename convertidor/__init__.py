@@ -0,0 +1,5 @@
+"""Convertidor YouTube: cola de descargas, índice de archivos y ffmpeg, sin interfaz gráfica.
+
+La ventana de Tk vive en xd.py y la línea de comandos en convertidor.cli
+(``python -m convertidor get URL...``). Nada de este paquete importa tkinter.
+"""
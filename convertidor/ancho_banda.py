@@ -0,0 +1,187 @@
+"""Reparto del ancho de banda entre todas las descargas.
+
+Se configura en la sección "ancho_banda" de config.json:
+
+    "ancho_banda": {
+        "limite_total": "8M",
+        "limites_host": {"youtube.com": 2},
+        "horarios": [
+            {"desde": "09:00", "hasta": "18:00", "limite_total": "2M", "limites_host": {"youtube.com": 1}}
+        ]
+    }
+
+limite_total son bytes por segundo para todas las descargas juntas (vacío = sin límite) y
+limites_host la cantidad de descargas simultáneas por sitio. Durante un horario, sus claves
+pisan a las generales; un horario puede cruzar la medianoche ("22:00" a "06:00").
+"""
+import time
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from urllib.parse import urlparse
+
+from .rendimiento import parsear_tamano
+
+logger = logging.getLogger(__name__)
+
+VENTANA_VELOCIDAD = 3.0  # segundos que se promedian para la velocidad total
+
+
+def host_de_url(url):
+    """Sitio de una URL sin "www." ni subdominios móviles (youtu.be cuenta como youtube.com)"""
+    host = (urlparse(url).hostname or "").lower()
+    for prefijo in ("www.", "m.", "music."):
+        if host.startswith(prefijo):
+            host = host[len(prefijo):]
+    return "youtube.com" if host == "youtu.be" else host
+
+
+def _minutos(hora):
+    horas, minutos = str(hora).split(":")
+    return int(horas) * 60 + int(minutos)
+
+
+def _horario_activo(horario, ahora):
+    desde, hasta = _minutos(horario["desde"]), _minutos(horario["hasta"])
+    minuto = ahora.hour * 60 + ahora.minute
+    if desde <= hasta:
+        return desde <= minuto < hasta
+    return minuto >= desde or minuto < hasta  # cruza la medianoche
+
+
+class CuboTokens:
+    """Token bucket: consumir() bloquea lo necesario para no pasar de `tasa` bytes por segundo"""
+
+    def __init__(self, tasa=None):
+        self.tasa = tasa
+        self._tokens = float(tasa or 0)
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def cambiar_tasa(self, tasa):
+        with self._lock:
+            if tasa != self.tasa:
+                self.tasa = tasa
+                self._tokens = min(self._tokens, float(tasa or 0))
+
+    def consumir(self, cantidad):
+        with self._lock:
+            if not self.tasa:
+                return
+            ahora = time.monotonic()
+            # Se acumula como mucho un segundo de tokens: después de una pausa no hay ráfagas enormes
+            self._tokens = min(self.tasa, self._tokens + (ahora - self._ultimo) * self.tasa)
+            self._ultimo = ahora
+            self._tokens -= cantidad
+            # Con tokens negativos se queda debiendo: cada hilo espera lo que falta para saldar la deuda
+            espera = -self._tokens / self.tasa if self._tokens < 0 else 0
+        if espera:
+            time.sleep(espera)
+
+
+class ProgramadorAnchoBanda:
+    """Límite global de bytes por segundo, descargas simultáneas por sitio y velocidad total en vivo"""
+
+    def __init__(self, config):
+        self.config = config
+        self.cubo = CuboTokens()
+        self._activos = {}  # host -> descargas en curso
+        self._condicion = threading.Condition()
+        self._ultimos_bytes = {}  # (id de trabajo, archivo) -> bytes ya contados
+        self._muestras = deque()  # (momento, bytes) de los últimos segundos
+        self._lock_muestras = threading.Lock()
+        self._horario = None
+        self._ultima_revision = 0.0
+        self.aplicar_horario()
+
+    def ajustes(self, ahora=None):
+        """Ajustes vigentes: los generales más los del horario que corresponda a esta hora"""
+        seccion = dict(self.config.get("ancho_banda") or {})
+        horarios = seccion.pop("horarios", None) or []
+        ahora = ahora or datetime.now()
+        for horario in horarios:
+            try:
+                if _horario_activo(horario, ahora):
+                    seccion.update({k: v for k, v in horario.items() if k not in ("desde", "hasta")})
+                    seccion["horario"] = f"{horario['desde']}-{horario['hasta']}"
+                    break
+            except (KeyError, ValueError) as e:
+                logger.warning(f"Se ignora un horario de ancho_banda mal escrito ({horario}): {e}")
+        return seccion
+
+    def aplicar_horario(self):
+        """Actualiza el límite total según la hora (se llama seguido, es barato)"""
+        ajustes = self.ajustes()
+        try:
+            tasa = parsear_tamano(ajustes.get("limite_total"))
+        except ValueError as e:
+            logger.warning(f"Se ignora ancho_banda.limite_total: {e}")
+            tasa = None
+        self.cubo.cambiar_tasa(tasa)
+        if ajustes.get("horario") != self._horario:
+            self._horario = ajustes.get("horario")
+            logger.info(f"Ancho de banda: límite total {ajustes.get('limite_total') or 'ninguno'}"
+                        + (f" (horario {self._horario})" if self._horario else ""))
+            with self._condicion:
+                self._condicion.notify_all()  # pueden haber cambiado los límites por sitio
+        return ajustes
+
+    def limite_host(self, host):
+        limites = self.ajustes().get("limites_host") or {}
+        for sitio, limite in limites.items():
+            if host == sitio or host.endswith("." + sitio):
+                return int(limite)
+        return None
+
+    def entrar(self, url):
+        """Espera un lugar libre para descargar de ese sitio; retorna el host para salir()"""
+        host = host_de_url(url)
+        with self._condicion:
+            while True:
+                limite = self.limite_host(host)
+                if not limite or self._activos.get(host, 0) < limite:
+                    break
+                # Se revisa cada tanto por si cambió el horario
+                self._condicion.wait(timeout=30)
+            self._activos[host] = self._activos.get(host, 0) + 1
+        return host
+
+    def salir(self, host):
+        with self._condicion:
+            self._activos[host] -= 1
+            if not self._activos[host]:
+                del self._activos[host]
+            self._condicion.notify_all()
+
+    def contar_bytes(self, trabajo, d):
+        """Se llama desde el hook de progreso: cuenta los bytes nuevos y frena si se pasa del límite"""
+        clave = (trabajo.id, d.get("filename"))
+        if d.get("status") == "finished":
+            self._ultimos_bytes.pop(clave, None)
+            return
+        descargados = d.get("downloaded_bytes")
+        if descargados is None:
+            return
+        anteriores = self._ultimos_bytes.get(clave)
+        self._ultimos_bytes[clave] = descargados
+        if anteriores is None:
+            return  # primer aviso: si se retoma un .part, lo ya descargado no cuenta
+        nuevos = descargados - anteriores
+        if nuevos <= 0:
+            return
+        ahora = time.monotonic()
+        with self._lock_muestras:
+            self._muestras.append((ahora, nuevos))
+        if ahora - self._ultima_revision >= 1:
+            self._ultima_revision = ahora
+            self.aplicar_horario()
+        self.cubo.consumir(nuevos)
+
+    def velocidad(self):
+        """Bytes por segundo de todas las descargas juntas, promediando los últimos segundos"""
+        limite = time.monotonic() - VENTANA_VELOCIDAD
+        with self._lock_muestras:
+            while self._muestras and self._muestras[0][0] < limite:
+                self._muestras.popleft()
+            return sum(cantidad for _, cantidad in self._muestras) / VENTANA_VELOCIDAD
@@ -0,0 +1,250 @@
+"""API HTTP/JSON para encolar descargas desde otras máquinas, con la misma cola que la ventana.
+
+Se configura en la sección "api" de config.json (o con ``python -m convertidor serve``):
+
+    "api": {"habilitada": true, "host": "0.0.0.0", "puerto": 8765, "token": "secreto"}
+
+host "127.0.0.1" la deja solo para esta máquina; "0.0.0.0" la abre a la red local, y en ese
+caso conviene un token (se manda como "Authorization: Bearer secreto").
+
+    POST /jobs        {"url": "...", "formato": "mp3"} o {"urls": [...]} -> 202 con los trabajos
+    GET  /jobs        todos los trabajos
+    GET  /jobs/{id}   un trabajo
+    GET  /events      eventos "trabajo" (Server-Sent Events) con cada cambio de estado y el progreso
+
+Corre en su propio hilo con un loop de asyncio: un solo proceso atiende a todos los clientes
+y las descargas las hacen los workers de siempre.
+"""
+import hmac
+import json
+import time
+import asyncio
+import logging
+import threading
+from urllib.parse import urlsplit
+
+from .config import FORMATOS, PUERTO_API
+from .urls import extraer_urls
+
+logger = logging.getLogger(__name__)
+
+MAX_CUERPO = 1024 * 1024  # bytes de un POST /jobs
+INTERVALO_PROGRESO = 0.5  # segundos mínimos entre dos eventos de progreso del mismo trabajo
+INTERVALO_LATIDO = 15  # sin eventos, cada cuánto se manda un comentario para mantener viva la conexión
+TIEMPO_LECTURA = 10  # segundos para recibir el pedido completo: un cliente callado no ocupa la conexión
+ESTADOS_HTTP = {200: "OK", 202: "Accepted", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+                405: "Method Not Allowed", 408: "Request Timeout", 413: "Payload Too Large",
+                500: "Internal Server Error"}
+
+
+class ErrorHTTP(Exception):
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+def datos_trabajo(trabajo):
+    """Lo que la API muestra de un trabajo"""
+    return {"id": trabajo.id, "url": trabajo.url, "titulo": trabajo.titulo, "formato": trabajo.formato,
+            "estado": trabajo.estado, "progreso": trabajo.progreso, "detalle": trabajo.detalle,
+            "ruta": trabajo.ruta, "reintentos": trabajo.reintentos}
+
+
+class ServidorAPI:
+    """Servidor HTTP mínimo sobre asyncio que encola en una ColaDescargas existente.
+
+    Quien crea la cola tiene que pasarle los cambios de los trabajos con notificar(trabajo)
+    (desde cualquier hilo) para que lleguen a /events.
+    """
+
+    def __init__(self, descargador, cola, host="127.0.0.1", puerto=PUERTO_API, token=None):
+        self.descargador = descargador
+        self.cola = cola
+        self.host = host
+        self.puerto = int(puerto)
+        self.token = token or None
+        self._loop = None
+        self._suscriptores = set()  # asyncio.Queue de cada cliente de /events
+        self._ultimo_progreso = {}  # id de trabajo -> (estado, momento del último evento)
+        self._listo = threading.Event()
+
+    @classmethod
+    def desde_config(cls, descargador, cola, config):
+        seccion = config.get("api") or {}
+        return cls(descargador, cola, seccion.get("host") or "127.0.0.1", seccion.get("puerto") or PUERTO_API,
+                   seccion.get("token"))
+
+    def iniciar(self):
+        """Atiende en un hilo aparte (para la ventana)"""
+        threading.Thread(target=self.servir, name="api", daemon=True).start()
+        self._listo.wait(5)
+
+    def servir(self):
+        """Atiende hasta que se corte el proceso (para la línea de comandos)"""
+        try:
+            asyncio.run(self._servir())
+        except OSError as e:
+            logger.error(f"No se pudo abrir la API en {self.host}:{self.puerto}: {e}")
+            self._listo.set()
+
+    async def _servir(self):
+        self._loop = asyncio.get_running_loop()
+        servidor = await asyncio.start_server(self._atender, self.host, self.puerto)
+        if not self.token and self.host not in ("127.0.0.1", "localhost", "::1"):
+            logger.warning("La API está abierta a la red sin token: cualquiera puede encolar descargas")
+        logger.info(f"API de descargas en http://{self.host}:{self.puerto}")
+        self._listo.set()
+        async with servidor:
+            await servidor.serve_forever()
+
+    def notificar(self, trabajo):
+        """Se llama desde los workers: manda el trabajo a los clientes de /events"""
+        if self._loop is None or not self._suscriptores:
+            return
+        ahora = time.monotonic()
+        estado, ultimo = self._ultimo_progreso.get(trabajo.id, (None, 0))
+        # Los cambios de estado van siempre; el progreso, como mucho cada INTERVALO_PROGRESO
+        if estado == trabajo.estado and ahora - ultimo < INTERVALO_PROGRESO:
+            return
+        self._ultimo_progreso[trabajo.id] = (trabajo.estado, ahora)
+        datos = datos_trabajo(trabajo)  # foto de este momento: el trabajo sigue cambiando en su hilo
+        try:
+            self._loop.call_soon_threadsafe(self._publicar, datos)
+        except RuntimeError:
+            pass  # el loop ya se cerró
+
+    def _publicar(self, datos):
+        for suscriptor in list(self._suscriptores):
+            suscriptor.put_nowait(datos)
+
+    async def _atender(self, lector, escritor):
+        try:
+            try:
+                metodo, ruta, encabezados, cuerpo = await asyncio.wait_for(self._leer_pedido(lector),
+                                                                           TIEMPO_LECTURA)
+            except asyncio.TimeoutError:
+                raise ErrorHTTP(408, "El pedido no llegó a tiempo")
+            if self.token and not self._token_valido(encabezados.get("authorization") or ""):
+                raise ErrorHTTP(401, "Falta el token o no es válido")
+            if ruta == "/events" and metodo == "GET":
+                await self._eventos(escritor)
+                return
+            estado, respuesta = await self._resolver(metodo, ruta, cuerpo)
+        except ErrorHTTP as e:
+            estado, respuesta = e.estado, {"error": str(e)}
+        except (asyncio.IncompleteReadError, ConnectionError):
+            escritor.close()
+            return
+        except Exception as e:
+            logger.error(f"Error en la API: {e}")
+            estado, respuesta = 500, {"error": str(e)}
+        try:
+            self._responder(escritor, estado, respuesta)
+            await escritor.drain()
+        except ConnectionError:
+            pass
+        finally:
+            escritor.close()
+
+    def _token_valido(self, autorizacion):
+        # Comparación en tiempo constante: no da pistas del token a quien prueba desde la red
+        return hmac.compare_digest(autorizacion.encode("latin-1"), f"Bearer {self.token}".encode("utf-8"))
+
+    async def _leer_pedido(self, lector):
+        linea = (await lector.readline()).decode("latin-1").strip()
+        try:
+            metodo, objetivo, _ = linea.split(" ", 2)
+        except ValueError:
+            raise ErrorHTTP(400, "Pedido HTTP mal formado")
+        encabezados = {}
+        while True:
+            linea = (await lector.readline()).decode("latin-1")
+            if linea in ("\r\n", "\n", ""):
+                break
+            nombre, _, valor = linea.partition(":")
+            encabezados[nombre.strip().lower()] = valor.strip()
+        try:
+            largo = int(encabezados.get("content-length") or 0)
+        except ValueError:
+            raise ErrorHTTP(400, "Content-Length inválido")
+        if largo > MAX_CUERPO:
+            raise ErrorHTTP(413, "El cuerpo del pedido es demasiado grande")
+        cuerpo = await lector.readexactly(largo) if largo else b""
+        return metodo.upper(), urlsplit(objetivo).path.rstrip("/") or "/", encabezados, cuerpo
+
+    async def _resolver(self, metodo, ruta, cuerpo):
+        partes = ruta.strip("/").split("/")
+        if partes[0] != "jobs" or len(partes) > 2:
+            raise ErrorHTTP(404, f"No existe {ruta}")
+        if len(partes) == 2:
+            if metodo != "GET":
+                raise ErrorHTTP(405, "Solo GET")
+            trabajo = self.cola.trabajos.get(partes[1])
+            if trabajo is None:
+                raise ErrorHTTP(404, f"No existe el trabajo {partes[1]}")
+            return 200, datos_trabajo(trabajo)
+        if metodo == "GET":
+            return 200, {"trabajos": [datos_trabajo(t) for t in list(self.cola.trabajos.values())]}
+        if metodo == "POST":
+            urls, formato = self._leer_trabajos(cuerpo)
+            logger.info(f"API: {len(urls)} URLs en formato {formato}")
+            # Expandir playlists y leer metadatos bloquea: se hace fuera del loop
+            trabajos = await asyncio.get_running_loop().run_in_executor(
+                None, self.descargador.importar_urls, urls, formato, self.cola)
+            return 202, {"trabajos": [datos_trabajo(t) for t in trabajos]}
+        raise ErrorHTTP(405, "Solo GET o POST")
+
+    def _leer_trabajos(self, cuerpo):
+        try:
+            datos = json.loads(cuerpo or b"{}")
+        except ValueError:
+            raise ErrorHTTP(400, "El cuerpo no es JSON válido")
+        if not isinstance(datos, dict):
+            raise ErrorHTTP(400, "Se esperaba un objeto JSON")
+        url = datos.get("url") or ""
+        lista = datos.get("urls") or []
+        if not isinstance(url, str):
+            raise ErrorHTTP(400, '"url" tiene que ser un texto')
+        if not isinstance(lista, list) or not all(isinstance(elemento, str) for elemento in lista):
+            raise ErrorHTTP(400, '"urls" tiene que ser una lista de textos')
+        urls = extraer_urls(" ".join([url] + lista))
+        if not urls:
+            raise ErrorHTTP(400, "No se indicó ninguna URL válida (http:// o https://)")
+        formato = datos.get("formato") or "mp3"
+        if formato not in FORMATOS:
+            raise ErrorHTTP(400, f"Formato desconocido: {formato} (se acepta {', '.join(FORMATOS)})")
+        return urls, formato
+
+    def _responder(self, escritor, estado, datos):
+        cuerpo = json.dumps(datos, ensure_ascii=False).encode("utf-8")
+        escritor.write((f"HTTP/1.1 {estado} {ESTADOS_HTTP.get(estado, '')}\r\n"
+                        "Content-Type: application/json; charset=utf-8\r\n"
+                        f"Content-Length: {len(cuerpo)}\r\n"
+                        "Connection: close\r\n\r\n").encode("latin-1") + cuerpo)
+
+    async def _eventos(self, escritor):
+        """Server-Sent Events: primero el estado de todos los trabajos y después cada cambio"""
+        suscriptor = asyncio.Queue()
+        self._suscriptores.add(suscriptor)
+        try:
+            escritor.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                           b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n")
+            for trabajo in list(self.cola.trabajos.values()):
+                escritor.write(self._evento(datos_trabajo(trabajo)))
+            await escritor.drain()
+            while True:
+                try:
+                    datos = await asyncio.wait_for(suscriptor.get(), INTERVALO_LATIDO)
+                    escritor.write(self._evento(datos))
+                except asyncio.TimeoutError:
+                    escritor.write(b": latido\n\n")
+                await escritor.drain()
+        except ConnectionError:
+            pass  # el cliente se fue
+        finally:
+            self._suscriptores.discard(suscriptor)
+            escritor.close()
+
+    @staticmethod
+    def _evento(datos):
+        return f"event: trabajo\nid: {datos['id']}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n".encode("utf-8")
@@ -0,0 +1,393 @@
+import os
+import re
+import bisect
+import sqlite3
+import threading
+import logging
+from datetime import datetime
+
+from .config import EXTENSIONES_ARCHIVOS, FORMATO_POR_EXTENSION
+
+logger = logging.getLogger(__name__)
+
+# Intermedios de yt-dlp y de ffmpeg con extensión de biblioteca: formatos sueltos antes de unirlos
+# (título.f137.mp4, título.f251-drc.webm), la salida temporal de una unión (título.temp.mp4)
+# y la de una conversión (título.mp3.convirtiendo.mp3)
+_INTERMEDIO = re.compile(r"\.(f\d[\w-]*|temp|convirtiendo)\.\w+$", re.IGNORECASE)
+
+
+def es_archivo_biblioteca(nombre):
+    """True para los archivos que muestra la biblioteca (no los temporales de yt-dlp o ffmpeg)"""
+    return nombre.lower().endswith(EXTENSIONES_ARCHIVOS) and not _INTERMEDIO.search(nombre)
+
+
+class ArchivoDescargado:
+    """Clase para almacenar información de archivos descargados.
+
+    Tamaño y fechas se guardan la primera vez que se leen (o vienen del índice o de un stat ya hecho)
+    y no se vuelven a pedir al disco: si el archivo cambia, el vigilante arma uno nuevo.
+    """
+
+    __slots__ = ("nombre", "formato", "ubicacion", "fecha_descarga", "tamano", "ctime", "mtime", "_ruta")
+
+    def __init__(self, nombre, formato, ubicacion, fecha_descarga=None, tamano=None, ctime=None, mtime=None):
+        self.nombre = nombre
+        self.formato = formato
+        self.ubicacion = ubicacion
+        self.fecha_descarga = fecha_descarga or datetime.now()
+        self.tamano = tamano  # bytes, si ya se conocen (por ejemplo, desde el índice)
+        self.ctime = ctime
+        self.mtime = mtime
+        self._ruta = None
+
+    @classmethod
+    def desde_stat(cls, ruta, datos):
+        """Crea el archivo con los datos de un stat ya hecho"""
+        nombre, extension = os.path.splitext(os.path.basename(ruta))
+        archivo = cls(nombre, extension[1:].lower(), os.path.dirname(ruta),
+                      fecha_descarga=datetime.fromtimestamp(datos.st_ctime),
+                      tamano=datos.st_size, ctime=datos.st_ctime, mtime=datos.st_mtime)
+        archivo._ruta = ruta
+        return archivo
+
+    @classmethod
+    def desde_ruta(cls, ruta):
+        return cls.desde_stat(ruta, os.stat(ruta))
+
+    def __str__(self):
+        return f"{self.nombre} ({self.formato})"
+    
+    def ruta_completa(self):
+        """Retorna la ruta completa del archivo"""
+        if self._ruta is None:
+            self._ruta = os.path.join(self.ubicacion, f"{self.nombre}.{self.formato}")
+        return self._ruta
+    
+    def existe_archivo(self):
+        """Verifica si el archivo existe en el sistema"""
+        return os.path.exists(self.ruta_completa())
+
+    def _leer_stat(self):
+        """Completa tamaño y fechas con un solo stat; False si el archivo no existe"""
+        try:
+            datos = os.stat(self.ruta_completa())
+        except OSError:
+            return False
+        self.tamano, self.ctime, self.mtime = datos.st_size, datos.st_ctime, datos.st_mtime
+        return True
+    
+    def obtener_tamaño(self):
+        """Retorna el tamaño del archivo en bytes"""
+        if self.tamano is None and not self._leer_stat():
+            return 0
+        return self.tamano
+    
+    def obtener_fecha_creacion(self):
+        """Retorna la fecha de creación del archivo"""
+        if self.ctime is None and not self._leer_stat():
+            return None
+        return datetime.fromtimestamp(self.ctime)
+
+
+class ColeccionArchivos:
+    """Archivos de la biblioteca en memoria, sin repetidos, con filtro por texto y orden.
+
+    Se comporta como una secuencia de los archivos visibles (len e índice) en el orden
+    pedido, así la lista de la ventana solo lee las filas que muestra.
+    """
+
+    CLAVES_ORDEN = {
+        "fecha": lambda archivo: archivo.fecha_descarga.timestamp(),
+        "tamano": lambda archivo: archivo.tamano or 0,
+        "nombre": lambda archivo: archivo.nombre.lower(),
+        "formato": lambda archivo: archivo.formato,
+    }
+
+    def __init__(self, orden="fecha", descendente=True):
+        self.orden = orden
+        self.descendente = descendente
+        self.texto = ""
+        self._claves = {}  # (nombre, formato) -> entrada, de todos los archivos
+        self._por_formato = {}  # formato -> [cantidad, bytes], al día con cada alta y baja
+        # Todos los archivos en orden ascendente: (clave de orden, texto de búsqueda, nombre, formato, archivo)
+        self._entradas = []
+        self._visibles = self._entradas  # los que pasan el filtro (la misma lista si no hay filtro)
+
+    def __len__(self):
+        return len(self._visibles)
+
+    def __getitem__(self, indice):
+        if indice < 0 or indice >= len(self._visibles):
+            raise IndexError(indice)
+        # Descendente = la lista ascendente leída desde el final
+        return self._visibles[-1 - indice if self.descendente else indice][-1]
+
+    @property
+    def total(self):
+        return len(self._entradas)
+
+    def tamano_por_formato(self):
+        """{formato: (cantidad, bytes)} de todos los archivos, sin tocar el disco"""
+        return {formato: tuple(datos) for formato, datos in self._por_formato.items()}
+
+    def tamano_total(self):
+        return sum(datos[1] for datos in self._por_formato.values())
+
+    def _sumar(self, archivo, signo):
+        datos = self._por_formato.setdefault(archivo.formato, [0, 0])
+        datos[0] += signo
+        datos[1] += signo * (archivo.tamano or 0)
+        if not datos[0]:
+            del self._por_formato[archivo.formato]
+
+    def _entrada(self, archivo):
+        return (self.CLAVES_ORDEN[self.orden](archivo), f"{archivo.nombre} {archivo.formato}".lower(),
+                archivo.nombre, archivo.formato, archivo)
+
+    def reemplazar(self, archivos):
+        """Carga todos los archivos de nuevo (ignora los repetidos)"""
+        self._claves.clear()
+        self._por_formato.clear()
+        entradas = []
+        for archivo in archivos:
+            clave = (archivo.nombre, archivo.formato)
+            if clave not in self._claves:
+                self._claves[clave] = self._entrada(archivo)
+                entradas.append(self._claves[clave])
+                self._sumar(archivo, 1)
+        entradas.sort()
+        self._entradas = entradas
+        self._filtrar_desde(self._entradas)
+
+    def agregar(self, archivo):
+        """Agrega un archivo en su lugar según el orden; retorna False si ya estaba"""
+        clave = (archivo.nombre, archivo.formato)
+        if clave in self._claves:
+            return False
+        entrada = self._claves[clave] = self._entrada(archivo)
+        self._sumar(archivo, 1)
+        bisect.insort(self._entradas, entrada)
+        if self._visibles is not self._entradas and self.texto in entrada[1]:
+            bisect.insort(self._visibles, entrada)
+        return True
+
+    def quitar(self, nombre, formato):
+        """Saca un archivo de la colección; retorna False si no estaba"""
+        entrada = self._claves.pop((nombre, formato), None)
+        if entrada is None:
+            return False
+        self._sumar(entrada[-1], -1)
+        del self._entradas[bisect.bisect_left(self._entradas, entrada)]
+        if self._visibles is not self._entradas and self.texto in entrada[1]:
+            del self._visibles[bisect.bisect_left(self._visibles, entrada)]
+        return True
+
+    def actualizar(self, archivo):
+        """Agrega un archivo o reemplaza los datos del que tenía el mismo nombre y formato"""
+        self.quitar(archivo.nombre, archivo.formato)
+        self.agregar(archivo)
+
+    def ordenar(self, orden, descendente=None):
+        """Cambia el criterio de orden; sin descendente, repetir el mismo criterio lo invierte"""
+        if descendente is None:
+            descendente = not self.descendente if orden == self.orden else orden in ("fecha", "tamano")
+        self.descendente = descendente
+        if orden != self.orden:
+            self.orden = orden
+            self._claves = {clave: self._entrada(entrada[-1]) for clave, entrada in self._claves.items()}
+            self._entradas = sorted(self._claves.values())
+            self._filtrar_desde(self._entradas)
+
+    def filtrar(self, texto):
+        """Deja visibles los archivos cuyo nombre o formato contiene el texto"""
+        texto = texto.strip().lower()
+        anterior, self.texto = self.texto, texto
+        # Si el texto solo se alargó, alcanza con buscar dentro de lo que ya estaba visible
+        self._filtrar_desde(self._visibles if anterior and texto.startswith(anterior) else self._entradas)
+
+    def _filtrar_desde(self, entradas):
+        if not self.texto:
+            self._visibles = self._entradas
+        else:
+            self._visibles = [entrada for entrada in entradas if self.texto in entrada[1]]
+
+
+class IndiceArchivos:
+    """Índice SQLite de los archivos descargados, actualizado de forma incremental"""
+
+    def __init__(self, ruta_db):
+        self.ruta_db = ruta_db
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta_db, check_same_thread=False)
+        with self._conexion:
+            self._conexion.execute("""
+                CREATE TABLE IF NOT EXISTS archivos (
+                    ruta TEXT PRIMARY KEY,
+                    carpeta TEXT NOT NULL,
+                    nombre TEXT NOT NULL,
+                    formato TEXT NOT NULL,
+                    tamano INTEGER,
+                    mtime REAL,
+                    ctime REAL,
+                    video_id TEXT,
+                    url TEXT,
+                    titulo TEXT,
+                    duracion REAL
+                )""")
+            self._conexion.execute("CREATE INDEX IF NOT EXISTS idx_archivos_carpeta ON archivos (carpeta, ctime)")
+            self._conexion.execute("CREATE INDEX IF NOT EXISTS idx_archivos_video ON archivos (video_id, formato)")
+        # Archivos de trabajos sin terminar (el audio que espera su conversión a mp3): no van al índice
+        self._en_proceso = set()
+
+    @staticmethod
+    def _clave(ruta):
+        return os.path.normcase(os.path.abspath(ruta))
+
+    def marcar_en_proceso(self, ruta):
+        self._en_proceso.add(self._clave(ruta))
+
+    def liberar(self, ruta):
+        self._en_proceso.discard(self._clave(ruta))
+
+    def en_proceso(self, ruta):
+        return self._clave(ruta) in self._en_proceso
+
+    def sincronizar(self, carpeta):
+        """Actualiza el índice con lo que hay en la carpeta, usando los datos de os.scandir"""
+        with self._lock:
+            conocidos = dict(((ruta, (tamano, mtime)) for ruta, tamano, mtime in self._conexion.execute(
+                "SELECT ruta, tamano, mtime FROM archivos WHERE carpeta = ?", (carpeta,))))
+            nuevos = []
+            vistos = set()
+            with os.scandir(carpeta) as entradas:
+                for entrada in entradas:
+                    if not es_archivo_biblioteca(entrada.name) or self.en_proceso(entrada.path):
+                        continue
+                    try:
+                        if not entrada.is_file():  # solo archivos, no carpetas
+                            continue
+                        datos = entrada.stat()
+                    except OSError:
+                        continue
+                    ruta = os.path.join(carpeta, entrada.name)
+                    vistos.add(ruta)
+                    if conocidos.get(ruta) == (datos.st_size, datos.st_mtime):
+                        continue  # sin cambios desde la última vez
+                    nombre, extension = os.path.splitext(entrada.name)
+                    nuevos.append((ruta, carpeta, nombre, extension[1:].lower(),
+                                   datos.st_size, datos.st_mtime, datos.st_ctime))
+            borrados = [(ruta,) for ruta in conocidos if ruta not in vistos]
+
+            with self._conexion:
+                # El upsert conserva video_id, url, título y duración de las descargas registradas
+                self._conexion.executemany("""
+                    INSERT INTO archivos (ruta, carpeta, nombre, formato, tamano, mtime, ctime)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (ruta) DO UPDATE SET
+                        tamano = excluded.tamano, mtime = excluded.mtime, ctime = excluded.ctime""", nuevos)
+                self._conexion.executemany("DELETE FROM archivos WHERE ruta = ?", borrados)
+        logger.info(f"Índice de {carpeta} sincronizado: {len(nuevos)} nuevos o modificados, "
+                    f"{len(borrados)} borrados")
+
+    def listar(self, carpeta):
+        """Retorna (nombre, formato, ctime, tamano) de los archivos de la carpeta, más recientes primero"""
+        with self._lock:
+            return self._conexion.execute(
+                "SELECT nombre, formato, ctime, tamano FROM archivos WHERE carpeta = ? ORDER BY ctime DESC",
+                (carpeta,)).fetchall()
+
+    def aplicar_cambios(self, carpeta, nombres):
+        """Actualiza solo los archivos indicados de la carpeta, mirando si siguen en disco.
+
+        Retorna (presentes, borrados): [ArchivoDescargado] y [(nombre, formato)].
+        """
+        presentes, borrados = [], []
+        filas, rutas_borradas = [], []
+        for nombre_archivo in nombres:
+            ruta = os.path.join(carpeta, nombre_archivo)
+            nombre, extension = os.path.splitext(nombre_archivo)
+            formato = extension[1:].lower()
+            try:
+                datos = os.stat(ruta)
+            except FileNotFoundError:
+                rutas_borradas.append((ruta,))
+                borrados.append((nombre, formato))
+                continue
+            if not es_archivo_biblioteca(nombre_archivo) or self.en_proceso(ruta):
+                continue
+            filas.append((ruta, carpeta, nombre, formato, datos.st_size, datos.st_mtime, datos.st_ctime))
+            presentes.append(ArchivoDescargado.desde_stat(ruta, datos))
+        with self._lock, self._conexion:
+            self._conexion.executemany("""
+                INSERT INTO archivos (ruta, carpeta, nombre, formato, tamano, mtime, ctime)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (ruta) DO UPDATE SET
+                    tamano = excluded.tamano, mtime = excluded.mtime, ctime = excluded.ctime""", filas)
+            self._conexion.executemany("DELETE FROM archivos WHERE ruta = ?", rutas_borradas)
+        return presentes, borrados
+
+    def videos(self):
+        """Retorna (video_id, formato, ruta) de todos los archivos con video identificado"""
+        with self._lock:
+            return self._conexion.execute(
+                "SELECT video_id, formato, ruta FROM archivos WHERE video_id IS NOT NULL").fetchall()
+
+    def registrar_descarga(self, ruta, formato, url, info):
+        """Guarda en el índice un archivo recién descargado junto con sus metadatos"""
+        datos = os.stat(ruta)
+        carpeta = os.path.dirname(ruta)
+        nombre = os.path.splitext(os.path.basename(ruta))[0]
+        with self._lock, self._conexion:
+            self._conexion.execute("""
+                INSERT OR REPLACE INTO archivos
+                    (ruta, carpeta, nombre, formato, tamano, mtime, ctime, video_id, url, titulo, duracion)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (ruta, carpeta, nombre, formato, datos.st_size, datos.st_mtime, datos.st_ctime,
+                 info.get("id"), url, info.get("title"), info.get("duration")))
+
+
+class RegistroDescargas:
+    """Videos ya descargados por (id de video, formato), para no repetir descargas"""
+
+    def __init__(self):
+        self._archivos = {}  # (video_id, formato) -> ruta, o None si solo consta en el historial
+        self._lock = threading.Lock()
+
+    def registrar(self, video_id, formato, ruta=None):
+        if not video_id:
+            return
+        with self._lock:
+            # Una ruta conocida no se pisa con una entrada del historial sin archivo
+            if ruta or (video_id, formato) not in self._archivos:
+                self._archivos[(video_id, formato)] = ruta
+
+    def cargar_indice(self, indice):
+        """Carga los videos que el índice de archivos tiene identificados"""
+        # El índice guarda la extensión del archivo; el registro, el formato pedido
+        for video_id, extension, ruta in indice.videos():
+            self.registrar(video_id, FORMATO_POR_EXTENSION.get(extension, extension), ruta)
+
+    def cargar_historial(self, ruta_historial, formato):
+        """Carga un archivo download_archive de yt-dlp (líneas "extractor id")"""
+        if not os.path.exists(ruta_historial):
+            return
+        with open(ruta_historial, "r", encoding="utf-8") as f:
+            for linea in f:
+                partes = linea.split()
+                if len(partes) == 2:
+                    self.registrar(partes[1], formato)
+
+    def buscar(self, video_id, formato):
+        """Retorna (True, ruta) si el video ya fue descargado en ese formato, o (False, None)"""
+        if not video_id:
+            return False, None
+        with self._lock:
+            if (video_id, formato) not in self._archivos:
+                return False, None
+            ruta = self._archivos[(video_id, formato)]
+        if ruta and not os.path.exists(ruta):
+            # El archivo se borró o movió: se puede volver a descargar
+            with self._lock:
+                self._archivos.pop((video_id, formato), None)
+            return False, None
+        return True, ruta
@@ -0,0 +1,186 @@
+"""Línea de comandos del convertidor, sin interfaz gráfica.
+
+Uso:
+    python -m convertidor get URL [URL...] [--format mp3|mp4] [--jobs 8] [--out CARPETA] [--list ARCHIVO]
+                             [--profile maximo|equilibrado|moderado] [--journal ARCHIVO] [--rate 2M]
+    python -m convertidor serve [--host 0.0.0.0] [--port 8765] [--token SECRETO] [--jobs 8] [--out CARPETA]
+                               [--journal ARCHIVO]
+
+Con --journal el lote se puede cortar y volver a lanzar: los trabajos que no terminaron
+vuelven a la cola y las descargas a medias se retoman desde su .part.
+
+Cada cambio de estado (y el progreso, como mucho dos veces por segundo por trabajo)
+se escribe en stdout como una línea JSON, igual que la velocidad total una vez por segundo;
+el resumen final trae los tiempos por fase (ver convertidor.metricas). El log va a stderr
+y a convertidor_errors.log.
+
+serve atiende la API HTTP de convertidor.api sin abrir la ventana, hasta Ctrl+C.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+
+from .config import cargar_config, FORMATOS
+from .rendimiento import PERFILES_RENDIMIENTO
+from .logs import configurar_logging
+from .urls import extraer_urls, leer_lista_urls
+from .cola import ColaDescargas, ESTADO_DESCARGANDO, ESTADO_COMPLETADO, ESTADO_FALLIDO, ESTADO_OMITIDO
+
+INTERVALO_PROGRESO = 0.5  # segundos mínimos entre dos líneas de progreso del mismo trabajo
+INTERVALO_VELOCIDAD = 1.0  # cada cuánto se informa la velocidad total mientras haya descargas
+
+
+class SalidaJSON:
+    """Escribe eventos como líneas JSON, sin mezclar líneas de distintos hilos"""
+
+    def __init__(self, salida=sys.stdout):
+        self.salida = salida
+        self._lock = threading.Lock()
+        self._ultimo_progreso = {}  # id de trabajo -> momento de la última línea de progreso
+
+    def evento(self, tipo, **datos):
+        linea = json.dumps({"evento": tipo, "hora": time.time(), **datos}, ensure_ascii=False)
+        with self._lock:
+            self.salida.write(linea + "\n")
+            self.salida.flush()
+
+    def trabajo(self, trabajo):
+        self._ultimo_progreso[trabajo.id] = time.monotonic()
+        self.evento("trabajo", id=trabajo.id, url=trabajo.url, titulo=trabajo.titulo,
+                    formato=trabajo.formato, estado=trabajo.estado, progreso=trabajo.progreso,
+                    detalle=trabajo.detalle, ruta=trabajo.ruta, reintentos=trabajo.reintentos)
+
+    def progreso(self, trabajo):
+        if time.monotonic() - self._ultimo_progreso.get(trabajo.id, 0) >= INTERVALO_PROGRESO:
+            self.trabajo(trabajo)
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(prog="convertidor", description="Descarga videos y audio de YouTube")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+
+    get = subcomandos.add_parser("get", help="descarga una o más URLs (videos o playlists)")
+    get.add_argument("urls", nargs="*", metavar="URL")
+    get.add_argument("--list", "-l", dest="lista", metavar="ARCHIVO",
+                     help="archivo .txt o .csv con más URLs")
+    get.add_argument("--format", "-f", dest="formato", choices=FORMATOS, default="mp3")
+    get.add_argument("--jobs", "-j", type=int, default=None,
+                     help="descargas simultáneas (por defecto max_concurrent_downloads de config.json)")
+    get.add_argument("--out", "-o", dest="carpeta", default=None,
+                     help="carpeta de descargas (por defecto la de config.json)")
+    get.add_argument("--profile", "-p", dest="perfil", choices=sorted(PERFILES_RENDIMIENTO), default=None,
+                     help="perfil de rendimiento (por defecto el de config.json)")
+    get.add_argument("--rate", "-r", dest="limite", metavar="TAMAÑO", default=None,
+                     help="bytes por segundo entre todas las descargas, ej: 2M (pisa ancho_banda.limite_total)")
+    get.add_argument("--journal", "-J", dest="diario", metavar="ARCHIVO", default=None,
+                     help="diario .jsonl para retomar el lote si se interrumpe")
+
+    serve = subcomandos.add_parser("serve", help="atiende la API HTTP para encolar descargas desde otras máquinas")
+    serve.add_argument("--host", default=None, help="dirección (por defecto api.host de config.json)")
+    serve.add_argument("--port", "-P", dest="puerto", type=int, default=None,
+                       help="puerto (por defecto api.puerto de config.json)")
+    serve.add_argument("--token", default=None, help="token que deben mandar los clientes (Bearer)")
+    serve.add_argument("--jobs", "-j", type=int, default=None,
+                       help="descargas simultáneas (por defecto max_concurrent_downloads de config.json)")
+    serve.add_argument("--out", "-o", dest="carpeta", default=None,
+                       help="carpeta de descargas (por defecto la de config.json)")
+    serve.add_argument("--journal", "-J", dest="diario", metavar="ARCHIVO", default=None,
+                       help="diario .jsonl para retomar los trabajos pendientes al volver a lanzar")
+    return parser
+
+
+def informar_velocidad(descargador, cola, salida, terminado):
+    """Escribe la velocidad de todas las descargas juntas mientras haya alguna en curso"""
+    while not terminado.wait(INTERVALO_VELOCIDAD):
+        if cola.contar(ESTADO_DESCARGANDO):
+            salida.evento("velocidad", bytes_por_segundo=round(descargador.ancho_banda.velocidad()),
+                          limite=descargador.ancho_banda.cubo.tasa)
+
+
+def comando_get(args):
+    # Importar acá mantiene rápido --help y los errores de argumentos
+    from .descarga import Descargador
+
+    urls = extraer_urls(" ".join(args.urls))
+    if args.lista:
+        urls += [url for url in leer_lista_urls(args.lista) if url not in urls]
+    if not urls and not args.diario:
+        print("convertidor: no se indicó ninguna URL válida", file=sys.stderr)
+        return 2
+
+    config = cargar_config()
+    if args.carpeta:
+        config["carpeta_descargas"] = args.carpeta
+    if args.jobs:
+        config["max_concurrent_downloads"] = args.jobs
+    if args.limite:
+        config["ancho_banda"] = dict(config.get("ancho_banda") or {}, limite_total=args.limite, horarios=[])
+    if args.perfil:
+        config["rendimiento"] = dict(config.get("rendimiento") or {}, perfil=args.perfil)
+
+    salida = SalidaJSON()
+    descargador = Descargador(config, al_progreso=salida.progreso,
+                              al_error=lambda titulo, mensaje: salida.evento("error", titulo=titulo,
+                                                                            mensaje=mensaje))
+    descargador.iniciar()
+    # Sin --journal la cola queda en memoria: la de la ventana no se mezcla con la de la línea de comandos
+    cola = ColaDescargas(descargador.descargar, config["max_concurrent_downloads"], args.diario,
+                         al_cambiar=salida.trabajo, metricas=descargador.metricas)
+    descargador.al_parcial = cola.registrar_parcial
+    cola.iniciar()
+
+    terminado = threading.Event()
+    threading.Thread(target=informar_velocidad, args=(descargador, cola, salida, terminado), daemon=True).start()
+    descargador.importar_urls(urls, args.formato, cola)
+    cola.esperar()
+    terminado.set()
+
+    salida.evento("resumen",
+                  completados=cola.contar(ESTADO_COMPLETADO),
+                  fallidos=cola.contar(ESTADO_FALLIDO),
+                  omitidos=cola.contar(ESTADO_OMITIDO),
+                  metricas=descargador.metricas.resumen())
+    return 1 if cola.contar(ESTADO_FALLIDO) else 0
+
+
+def comando_serve(args):
+    from .descarga import Descargador
+    from .api import ServidorAPI
+
+    config = cargar_config()
+    if args.carpeta:
+        config["carpeta_descargas"] = args.carpeta
+    if args.jobs:
+        config["max_concurrent_downloads"] = args.jobs
+    config["api"] = dict(config.get("api") or {}, **{clave: valor for clave, valor in
+                                                      (("host", args.host), ("puerto", args.puerto),
+                                                       ("token", args.token)) if valor})
+
+    descargador = Descargador(config)
+    descargador.iniciar()
+    cola = ColaDescargas(descargador.descargar, config["max_concurrent_downloads"], args.diario,
+                         metricas=descargador.metricas)
+    servidor = ServidorAPI.desde_config(descargador, cola, config)
+    # Los cambios de estado y el progreso llegan a los clientes de /events
+    cola.al_cambiar = servidor.notificar
+    descargador.al_progreso = servidor.notificar
+    descargador.al_parcial = cola.registrar_parcial
+    cola.iniciar()
+    try:
+        servidor.servir()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    # El log va a stderr para que stdout tenga solamente líneas JSON
+    configurar_logging(consola=sys.stderr)
+    if args.comando == "get":
+        return comando_get(args)
+    if args.comando == "serve":
+        return comando_serve(args)
+    return 2
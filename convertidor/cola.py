@@ -0,0 +1,302 @@
+import os
+import json
+import queue
+import threading
+import uuid
+import logging
+from concurrent.futures import Future
+
+from .metricas import MetricasTrabajo
+from .urls import extraer_id_video
+
+logger = logging.getLogger(__name__)
+
+
+# Estados posibles de un trabajo de descarga
+ESTADO_EN_COLA = "en cola"
+ESTADO_DESCARGANDO = "descargando"
+ESTADO_CONVIRTIENDO = "convirtiendo"
+ESTADO_COMPLETADO = "completado"
+ESTADO_FALLIDO = "fallido"
+ESTADO_OMITIDO = "ya descargado"
+# Estados con los que un trabajo vuelve a la cola si la app se cierra
+ESTADOS_PENDIENTES = (ESTADO_EN_COLA, ESTADO_DESCARGANDO, ESTADO_CONVIRTIENDO)
+
+
+def clave_trabajo(url, formato):
+    """Identifica un trabajo pendiente: youtu.be/ID y watch?v=ID son el mismo video"""
+    return extraer_id_video(url) or url, formato
+
+
+class TrabajoDescarga:
+    """Trabajo de la cola de descargas con su propio estado y progreso"""
+
+    def __init__(self, url, formato, id=None, estado=ESTADO_EN_COLA, titulo=None):
+        self.id = id or uuid.uuid4().hex[:12]
+        self.url = url
+        self.formato = formato
+        self.titulo = titulo
+        self.estado = estado
+        self.progreso = 0.0
+        self.detalle = ""
+        self.ruta = None  # archivo resultante (o el que ya existía si se omitió)
+        self.reintentos = 0  # veces que se volvió a intentar después de un error
+        self.parcial = None  # archivo .part a medio descargar, para retomarlo al reiniciar
+        self.metricas = MetricasTrabajo()  # tiempos por fase y bytes (no se guardan en el diario)
+
+    def __str__(self):
+        return f"{self.url} ({self.formato}) - {self.estado}"
+
+    def a_dict(self):
+        """Retorna los datos que se guardan en disco"""
+        return {"id": self.id, "url": self.url, "formato": self.formato, "estado": self.estado,
+                "titulo": self.titulo, "parcial": self.parcial}
+
+    @classmethod
+    def desde_dict(cls, datos):
+        """Crea un trabajo a partir de los datos guardados en disco"""
+        trabajo = cls(datos["url"], datos["formato"], id=datos.get("id"),
+                      estado=datos.get("estado", ESTADO_EN_COLA), titulo=datos.get("titulo"))
+        trabajo.parcial = datos.get("parcial")
+        return trabajo
+
+
+class DiarioTrabajos:
+    """Diario de trabajos en un archivo JSONL al que solo se agregan líneas.
+
+    Cada cambio de un trabajo se escribe (y se baja a disco) antes de seguir, así que
+    si la app se cierra a mitad de una descarga el diario sabe qué quedó pendiente.
+    La última línea de cada id es la que vale; una línea cortada por un corte se ignora.
+    """
+
+    def __init__(self, archivo):
+        self.archivo = archivo
+        self._archivo = None
+
+    def leer(self):
+        """Retorna los trabajos que no terminaron, en el orden en que se agregaron"""
+        if not os.path.exists(self.archivo):
+            return []
+        ultimos = {}  # id -> últimos datos registrados
+        with open(self.archivo, "r", encoding="utf-8") as f:
+            for numero, linea in enumerate(f, 1):
+                if not linea.strip():
+                    continue
+                try:
+                    datos = json.loads(linea)
+                    ultimos[datos["id"]] = datos
+                except (ValueError, KeyError, TypeError):
+                    logger.warning(f"Se ignora la línea {numero} del diario de descargas (incompleta)")
+        return [TrabajoDescarga.desde_dict(d) for d in ultimos.values() if d.get("estado") in ESTADOS_PENDIENTES]
+
+    def registrar(self, trabajo):
+        """Agrega el estado actual del trabajo al diario"""
+        if self._archivo is None:
+            self._archivo = open(self.archivo, "a", encoding="utf-8")
+            if self._cortado():
+                # Lo nuevo no se pega a la línea que dejó a medias un corte: iría a parar con ella
+                self._archivo.write("\n")
+        self._archivo.write(json.dumps(trabajo.a_dict(), ensure_ascii=False) + "\n")
+        self._archivo.flush()
+        os.fsync(self._archivo.fileno())
+
+    def _cortado(self):
+        """True si el archivo no termina en un salto de línea (la última escritura quedó a medias)"""
+        with open(self.archivo, "rb") as f:
+            if f.seek(0, os.SEEK_END) == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+    def compactar(self, trabajos):
+        """Reescribe el diario dejando solamente los trabajos indicados"""
+        self.cerrar()
+        temporal = self.archivo + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            for trabajo in trabajos:
+                f.write(json.dumps(trabajo.a_dict(), ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, self.archivo)
+
+    def cerrar(self):
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+
+
+def migrar_cola_json(archivo_json, archivo_diario):
+    """Pasa la cola guardada por versiones anteriores (un JSON con la lista) al diario"""
+    if not os.path.exists(archivo_json) or os.path.exists(archivo_diario):
+        return
+    try:
+        with open(archivo_json, "r", encoding="utf-8") as f:
+            trabajos = [TrabajoDescarga.desde_dict(d) for d in json.load(f)]
+        DiarioTrabajos(archivo_diario).compactar(trabajos)
+        os.remove(archivo_json)
+        logger.info(f"Cola de descargas migrada de {archivo_json} a {archivo_diario}")
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"No se pudo migrar la cola de descargas anterior: {e}")
+
+
+class ColaDescargas:
+    """Cola persistente de descargas atendida por un pool de hilos.
+
+    Con archivo, cada cambio de estado queda en un DiarioTrabajos: al volver a iniciar,
+    lo que no terminó vuelve a la cola y yt-dlp retoma los .part que hayan quedado.
+
+    funcion_descarga(trabajo) retorna True/False, o un Future con ese resultado cuando
+    el trabajo sigue en otra etapa (la conversión): el worker queda libre enseguida.
+    Con metricas (un RegistroMetricas), cada trabajo terminado se anota ahí.
+    """
+
+    def __init__(self, funcion_descarga, max_workers, archivo=None, al_cambiar=None, metricas=None):
+        self.funcion_descarga = funcion_descarga
+        self.max_workers = max(1, int(max_workers))
+        self.archivo = archivo
+        self._diario = DiarioTrabajos(archivo) if archivo else None
+        self.al_cambiar = al_cambiar
+        self.metricas = metricas
+        self.trabajos = {}  # id -> TrabajoDescarga, en orden de llegada
+        self._activos = {}  # (video o url, formato) -> trabajo en cola o descargando
+        self._cola = queue.Queue()
+        self._lock = threading.Lock()
+        self._hilos = []
+
+    def iniciar(self):
+        """Recupera los trabajos pendientes del disco y arranca los workers"""
+        pendientes = self._cargar()
+        for trabajo in pendientes:
+            # Lo que estaba descargando al cerrar la app vuelve a la cola
+            trabajo.estado = ESTADO_EN_COLA
+            if trabajo.parcial and os.path.exists(trabajo.parcial):
+                trabajo.detalle = f"↻ Se retoma desde {os.path.getsize(trabajo.parcial) / 1024 ** 2:.1f} MB"
+            self.trabajos[trabajo.id] = trabajo
+            self._activos[clave_trabajo(trabajo.url, trabajo.formato)] = trabajo
+            self._cola.put(trabajo)
+            self._notificar(trabajo)
+        with self._lock:
+            self._compactar()
+
+        for i in range(self.max_workers):
+            hilo = threading.Thread(target=self._worker, name=f"descarga-{i}", daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+        logger.info(f"Cola de descargas iniciada con {self.max_workers} workers "
+                    f"y {len(pendientes)} trabajos pendientes")
+
+    def agregar(self, url, formato, titulo=None):
+        """Agrega una URL a la cola y retorna su trabajo (o el que ya estaba pendiente)"""
+        clave = clave_trabajo(url, formato)
+        with self._lock:
+            if clave in self._activos:
+                return self._activos[clave]
+            trabajo = TrabajoDescarga(url, formato, titulo=titulo)
+            self.trabajos[trabajo.id] = trabajo
+            self._activos[clave] = trabajo
+            self._guardar(trabajo)
+        self._notificar(trabajo)
+        self._cola.put(trabajo)
+        return trabajo
+
+    def registrar_parcial(self, trabajo, ruta):
+        """Anota el .part que está escribiendo yt-dlp para poder retomarlo después de un cierre"""
+        with self._lock:
+            if trabajo.parcial == ruta:
+                return
+            trabajo.parcial = ruta
+            self._guardar(trabajo)
+
+    def registrar_omitido(self, url, formato, ruta, titulo=None):
+        """Muestra una URL que no se descarga porque el archivo ya existe"""
+        trabajo = TrabajoDescarga(url, formato, estado=ESTADO_OMITIDO, titulo=titulo)
+        trabajo.ruta = ruta
+        trabajo.progreso = 100
+        trabajo.detalle = ruta or "Registrado en el historial de descargas"
+        with self._lock:
+            self.trabajos[trabajo.id] = trabajo
+        self._notificar(trabajo)
+        return trabajo
+
+    def esperar(self):
+        """Bloquea hasta que no queden trabajos en la cola, descargando ni convirtiendo"""
+        self._cola.join()
+
+    def contar(self, estado):
+        """Cantidad de trabajos en un estado"""
+        return sum(1 for t in list(self.trabajos.values()) if t.estado == estado)
+
+    def _worker(self):
+        while True:
+            trabajo = self._cola.get()
+            trabajo.metricas.empezar()
+            self._cambiar_estado(trabajo, ESTADO_DESCARGANDO)
+            try:
+                resultado = self.funcion_descarga(trabajo)
+            except Exception as e:
+                logger.error(f"Error no controlado en el trabajo {trabajo.id}: {e}")
+                trabajo.detalle = str(e)
+                resultado = False
+            if isinstance(resultado, Future):
+                # La descarga terminó pero falta la conversión: el worker sigue con otra URL
+                self._cambiar_estado(trabajo, ESTADO_CONVIRTIENDO)
+                resultado.add_done_callback(lambda futuro, trabajo=trabajo: self._terminar(trabajo, futuro))
+            else:
+                self._finalizar(trabajo, resultado)
+
+    def _terminar(self, trabajo, futuro):
+        try:
+            exito = futuro.result()
+        except Exception as e:
+            logger.error(f"Error no controlado al convertir el trabajo {trabajo.id}: {e}")
+            trabajo.detalle = str(e)
+            exito = False
+        self._finalizar(trabajo, exito)
+
+    def _finalizar(self, trabajo, exito):
+        self._cambiar_estado(trabajo, ESTADO_COMPLETADO if exito else ESTADO_FALLIDO)
+        if self.metricas:
+            self.metricas.registrar(trabajo)
+        self._cola.task_done()
+
+    def _cambiar_estado(self, trabajo, estado):
+        with self._lock:
+            trabajo.estado = estado
+            if estado in (ESTADO_COMPLETADO, ESTADO_FALLIDO):
+                trabajo.parcial = None
+                self._activos.pop(clave_trabajo(trabajo.url, trabajo.formato), None)
+            self._guardar(trabajo)
+            if not self._activos:
+                self._compactar()  # sin pendientes el diario vuelve a quedar vacío
+        self._notificar(trabajo)
+
+    def _notificar(self, trabajo):
+        if self.al_cambiar:
+            self.al_cambiar(trabajo)
+
+    def _guardar(self, trabajo):
+        """Registra el cambio de un trabajo en el diario (llamar con el lock tomado)"""
+        if not self._diario:
+            return  # cola en memoria (por ejemplo, desde la línea de comandos)
+        try:
+            self._diario.registrar(trabajo)
+        except OSError as e:
+            logger.error(f"No se pudo guardar la cola de descargas: {e}")
+
+    def _compactar(self):
+        """Deja en el diario solamente los trabajos pendientes (llamar con el lock tomado)"""
+        if not self._diario:
+            return
+        try:
+            self._diario.compactar(t for t in self.trabajos.values() if t.estado in ESTADOS_PENDIENTES)
+        except OSError as e:
+            logger.error(f"No se pudo compactar la cola de descargas: {e}")
+
+    def _cargar(self):
+        if not self._diario:
+            return []
+        try:
+            return self._diario.leer()
+        except OSError as e:
+            logger.error(f"No se pudo leer la cola de descargas guardada: {e}")
+            return []
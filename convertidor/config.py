@@ -0,0 +1,73 @@
+import os
+import json
+
+from .rendimiento import PERFIL_POR_DEFECTO
+from .metadatos import TTL_METADATOS
+from .transcodificacion import POSPROCESO_POR_DEFECTO
+
+CONFIG_FILE = "config.json"
+COLA_FILE = "cola_descargas.jsonl"
+COLA_FILE_ANTERIOR = "cola_descargas.json"  # formato de versiones anteriores, se migra al iniciar
+INDICE_FILE = "historial.db"
+METADATOS_FILE = "metadatos.db"
+METRICAS_FILE = "metricas.jsonl"
+COOKIES_FILE = "cookies.txt"
+EXTENSIONES_ARCHIVOS = (".mp3", ".mp4", ".m4a", ".opus")
+SIZE_TEXT = 14
+MAX_DESCARGAS_SIMULTANEAS = 3
+MAX_CONVERSIONES_SIMULTANEAS = 0  # 0 = una por núcleo
+MAX_HILOS_METADATOS = 8
+MAX_HILOS_PRECARGA = 2  # videos de playlists cuyos metadatos se piden de antemano, a la vez
+PUERTO_API = 8765
+# Historial de yt-dlp por formato (vacío para no usarlo), ej: "descargas_{formato}.txt"
+DOWNLOAD_ARCHIVE = ""
+# "audio" = el audio original (m4a u opus) sin recodificar
+FORMATOS = ("mp3", "mp4", "audio")
+# Formato de descarga al que corresponde cada extensión de archivo
+FORMATO_POR_EXTENSION = {"mp3": "mp3", "mp4": "mp4", "m4a": "audio", "opus": "audio"}
+HTTP_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/120.0.0.0 Safari/537.36"
+    )
+}
+
+
+def cargar_config():
+    """Carga la configuración desde config.json, si existe. Si no existe, lo crea automáticamente."""
+    config_default = {"carpeta_descargas": os.path.expanduser("~/Downloads"),
+                      "font_size": SIZE_TEXT,
+                      "max_concurrent_downloads": MAX_DESCARGAS_SIMULTANEAS,
+                      "max_concurrent_transcodes": MAX_CONVERSIONES_SIMULTANEAS,
+                      "download_archive": DOWNLOAD_ARCHIVE,
+                      "metadata_cache_ttl": TTL_METADATOS,
+                      "rendimiento": {"perfil": PERFIL_POR_DEFECTO},
+                      "ancho_banda": {"limite_total": "", "limites_host": {}, "horarios": []},
+                      "metricas": {"archivo": METRICAS_FILE, "puerto_prometheus": None},
+                      "api": {"habilitada": False, "host": "127.0.0.1", "puerto": PUERTO_API, "token": ""},
+                      "posproceso": dict(POSPROCESO_POR_DEFECTO)
+                }
+    if os.path.exists(CONFIG_FILE):
+        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+            config_guardada = json.load(f)
+        # Completar claves nuevas que no existían en configuraciones anteriores
+        for clave, valor in config_default.items():
+            config_guardada.setdefault(clave, valor)
+        return config_guardada
+
+    # Si no existe el archivo, crear configuración por defecto y guardarla
+    guardar_config(config_default)
+    return config_default
+
+
+def guardar_config(config):
+    """Guarda la configuración en config.json"""
+    with open(CONFIG_FILE, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=4)
+
+
+def ruta_historial(config, formato):
+    """Ruta del download_archive de yt-dlp para un formato, o None si no está configurado"""
+    plantilla = config.get("download_archive")
+    return plantilla.format(formato=formato) if plantilla else None
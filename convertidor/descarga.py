@@ -0,0 +1,531 @@
+import os
+import copy
+import time
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import (COOKIES_FILE, HTTP_HEADERS, INDICE_FILE, METADATOS_FILE, MAX_HILOS_METADATOS,
+                     MAX_HILOS_PRECARGA, FORMATOS, ruta_historial)
+from .ancho_banda import ProgramadorAnchoBanda
+from .biblioteca import ArchivoDescargado, IndiceArchivos, RegistroDescargas
+from .ffmpeg import GestorFFmpeg, ErrorFFmpeg, ruta_base, carpeta_cache_ffmpeg
+from .metadatos import CacheMetadatos
+from .metricas import (RegistroMetricas, FASE_LIMITES, FASE_METADATOS, FASE_POSPROCESO, FASE_REINTENTO,
+                       FASE_ESPERA_CONVERSION, FASE_CONVERSION, FASE_FINALIZAR)
+from .reintentos import (PoliticaReintentos, clasificar_error, DESCRIPCION_FALLO, FALLO_PROHIBIDO, FALLO_LIMITE,
+                         FALLO_PROCESAMIENTO)
+from .rendimiento import opciones_rendimiento
+from .transcodificacion import (EtapaTranscodificacion, planear_conversion, convertir_a_mp3, remuxear_audio,
+                                procesar_mp3, ajustes_posproceso, portada_descargada,
+                                CONVERSION_NINGUNA, CONVERSION_MP3)
+from .urls import limpiar_url_youtube, extraer_id_video, extraer_id_lista
+
+logger = logging.getLogger(__name__)
+
+
+def importar_yt_dlp():
+    """yt_dlp tarda en importarse: se carga recién cuando hace falta (o en segundo plano, ver iniciar)"""
+    import yt_dlp
+    return yt_dlp
+
+
+def opciones_base():
+    """Opciones de yt-dlp comunes a la descarga y a la lectura de metadatos"""
+    # --- Detectar navegador principal (puedes cambiar "chrome" por "edge" o "firefox") ---
+    return {
+        "cookiefile": COOKIES_FILE,  # 👈 Usa cookies del navegador
+        "http_headers": dict(HTTP_HEADERS),
+        # Nada de texto propio en stdout (la línea de comandos escribe ahí solo JSON): el progreso llega
+        # por los hooks y los avisos y errores de yt-dlp van al log
+        "quiet": True,
+        "noprogress": True,
+        "logger": logging.getLogger("yt_dlp"),
+    }
+
+
+# Selección de formatos de yt-dlp para cada formato pedido
+SELECCION_FORMATO = {
+    # Si el sitio ya ofrece mp3 no hace falta recodificar
+    "mp3": "bestaudio[acodec^=mp3]/bestaudio/best",
+    # h264 + aac se unen en mp4 copiando los streams
+    "mp4": "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/bestvideo+bestaudio/best",
+    # Audio original sin recodificar: m4a (aac) u opus
+    "audio": "bestaudio[ext=m4a]/bestaudio[acodec=opus]/bestaudio/best",
+}
+
+
+def ruta_descargada(ydl, info):
+    """Archivo que yt-dlp dejó en disco (después de unir video y audio, si hizo falta)"""
+    descargas = info.get("requested_downloads") or []
+    if descargas and descargas[-1].get("filepath"):
+        return descargas[-1]["filepath"]
+    return ydl.prepare_filename(info)
+
+
+class Descargador:
+    """Pipeline de descarga sin interfaz: metadatos, duplicados, ffmpeg, yt-dlp e índice.
+
+    La interfaz (ventana o línea de comandos) se entera de lo que pasa con los callbacks:
+    al_progreso(trabajo), al_error(titulo, mensaje) y al_completar(trabajo, archivo_obj).
+    al_parcial(trabajo, ruta) avisa qué .part se está escribiendo (ColaDescargas.registrar_parcial).
+    Todos se llaman desde hilos de trabajo.
+    """
+
+    def __init__(self, config, al_progreso=None, al_error=None, al_completar=None, al_parcial=None):
+        self.config = config
+        self.al_progreso = al_progreso
+        self.al_error = al_error
+        self.al_completar = al_completar
+        self.al_parcial = al_parcial
+        self.gestor_ffmpeg = GestorFFmpeg(ruta_base(), carpeta_cache_ffmpeg())
+        self.indice = IndiceArchivos(INDICE_FILE)
+        self.registro = RegistroDescargas()
+        self._registro_cargado = threading.Event()
+        # En disco: volver a pedir un video ya visto no repite la extracción mientras sus URLs sirvan
+        self.cache_metadatos = CacheMetadatos(archivo=METADATOS_FILE,
+                                              ttl=config["metadata_cache_ttl"])
+        self.reintentos = PoliticaReintentos(config)
+        # Límite de bytes por segundo entre todas las descargas y descargas simultáneas por sitio
+        self.ancho_banda = ProgramadorAnchoBanda(config)
+        # Tiempos por fase de cada trabajo (ColaDescargas los anota al terminar)
+        self.metricas = RegistroMetricas(config)
+        # Pool para resolver en paralelo las URLs que se pegan o llegan por la API
+        self.pool_metadatos = ThreadPoolExecutor(max_workers=MAX_HILOS_METADATOS,
+                                                 thread_name_prefix="metadatos")
+        # Los videos de las playlists se precargan aparte y de a pocos: una playlist larga no demora
+        # las próximas URLs ni dispara una ráfaga de pedidos al sitio
+        self.pool_precarga = ThreadPoolExecutor(max_workers=MAX_HILOS_PRECARGA, thread_name_prefix="precarga")
+        # La conversión a mp3 no ocupa un lugar de descarga
+        self.transcodificacion = EtapaTranscodificacion(config.get("max_concurrent_transcodes"))
+
+    def iniciar(self):
+        """Empieza a preparar ffmpeg, yt-dlp y el registro de duplicados en segundo plano"""
+        # ffmpeg se prepara una sola vez al arrancar; los workers solo esperan a que esté listo
+        self.gestor_ffmpeg.iniciar()
+        # Nada de esto bloquea a quien llama: la ventana se muestra mientras tanto
+        threading.Thread(target=self._preparar, name="preparar-descargas", daemon=True).start()
+        self.metricas.iniciar()
+
+    def _preparar(self):
+        inicio = time.perf_counter()
+        try:
+            self.cargar_registro()
+        finally:
+            self._registro_cargado.set()
+        importar_yt_dlp()  # así la primera descarga no paga la importación
+        logger.info(f"Registro de descargas y yt-dlp listos en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+    def cargar_registro(self):
+        """Llena el registro de duplicados con el índice y los historiales de yt-dlp"""
+        try:
+            self.registro.cargar_indice(self.indice)
+            for formato in FORMATOS:
+                if ruta_historial(self.config, formato):
+                    self.registro.cargar_historial(ruta_historial(self.config, formato), formato)
+        except (OSError, sqlite3.Error) as e:
+            logger.error(f"No se pudo cargar el registro de descargas: {e}")
+
+    def ya_descargado(self, url, formato):
+        """registro.buscar para una URL, esperando a que el registro termine de cargarse"""
+        self._registro_cargado.wait()
+        return self.registro.buscar(extraer_id_video(url), formato)
+
+    def _error(self, trabajo, titulo, error_msg, detalle=None):
+        trabajo.detalle = detalle or error_msg
+        if self.al_error:
+            self.al_error(titulo, error_msg)
+
+    def descargar(self, trabajo):
+        """Descarga un trabajo de la cola.
+
+        Retorna True si terminó correctamente, False si falló, o un Future con ese mismo
+        resultado si el archivo quedó esperando su conversión.
+        """
+        url, formato = trabajo.url, trabajo.formato
+        logger.info(f"Iniciando descarga: URL={url}, Formato={formato}")
+        # Archivos que yt-dlp terminó de bajar en este trabajo: no son parte de la biblioteca
+        # hasta que se registran (o hasta que termina su conversión)
+        descargados = set()
+        en_conversion = None
+        try:
+            # Antes de cualquier acceso a la red: ¿ya tenemos este video en este formato?
+            ya_descargado, ruta_existente = self.ya_descargado(url, formato)
+            if ya_descargado:
+                logger.info(f"Se omite {url}: ya descargado en {formato} ({ruta_existente})")
+                trabajo.ruta = ruta_existente
+                trabajo.detalle = f"⏭ Ya descargado: {ruta_existente or 'registrado en el historial'}"
+                return True
+
+            carpeta = self.config["carpeta_descargas"]  # siempre obtiene la última guardada
+
+            # Verificar que la carpeta de descargas existe
+            if not os.path.exists(carpeta):
+                error_msg = f"La carpeta de descargas no existe: {carpeta}"
+                logger.error(error_msg)
+                self._error(trabajo, "Error", error_msg)
+                return False
+
+            try:
+                ffmpeg_path = self.gestor_ffmpeg.ruta()
+
+            except ErrorFFmpeg as e:
+                error_msg = str(e)
+                logger.error(error_msg)
+                self._error(trabajo, "Error", error_msg)
+                return False
+            except FileNotFoundError as e:
+                error_msg = f"No se encontró un archivo necesario: {e}"
+                logger.error(error_msg)
+                self._error(trabajo, "Error", error_msg)
+                return False
+            except Exception as e:
+                error_msg = f"Error al configurar ffmpeg: {e}"
+                logger.error(error_msg)
+                self._error(trabajo, "Error", error_msg)
+                return False
+
+            yt_dlp = importar_yt_dlp()
+            # Opciones base
+            opciones = opciones_base()
+            opciones.update({
+                "outtmpl": os.path.join(carpeta, "%(title)s.%(ext)s"),
+                "ffmpeg_location": ffmpeg_path,
+                # Si quedó un .part de una ejecución anterior, se sigue desde donde quedó
+                "continuedl": True,
+                "progress_hooks": [lambda d: self.progreso_hook(trabajo, d),
+                                   lambda d: self._marcar_descargado(d, descargados)],
+                "postprocessor_hooks": [lambda d: self.posproceso_hook(trabajo, d)],
+            })
+            # Fragmentos en paralelo, tamaño de bloque, aria2c y límites según el perfil
+            opciones.update(opciones_rendimiento(self.config))
+            if self.ancho_banda.cubo.tasa:
+                # aria2c no pasa por el hook de progreso, así que no respetaría el límite total
+                opciones.pop("external_downloader", None)
+                opciones.pop("external_downloader_args", None)
+            if ruta_historial(self.config, formato):
+                opciones["download_archive"] = ruta_historial(self.config, formato)
+
+            # Ajustar según formato: se prefieren los streams que solo necesitan un remux
+            opciones["format"] = SELECCION_FORMATO[formato]
+            if formato == "mp4":
+                opciones["merge_output_format"] = "mp4"
+            # Etiquetas, portada y normalización de los mp3 (sección "posproceso" de config.json)
+            posproceso = ajustes_posproceso(self.config) if formato == "mp3" else None
+            if posproceso and posproceso["portada"]:
+                # La miniatura queda al lado del audio hasta que el posproceso la incrusta
+                opciones["writethumbnail"] = True
+
+            fallos = {}  # clase de fallo -> cuántas veces ocurrió en este trabajo
+            while True:
+                # Si el servidor pidió bajar el ritmo (429), ninguna descarga empieza hasta que pase la pausa
+                trabajo.metricas.fase(FASE_LIMITES)
+                self.reintentos.esperar_turno()
+                try:
+                    # Un lugar por sitio (limites_host): se libera antes de esperar un reintento
+                    host = self.ancho_banda.entrar(url)
+                    # Los hooks pasan a descarga y posproceso a medida que yt-dlp avanza
+                    trabajo.metricas.fase(FASE_METADATOS)
+                    try:
+                        with yt_dlp.YoutubeDL(opciones) as ydl:
+                            # Si hay metadatos con URLs firmadas vigentes, no se vuelve a resolver la página
+                            # del video (en un reintento se extrae de nuevo)
+                            info_previa = None if fallos else self.cache_metadatos.para_descargar(url)
+                            if info_previa:
+                                # Copia profunda: yt-dlp modifica formats y thumbnails en el lugar
+                                info = ydl.process_ie_result(copy.deepcopy(info_previa), download=True)
+                            else:
+                                info = ydl.extract_info(url, download=True)
+                            if info is None:
+                                # yt-dlp lo salteó porque ya figura en su download_archive
+                                trabajo.detalle = "⏭ Ya descargado: registrado en el historial"
+                                return True
+                            archivo_descargado = ruta_descargada(ydl, info)
+                    finally:
+                        self.ancho_banda.salir(host)
+                        trabajo.metricas.cerrar_fase()
+                    if not info_previa:
+                        self.cache_metadatos.guardar(url, info)
+                    break
+                except Exception as e:
+                    clase = clasificar_error(e)
+                    fallos[clase] = fallos.get(clase, 0) + 1
+                    if clase == FALLO_PROHIBIDO:
+                        self.cache_metadatos.descartar(url)  # URLs firmadas que ya no sirven
+                    if not self._reintentar(trabajo, clase, fallos[clase], e):
+                        self._error_descarga(trabajo, e)
+                        return False
+                    self.reintentos.ajustar_opciones(opciones, clase, fallos[clase])
+
+            if formato == "mp4":
+                return self._finalizar(trabajo, archivo_descargado, info)
+
+            conversion, destino = planear_conversion(formato, info, archivo_descargado)
+            if conversion == CONVERSION_NINGUNA and not posproceso:
+                logger.info(f"{archivo_descargado} ya está en el formato pedido, no se convierte")
+                return self._finalizar(trabajo, archivo_descargado, info)
+
+            # La conversión (y el posproceso) sigue en su propio pool; el worker queda libre para otra URL
+            if posproceso:
+                trabajo.detalle = "🎛 Procesando audio..."
+            else:
+                trabajo.detalle = "🎛 Convirtiendo a mp3..." if conversion == CONVERSION_MP3 else "📦 Copiando audio..."
+            if self.al_progreso:
+                self.al_progreso(trabajo)
+            trabajo.metricas.fase(FASE_ESPERA_CONVERSION)
+            # Hasta que termine la conversión, el audio descargado no es parte de la biblioteca
+            self.indice.marcar_en_proceso(archivo_descargado)
+            en_conversion = archivo_descargado
+            return self.transcodificacion.enviar(self._convertir_y_finalizar, trabajo, ffmpeg_path,
+                                                 conversion, archivo_descargado, destino, info, posproceso)
+
+        except Exception as e:
+            error_msg = f"Error crítico en la aplicación: {e}"
+            logger.critical(error_msg)
+            self._error(trabajo, "Error crítico", error_msg, "❌ Error crítico")
+        finally:
+            # Lo que pasó a la etapa de conversión lo libera _convertir_y_finalizar
+            for ruta in descargados:
+                if ruta != en_conversion:
+                    self.indice.liberar(ruta)
+        return False
+
+    def _marcar_descargado(self, d, descargados):
+        """Hook de yt-dlp: el archivo recién bajado queda fuera de la biblioteca mientras se procesa.
+
+        yt-dlp avisa apenas renombra el .part, antes de unir video y audio o de retornar de la
+        extracción: así el vigilante de la carpeta no lo indexa mientras todavía se procesa.
+        """
+        if d.get("status") == "finished" and d.get("filename"):
+            self.indice.marcar_en_proceso(d["filename"])
+            descargados.add(d["filename"])
+
+    def _reintentar(self, trabajo, clase, intento, error):
+        """Si la política lo permite, espera lo que corresponda y retorna True para volver a intentar"""
+        if not self.reintentos.puede_reintentar(clase, intento):
+            return False
+        espera = self.reintentos.espera(clase, intento)
+        maximo = self.reintentos.politicas[clase]["intentos"]
+        trabajo.reintentos += 1
+        trabajo.detalle = f"⟳ {DESCRIPCION_FALLO[clase]}: reintento {intento}/{maximo} en {espera:.0f} s"
+        logger.warning(f"{trabajo.url}: {error} ({clase}); reintento {intento}/{maximo} en {espera:.1f} s")
+        if self.al_progreso:
+            self.al_progreso(trabajo)
+        if clase == FALLO_LIMITE:
+            self.reintentos.pausar_todos(espera)  # esperar_turno hace la espera
+        else:
+            trabajo.metricas.fase(FASE_REINTENTO)
+            time.sleep(espera)
+            trabajo.metricas.cerrar_fase()
+        return True
+
+    def _error_descarga(self, trabajo, e):
+        """Informa un error de yt-dlp que ya no se va a reintentar"""
+        yt_dlp = importar_yt_dlp()
+        if isinstance(e, yt_dlp.DownloadError):
+            error_msg = f"Error al descargar el video: {e}"
+            logger.error(f"DownloadError: {error_msg}")
+            self._error(trabajo, "Error de descarga", error_msg, "❌ Error en la descarga")
+        elif isinstance(e, yt_dlp.ExtractorError):
+            error_msg = f"Error al extraer información del video: {e}"
+            logger.error(f"ExtractorError: {error_msg}")
+            self._error(trabajo, "Error de extracción", error_msg, "❌ Error al extraer información")
+        elif isinstance(e, yt_dlp.PostProcessingError):
+            error_msg = f"Error al procesar el archivo: {e}"
+            logger.error(f"PostProcessingError: {error_msg}")
+            self._error(trabajo, "Error de procesamiento", error_msg, "❌ Error al procesar archivo")
+        else:
+            error_msg = f"Error inesperado durante la descarga: {e}"
+            logger.error(f"Unexpected error: {error_msg}")
+            self._error(trabajo, "Error inesperado", error_msg, "❌ Error inesperado")
+
+    def _convertir_y_finalizar(self, trabajo, ffmpeg_path, conversion, origen, destino, info, posproceso=None):
+        """Corre en la etapa de conversión: recodifica o remuxea el audio descargado y lo registra.
+
+        Con posproceso, la conversión, el recorte, la normalización, las etiquetas y la portada
+        se hacen en una sola llamada a ffmpeg.
+        """
+        intento = 0
+        while True:
+            trabajo.metricas.fase(FASE_CONVERSION)
+            try:
+                if posproceso:
+                    procesar_mp3(ffmpeg_path, origen, destino, posproceso, info,
+                                 recodificar=conversion == CONVERSION_MP3)
+                elif conversion == CONVERSION_MP3:
+                    convertir_a_mp3(ffmpeg_path, origen, destino)
+                else:
+                    remuxear_audio(ffmpeg_path, origen, destino)
+                break
+            except (OSError, RuntimeError) as e:
+                intento += 1
+                if not self._reintentar(trabajo, FALLO_PROCESAMIENTO, intento, e):
+                    self.indice.liberar(origen)
+                    portada = portada_descargada(info)
+                    if portada:
+                        os.remove(portada)  # no queda una imagen suelta en la carpeta de descargas
+                    error_msg = f"Error al procesar el archivo: {e}"
+                    logger.error(f"PostProcessingError: {error_msg}")
+                    self._error(trabajo, "Error de procesamiento", error_msg, "❌ Error al procesar archivo")
+                    return False
+        # Antes de que el vigilante vea el destino (que puede ser el mismo origen reemplazado)
+        self.indice.liberar(origen)
+        return self._finalizar(trabajo, destino, info)
+
+    def _finalizar(self, trabajo, archivo_descargado, info):
+        """Registra el archivo terminado en el índice y en el registro de duplicados"""
+        formato = trabajo.formato
+        trabajo.metricas.fase(FASE_FINALIZAR)
+        # Crear objeto ArchivoDescargado (con tamaño y fechas del mismo stat)
+        archivo_obj = ArchivoDescargado.desde_ruta(archivo_descargado)
+
+        logger.info(f"Descarga completa: {archivo_descargado}")
+        try:
+            self.indice.registrar_descarga(archivo_descargado, archivo_obj.formato, trabajo.url, info)
+        except (OSError, sqlite3.Error) as e:
+            logger.error(f"No se pudo registrar la descarga en el índice: {e}")
+        trabajo.detalle = archivo_obj.nombre
+        trabajo.ruta = archivo_descargado
+        self.registro.registrar(info.get("id"), formato, archivo_descargado)
+        trabajo.metricas.cerrar_fase()
+        if self.al_completar:
+            self.al_completar(trabajo, archivo_obj)
+        return True
+
+    def progreso_hook(self, trabajo, d):
+        """Corre en el hilo de yt-dlp: actualiza los datos del trabajo y avisa con al_progreso"""
+        try:
+            # Si hay límite total, esta llamada frena el hilo de yt-dlp lo necesario
+            self.ancho_banda.contar_bytes(trabajo, d)
+            trabajo.metricas.contar(d)
+            if d['status'] == 'downloading':
+                if self.al_parcial and d.get('tmpfilename'):
+                    self.al_parcial(trabajo, d['tmpfilename'])
+                porcentaje = d.get('_percent_str', '0.0%')
+                velocidad = d.get('_speed_str', '0.0KiB/s')
+                eta = d.get('_eta_str', 'N/A')
+
+                # Actualizar el progreso del trabajo
+                try:
+                    trabajo.progreso = float(d['_percent_str'].replace('%', '').strip())
+                except (ValueError, KeyError, AttributeError) as e:
+                    # Si hay error al convertir el porcentaje, usar 0
+                    trabajo.progreso = 0
+                    logger.debug(f"Error al procesar porcentaje: {e}")
+
+                trabajo.detalle = f"{porcentaje} | {velocidad} | ETA: {eta}"
+
+            elif d['status'] == 'finished':
+                trabajo.progreso = 100
+                trabajo.detalle = "✅ Descarga completa"
+
+            elif d['status'] == 'error':
+                # Manejar errores específicos del hook
+                error_msg = d.get('error', 'Error desconocido en la descarga')
+                trabajo.detalle = f"❌ Error: {error_msg}"
+                trabajo.progreso = 0
+
+        except KeyError as e:
+            # Si falta alguna clave en el diccionario d
+            error_msg = f"Error en progreso_hook - clave faltante: {e}"
+            logger.warning(error_msg)
+            trabajo.detalle = "⚠️ Error en el progreso de descarga"
+
+        except Exception as e:
+            # Cualquier otro error en el hook
+            error_msg = f"Error inesperado en progreso_hook: {e}"
+            logger.error(error_msg)
+            trabajo.detalle = "⚠️ Error inesperado en el progreso"
+
+        if self.al_progreso:
+            self.al_progreso(trabajo)
+
+    def posproceso_hook(self, trabajo, d):
+        """Tiempo de los posprocesadores de yt-dlp (unir video y audio, mover el archivo)"""
+        if d.get("status") == "started":
+            trabajo.metricas.fase(FASE_POSPROCESO)
+        elif d.get("status") == "finished":
+            trabajo.metricas.cerrar_fase()
+
+    def precargar_metadatos(self, url):
+        """Obtiene la información completa de un video y la deja en cache para la descarga.
+
+        Respeta lo mismo que una descarga: la pausa general por 429, los lugares por sitio
+        (ancho_banda.limites_host) y la pausa entre pedidos del perfil de rendimiento.
+        """
+        if self.cache_metadatos.para_descargar(url) is not None:
+            return
+        opciones = opciones_base()
+        opciones.update({"skip_download": True})
+        pausa = opciones_rendimiento(self.config).get("sleep_interval_requests")
+        if pausa:
+            opciones["sleep_interval_requests"] = pausa
+        self.reintentos.esperar_turno()
+        host = self.ancho_banda.entrar(url)
+        try:
+            with importar_yt_dlp().YoutubeDL(opciones) as ydl:
+                self.cache_metadatos.guardar(url, ydl.extract_info(url, download=False))
+        except Exception as e:
+            # No es grave: la descarga volverá a extraer la información
+            logger.warning(f"No se pudieron precargar los metadatos de {url}: {e}")
+            if clasificar_error(e) == FALLO_LIMITE:
+                self.reintentos.pausar_todos(self.reintentos.espera(FALLO_LIMITE, 1))
+        finally:
+            self.ancho_banda.salir(host)
+
+    def expandir_url(self, url, formato):
+        """Resuelve una URL en la lista de videos que contiene: [(url, titulo), ...]"""
+        if extraer_id_video(url) and not extraer_id_lista(url):
+            # Es un video suelto: si ya está descargado no hace falta pedir nada a la red
+            ya_descargado, _ = self.ya_descargado(url, formato)
+            if ya_descargado:
+                return [(url, None)]
+            # Tampoco si ya se extrajo antes: el título sale de la cache
+            info = self.cache_metadatos.info(url)
+            if info:
+                return [(url, info.get("title"))]
+        opciones = opciones_base()
+        opciones.update({"skip_download": True, "extract_flat": "in_playlist"})
+        with importar_yt_dlp().YoutubeDL(opciones) as ydl:
+            info = ydl.extract_info(url, download=False)
+
+        if info.get("_type") not in ("playlist", "multi_video"):
+            # Video suelto: la extracción ya trae todo lo necesario para descargarlo
+            self.cache_metadatos.guardar(url, info)
+            return [(url, info.get("title"))]
+
+        videos = []
+        for entrada in info.get("entries") or []:
+            if not entrada:
+                continue
+            url_video = entrada.get("webpage_url") or entrada.get("url")
+            if not url_video:
+                continue
+            url_video = limpiar_url_youtube(url_video)
+            videos.append((url_video, entrada.get("title")))
+            self.pool_precarga.submit(self.precargar_metadatos, url_video)
+        logger.info(f"Playlist {url} expandida en {len(videos)} videos")
+        return videos
+
+    def importar_urls(self, urls, formato, cola):
+        """Expande las URLs en paralelo y encola un trabajo por video, respetando el orden.
+
+        Retorna los trabajos de la cola (incluidos los ya descargados, que se muestran como omitidos).
+        """
+        futuros = [self.pool_metadatos.submit(self.expandir_url, url, formato) for url in urls]
+        trabajos = []
+        for url, futuro in zip(urls, futuros):
+            try:
+                videos = futuro.result()
+            except Exception as e:
+                # Se encola igual: la descarga mostrará el error con su detalle
+                logger.error(f"No se pudo analizar la URL {url}: {e}")
+                videos = [(url, None)]
+            for url_video, titulo in videos:
+                ya_descargado, ruta_existente = self.ya_descargado(url_video, formato)
+                if ya_descargado:
+                    trabajos.append(cola.registrar_omitido(url_video, formato, ruta_existente, titulo=titulo))
+                else:
+                    trabajos.append(cola.agregar(url_video, formato, titulo=titulo))
+        return trabajos
@@ -0,0 +1,144 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+import logging
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+def calcular_sha256(ruta):
+    """Suma SHA-256 de un archivo, leído por bloques"""
+    suma = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b""):
+            suma.update(bloque)
+    return suma.hexdigest()
+
+
+def carpeta_cache_ffmpeg():
+    """Carpeta persistente (no se borra al limpiar temporales) para los binarios de ffmpeg"""
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "convertidor", "ffmpeg")
+
+
+def ruta_base():
+    """Carpeta con los recursos empaquetados (bin/bin.rar, bin/unrar.exe)"""
+    if getattr(sys, 'frozen', False):  # Si está en .exe
+        return sys._MEIPASS
+    # Si está en Python normal
+    return os.path.abspath(".")
+
+
+class ErrorFFmpeg(Exception):
+    """No se pudo dejar ffmpeg listo para usar"""
+
+
+class GestorFFmpeg:
+    """Deja ffmpeg listo una sola vez, en segundo plano, para todos los workers"""
+
+    MANIFIESTO = "manifiesto.json"
+
+    def __init__(self, base_path, carpeta_cache):
+        self.base_path = base_path
+        self.carpeta_cache = carpeta_cache
+        self.listo = Future()  # resultado: carpeta que contiene ffmpeg
+
+    def iniciar(self):
+        threading.Thread(target=self._preparar, name="ffmpeg", daemon=True).start()
+
+    def ruta(self, timeout=None):
+        """Espera a que ffmpeg esté listo y retorna su carpeta (relanza el error si falló)"""
+        return self.listo.result(timeout)
+
+    def _preparar(self):
+        try:
+            carpeta = self._resolver()
+            logger.info(f"ffmpeg listo en {carpeta}")
+            self.listo.set_result(carpeta)
+        except Exception as e:
+            logger.error(f"No se pudo preparar ffmpeg: {e}")
+            self.listo.set_exception(e)
+
+    def _resolver(self):
+        rar_path = os.path.join(self.base_path, "bin", "bin.rar")
+        # En Linux/macOS se usa el ffmpeg del sistema; bin.rar trae binarios de Windows
+        if os.name != "nt" or not os.path.exists(rar_path):
+            ffmpeg_sistema = shutil.which("ffmpeg")
+            if ffmpeg_sistema:
+                return os.path.dirname(ffmpeg_sistema)
+            if os.name != "nt":
+                raise FileNotFoundError("ffmpeg no está instalado o no está en el PATH")
+
+        # Carpeta versionada por el contenido de bin.rar: un bin.rar nuevo no reutiliza binarios viejos
+        suma_rar = calcular_sha256(rar_path)
+        carpeta_version = os.path.join(self.carpeta_cache, suma_rar[:16])
+        if self._verificar(carpeta_version):
+            return os.path.dirname(os.path.join(carpeta_version, self._leer_manifiesto(carpeta_version)["ffmpeg"]))
+
+        logger.info(f"Extrayendo ffmpeg de {rar_path} en {carpeta_version}")
+        # Solo hace falta en Windows, y solo la primera vez: se importa recién acá
+        import rarfile
+        rarfile.UNRAR_TOOL = os.path.join(self.base_path, "bin", "unrar.exe")  # Usa unrar.exe local
+        temporal = tempfile.mkdtemp(prefix="extrayendo_", dir=self._crear_cache())
+        try:
+            try:
+                with rarfile.RarFile(rar_path) as rf:
+                    logger.info(f"Archivos en el RAR: {rf.namelist()}")
+                    rf.extractall(temporal)
+            except rarfile.BadRarFile:
+                raise ErrorFFmpeg("El archivo bin.rar está corrupto o no se puede leer")
+
+            archivos = {}
+            ffmpeg_relativo = None
+            for carpeta_actual, _, nombres in os.walk(temporal):
+                for nombre in nombres:
+                    ruta = os.path.join(carpeta_actual, nombre)
+                    relativo = os.path.relpath(ruta, temporal)
+                    archivos[relativo] = {"tamano": os.path.getsize(ruta), "sha256": calcular_sha256(ruta)}
+                    if nombre.lower() == "ffmpeg.exe":
+                        ffmpeg_relativo = relativo
+            if not ffmpeg_relativo:
+                raise FileNotFoundError("No se encontró ffmpeg.exe dentro de bin.rar")
+
+            with open(os.path.join(temporal, self.MANIFIESTO), "w", encoding="utf-8") as f:
+                json.dump({"rar_sha256": suma_rar, "ffmpeg": ffmpeg_relativo, "archivos": archivos}, f, indent=4)
+            # Recién cuando todo está extraído y verificado pasa a ser la versión válida
+            shutil.rmtree(carpeta_version, ignore_errors=True)
+            os.replace(temporal, carpeta_version)
+        finally:
+            shutil.rmtree(temporal, ignore_errors=True)
+        return os.path.dirname(os.path.join(carpeta_version, ffmpeg_relativo))
+
+    def _crear_cache(self):
+        os.makedirs(self.carpeta_cache, exist_ok=True)
+        return self.carpeta_cache
+
+    def _leer_manifiesto(self, carpeta_version):
+        with open(os.path.join(carpeta_version, self.MANIFIESTO), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _verificar(self, carpeta_version):
+        """Comprueba que la extracción previa esté completa (tamaños del manifiesto) y que ffmpeg.exe
+        no haya cambiado (SHA-256: un archivo corrupto o reemplazado puede tener el mismo tamaño)"""
+        try:
+            manifiesto = self._leer_manifiesto(carpeta_version)
+            archivos = manifiesto["archivos"]
+            if not all(os.path.getsize(os.path.join(carpeta_version, relativo)) == datos["tamano"]
+                       for relativo, datos in archivos.items()):
+                return False
+            ffmpeg_relativo = manifiesto["ffmpeg"]
+            suma = calcular_sha256(os.path.join(carpeta_version, ffmpeg_relativo))
+            if suma != archivos[ffmpeg_relativo]["sha256"]:
+                logger.warning(f"{ffmpeg_relativo} no coincide con el manifiesto: se extrae de nuevo")
+                return False
+            return True
+        except (OSError, ValueError, KeyError):
+            return False
@@ -0,0 +1,16 @@
+import logging
+import sys
+
+LOG_FILE = "convertidor_errors.log"
+
+
+def configurar_logging(consola=sys.stdout, archivo=LOG_FILE):
+    """Configura el log de la aplicación en un archivo y en la consola indicada"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(archivo, encoding='utf-8'),
+            logging.StreamHandler(consola)
+        ]
+    )
@@ -0,0 +1,150 @@
+import re
+import json
+import time
+import zlib
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+
+from .urls import extraer_id_video
+
+logger = logging.getLogger(__name__)
+
+TTL_METADATOS = 24 * 3600  # segundos que se conserva la información de un video en disco
+# Si las URLs de los formatos no dicen cuándo vencen, se asume este tiempo desde que se extrajeron
+TTL_URLS_SIN_VENCIMIENTO = 30 * 60
+MARGEN_VENCIMIENTO = 5 * 60  # no empezar una descarga con URLs que vencen en menos de esto
+
+# "expire=1700000000" en la query o "/expire/1700000000/" en las URLs de manifiesto de YouTube
+_PATRON_VENCIMIENTO = re.compile(r"[?&/]expire[=/](\d{9,11})")
+
+
+def vencimiento_urls(info, guardado):
+    """Momento (epoch) en que vence la primera URL firmada de los formatos de un video"""
+    vencimientos = []
+    for formato in info.get("formats") or []:
+        for clave in ("url", "manifest_url", "fragment_base_url"):
+            coincidencia = _PATRON_VENCIMIENTO.search(formato.get(clave) or "")
+            if coincidencia:
+                vencimientos.append(int(coincidencia.group(1)))
+                break
+    return min(vencimientos) if vencimientos else guardado + TTL_URLS_SIN_VENCIMIENTO
+
+
+class CacheMetadatos:
+    """Cache de la información que devuelve extract_info, por video.
+
+    Las entradas más usadas quedan en memoria (LRU); con archivo, además se guardan
+    comprimidas en SQLite y sobreviven entre ejecuciones hasta que pasa el ttl.
+    Título, duración y miniatura sirven mientras dure el ttl; para descargar, en cambio,
+    solo se usa la información cuyas URLs firmadas todavía no vencieron.
+    """
+
+    # Claves muy pesadas que no hacen falta para descargar
+    CLAVES_DESCARTADAS = ("automatic_captions", "subtitles", "heatmap")
+    # Claves que yt-dlp agrega al descargar y que no deben reutilizarse en otra descarga
+    CLAVES_DE_DESCARGA = ("requested_downloads", "requested_formats", "requested_subtitles",
+                          "filepath", "_filename", "filename")
+
+    def __init__(self, max_entradas=500, archivo=None, ttl=TTL_METADATOS):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._datos = OrderedDict()  # clave -> (guardado, vence, info)
+        self._lock = threading.Lock()
+        self._conexion = None
+        if archivo:
+            self._conexion = sqlite3.connect(archivo, check_same_thread=False)
+            with self._conexion:
+                self._conexion.execute("""
+                    CREATE TABLE IF NOT EXISTS metadatos (
+                        clave TEXT PRIMARY KEY,
+                        guardado REAL NOT NULL,
+                        vence REAL NOT NULL,
+                        titulo TEXT,
+                        duracion REAL,
+                        miniatura TEXT,
+                        info BLOB NOT NULL
+                    )""")
+                borrados = self._conexion.execute("DELETE FROM metadatos WHERE guardado < ?",
+                                                  (time.time() - ttl,)).rowcount
+            if borrados:
+                logger.info(f"Cache de metadatos: {borrados} entradas vencidas eliminadas")
+
+    @staticmethod
+    def _clave(url):
+        return extraer_id_video(url) or url
+
+    def __contains__(self, url):
+        return self._buscar(url) is not None
+
+    def guardar(self, url, info):
+        """Guarda la información de un video, descartando las entradas más viejas"""
+        info = {k: v for k, v in info.items()
+                if k not in self.CLAVES_DESCARTADAS and k not in self.CLAVES_DE_DESCARGA and not k.startswith("__")}
+        guardado = time.time()
+        vence = vencimiento_urls(info, guardado)
+        clave = self._clave(url)
+        with self._lock:
+            self._guardar_en_memoria(clave, (guardado, vence, info))
+            if self._conexion is None:
+                return
+            try:
+                with self._conexion:
+                    self._conexion.execute(
+                        "INSERT OR REPLACE INTO metadatos VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (clave, guardado, vence, info.get("title"), info.get("duration"), info.get("thumbnail"),
+                         zlib.compress(json.dumps(info, ensure_ascii=False, default=str).encode("utf-8"))))
+            except sqlite3.Error as e:
+                logger.warning(f"No se pudo guardar en disco la información de {url}: {e}")
+
+    def info(self, url):
+        """Información guardada de un video (para título, duración, etc.), o None"""
+        entrada = self._buscar(url)
+        return entrada[2] if entrada else None
+
+    def para_descargar(self, url):
+        """Información con la que se puede descargar sin volver a extraer, o None si las URLs vencieron"""
+        entrada = self._buscar(url)
+        if entrada is None or entrada[1] - MARGEN_VENCIMIENTO < time.time():
+            return None
+        return entrada[2]
+
+    def descartar(self, url):
+        """Olvida la información de un video (por ejemplo, si sus URLs dieron 403)"""
+        clave = self._clave(url)
+        with self._lock:
+            self._datos.pop(clave, None)
+            if self._conexion is not None:
+                with self._conexion:
+                    self._conexion.execute("DELETE FROM metadatos WHERE clave = ?", (clave,))
+
+    def _guardar_en_memoria(self, clave, entrada):
+        self._datos[clave] = entrada
+        self._datos.move_to_end(clave)
+        while len(self._datos) > self.max_entradas:
+            self._datos.popitem(last=False)
+
+    def _buscar(self, url):
+        """Retorna (guardado, vence, info) de un video que no pasó el ttl, o None"""
+        clave = self._clave(url)
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None and self._conexion is not None:
+                fila = self._conexion.execute("SELECT guardado, vence, info FROM metadatos WHERE clave = ?",
+                                              (clave,)).fetchone()
+                if fila:
+                    try:
+                        entrada = (fila[0], fila[1], json.loads(zlib.decompress(fila[2])))
+                    except (zlib.error, ValueError) as e:
+                        logger.warning(f"Se descarta la información guardada de {url}: {e}")
+                        entrada = None
+                    if entrada:
+                        self._guardar_en_memoria(clave, entrada)
+            if entrada is None:
+                return None
+            if entrada[0] < time.time() - self.ttl:
+                self._datos.pop(clave, None)
+                return None
+            self._datos.move_to_end(clave)
+            return entrada
@@ -0,0 +1,233 @@
+"""Métricas por trabajo: cuánto tardó cada fase, bytes, velocidad, reintentos y espera en la cola.
+
+Se configura en la sección "metricas" de config.json:
+
+    "metricas": {"archivo": "metricas.jsonl", "puerto_prometheus": 9464}
+
+Con archivo, cada trabajo terminado agrega una línea JSON; con puerto_prometheus se sirven
+los totales en http://127.0.0.1:PUERTO/metrics en el formato de texto de Prometheus.
+Vacíos, no se escribe ni se sirve nada (el panel de la ventana funciona igual).
+"""
+import json
+import time
+import logging
+import threading
+from collections import Counter, deque
+
+logger = logging.getLogger(__name__)
+
+# Fases en el orden en que las atraviesa un trabajo
+FASE_COLA = "espera_cola"                # en la cola hasta que un worker lo toma
+FASE_LIMITES = "espera_limites"          # pausa por 429 o lugar por sitio (ancho_banda.limites_host)
+FASE_METADATOS = "metadatos"             # extracción de la página del video
+FASE_DESCARGA = "descarga"               # bytes de los streams
+FASE_POSPROCESO = "posproceso"           # posprocesadores de yt-dlp (unir video y audio)
+FASE_REINTENTO = "espera_reintento"      # esperas entre reintentos
+FASE_ESPERA_CONVERSION = "espera_conversion"  # en la cola de la etapa de conversión
+FASE_CONVERSION = "conversion"           # ffmpeg a mp3 o remux
+FASE_FINALIZAR = "finalizar"             # índice y registro de duplicados
+FASES = (FASE_COLA, FASE_LIMITES, FASE_METADATOS, FASE_DESCARGA, FASE_POSPROCESO, FASE_REINTENTO,
+         FASE_ESPERA_CONVERSION, FASE_CONVERSION, FASE_FINALIZAR)
+
+MUESTRAS_PERCENTIL = 500  # duraciones recientes por fase que se guardan para el p95
+
+
+class MetricasTrabajo:
+    """Tiempos y bytes de un trabajo. Hay una sola fase abierta a la vez: abrir otra cierra la anterior"""
+
+    def __init__(self):
+        self.encolado = time.monotonic()
+        self.fases = {}  # fase -> segundos acumulados (una fase puede repetirse en cada reintento)
+        self.velocidad_pico = 0.0
+        self._fase = None
+        self._inicio_fase = None
+        self._bytes_archivo = {}  # archivo -> [bytes al primer aviso, bytes al último]
+        self._lock = threading.Lock()  # los fragmentos en paralelo avisan desde varios hilos
+
+    def empezar(self):
+        """Un worker tomó el trabajo: termina la espera en la cola"""
+        self.fases[FASE_COLA] = time.monotonic() - self.encolado
+
+    def fase(self, nombre):
+        with self._lock:
+            self._cerrar()
+            self._fase, self._inicio_fase = nombre, time.monotonic()
+
+    def cerrar_fase(self):
+        with self._lock:
+            self._cerrar()
+
+    def _cerrar(self):
+        if self._fase:
+            self.fases[self._fase] = self.fases.get(self._fase, 0.0) + time.monotonic() - self._inicio_fase
+            self._fase = None
+
+    def contar(self, d):
+        """Se llama desde el hook de progreso de yt-dlp"""
+        archivo = d.get("filename")
+        descargados = d.get("downloaded_bytes")
+        if d.get("status") == "downloading":
+            if archivo not in self._bytes_archivo:
+                # Lo que ya traía un .part retomado no se descargó ahora
+                self._bytes_archivo[archivo] = [descargados or 0, descargados or 0]
+                self.fase(FASE_DESCARGA)
+            elif descargados is not None:
+                self._bytes_archivo[archivo][1] = descargados
+            self.velocidad_pico = max(self.velocidad_pico, d.get("speed") or 0.0)
+        elif d.get("status") == "finished":
+            total = d.get("total_bytes") or descargados or 0
+            primeros = self._bytes_archivo.setdefault(archivo, [total, total])
+            primeros[1] = max(primeros[1], total)
+            self.cerrar_fase()
+
+    @property
+    def bytes(self):
+        return sum(max(0, ultimo - primero) for primero, ultimo in self._bytes_archivo.values())
+
+    def a_dict(self, trabajo):
+        """Una línea del archivo de métricas"""
+        bytes_descargados = self.bytes
+        segundos_descarga = self.fases.get(FASE_DESCARGA)
+        return {
+            "id": trabajo.id,
+            "url": trabajo.url,
+            "formato": trabajo.formato,
+            "estado": trabajo.estado,
+            "hora": time.time(),
+            "total_segundos": round(time.monotonic() - self.encolado, 3),
+            "fases": {fase: round(segundos, 3) for fase, segundos in self.fases.items()},
+            "bytes": bytes_descargados,
+            "velocidad_media": round(bytes_descargados / segundos_descarga) if segundos_descarga else None,
+            "velocidad_pico": round(self.velocidad_pico),
+            "reintentos": trabajo.reintentos,
+        }
+
+
+class SumideroJSONL:
+    """Agrega una línea JSON por trabajo terminado"""
+
+    def __init__(self, archivo):
+        self.archivo = archivo
+        self._lock = threading.Lock()
+
+    def escribir(self, datos):
+        with self._lock:
+            with open(self.archivo, "a", encoding="utf-8") as f:
+                f.write(json.dumps(datos, ensure_ascii=False) + "\n")
+
+
+class RegistroMetricas:
+    """Junta las métricas de los trabajos terminados, las pasa a los sumideros y lleva los totales.
+
+    Un sumidero es cualquier objeto con escribir(datos); agregar_sumidero() suma otros.
+    """
+
+    def __init__(self, config):
+        seccion = config.get("metricas") or {}
+        self.sumideros = [SumideroJSONL(seccion["archivo"])] if seccion.get("archivo") else []
+        self.puerto_prometheus = seccion.get("puerto_prometheus")
+        self._lock = threading.Lock()
+        self._servidor = None
+        self.por_estado = Counter()
+        self.bytes = 0
+        self.reintentos = 0
+        self.velocidad_pico = 0.0
+        self._fases = {}  # fase -> [suma, cantidad, máximo, duraciones recientes]
+
+    def agregar_sumidero(self, sumidero):
+        self.sumideros.append(sumidero)
+
+    def iniciar(self):
+        """Levanta el endpoint de Prometheus en localhost, si está configurado"""
+        if not self.puerto_prometheus:
+            return
+        # Se importa recién acá: http.server agrega bastante al arranque y casi nunca se usa
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+        registro = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                cuerpo = registro.texto_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, formato, *args):
+                logger.debug(formato % args)
+
+        try:
+            self._servidor = ThreadingHTTPServer(("127.0.0.1", int(self.puerto_prometheus)), Manejador)
+        except OSError as e:
+            logger.error(f"No se pudo abrir el puerto {self.puerto_prometheus} para las métricas: {e}")
+            return
+        self._servidor.daemon_threads = True
+        threading.Thread(target=self._servidor.serve_forever, name="metricas", daemon=True).start()
+        logger.info(f"Métricas en http://127.0.0.1:{self.puerto_prometheus}/metrics")
+
+    def registrar(self, trabajo):
+        """Anota un trabajo terminado (completado o fallido)"""
+        trabajo.metricas.cerrar_fase()
+        datos = trabajo.metricas.a_dict(trabajo)
+        with self._lock:
+            self.por_estado[trabajo.estado] += 1
+            self.bytes += datos["bytes"]
+            self.reintentos += datos["reintentos"]
+            self.velocidad_pico = max(self.velocidad_pico, datos["velocidad_pico"])
+            for fase, segundos in trabajo.metricas.fases.items():
+                acumulado = self._fases.setdefault(fase, [0.0, 0, 0.0, deque(maxlen=MUESTRAS_PERCENTIL)])
+                acumulado[0] += segundos
+                acumulado[1] += 1
+                acumulado[2] = max(acumulado[2], segundos)
+                acumulado[3].append(segundos)
+        for sumidero in self.sumideros:
+            try:
+                sumidero.escribir(datos)
+            except OSError as e:
+                logger.error(f"No se pudieron guardar las métricas del trabajo {trabajo.id}: {e}")
+
+    def resumen(self):
+        """Totales para el panel de estadísticas: trabajos por estado, bytes y tiempos por fase"""
+        with self._lock:
+            fases = {}
+            for fase in sorted(self._fases, key=lambda f: FASES.index(f) if f in FASES else len(FASES)):
+                suma, cantidad, maximo, recientes = self._fases[fase]
+                ordenadas = sorted(recientes)
+                fases[fase] = {"promedio": suma / cantidad, "p95": ordenadas[int(len(ordenadas) * 0.95)],
+                               "maximo": maximo, "total": suma, "cantidad": cantidad}
+            segundos_descarga = fases.get(FASE_DESCARGA, {}).get("total")
+            return {
+                "trabajos": dict(self.por_estado),
+                "bytes": self.bytes,
+                "reintentos": self.reintentos,
+                "velocidad_media": self.bytes / segundos_descarga if segundos_descarga else 0.0,
+                "velocidad_pico": self.velocidad_pico,
+                "fases": fases,
+            }
+
+    def texto_prometheus(self):
+        resumen = self.resumen()
+        lineas = ["# HELP convertidor_trabajos_total Trabajos terminados por estado.",
+                  "# TYPE convertidor_trabajos_total counter"]
+        lineas += [f'convertidor_trabajos_total{{estado="{estado}"}} {cantidad}'
+                   for estado, cantidad in resumen["trabajos"].items()]
+        lineas += ["# HELP convertidor_bytes_total Bytes descargados por los trabajos terminados.",
+                   "# TYPE convertidor_bytes_total counter",
+                   f"convertidor_bytes_total {resumen['bytes']}",
+                   "# HELP convertidor_reintentos_total Reintentos después de un error.",
+                   "# TYPE convertidor_reintentos_total counter",
+                   f"convertidor_reintentos_total {resumen['reintentos']}",
+                   "# HELP convertidor_velocidad_pico_bytes Mayor velocidad vista en una descarga.",
+                   "# TYPE convertidor_velocidad_pico_bytes gauge",
+                   f"convertidor_velocidad_pico_bytes {resumen['velocidad_pico']:.0f}",
+                   "# HELP convertidor_fase_segundos Tiempo de los trabajos en cada fase.",
+                   "# TYPE convertidor_fase_segundos summary"]
+        for fase, datos in resumen["fases"].items():
+            lineas.append(f'convertidor_fase_segundos{{fase="{fase}",quantile="0.95"}} {datos["p95"]:.6f}')
+            lineas.append(f'convertidor_fase_segundos_sum{{fase="{fase}"}} {datos["total"]:.6f}')
+            lineas.append(f'convertidor_fase_segundos_count{{fase="{fase}"}} {datos["cantidad"]}')
+        return "\n".join(lineas) + "\n"
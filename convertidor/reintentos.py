@@ -0,0 +1,156 @@
+"""Política de reintentos: clasifica los errores de descarga y decide cuánto esperar antes de volver a probar.
+
+Cada clase de fallo tiene su cantidad de intentos y su espera exponencial (con jitter).
+Se puede ajustar en config.json:
+
+    "reintentos": {
+        "403": {"intentos": 6, "espera": 10},
+        "cookies_navegador": "firefox"
+    }
+
+Con "cookies_navegador", ante un 403 se vuelven a leer las cookies del navegador
+(yt-dlp las guarda de nuevo en cookies.txt).
+"""
+import re
+import time
+import random
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Clases de fallo
+FALLO_PROHIBIDO = "403"
+FALLO_LIMITE = "429"
+FALLO_RED = "red"
+FALLO_EXTRACCION = "extraccion"
+FALLO_PROCESAMIENTO = "procesamiento"
+FALLO_PERMANENTE = "permanente"  # video privado, borrado, etc.: no tiene sentido reintentar
+
+DESCRIPCION_FALLO = {
+    FALLO_PROHIBIDO: "HTTP 403",
+    FALLO_LIMITE: "demasiados pedidos",
+    FALLO_RED: "error de red",
+    FALLO_EXTRACCION: "error de extracción",
+    FALLO_PROCESAMIENTO: "error de procesamiento",
+    FALLO_PERMANENTE: "error permanente",
+}
+
+# intentos = reintentos después del primer fallo; espera y maximo en segundos
+POLITICAS_REINTENTO = {
+    FALLO_PROHIBIDO: {"intentos": 4, "espera": 5, "maximo": 120},
+    FALLO_LIMITE: {"intentos": 5, "espera": 30, "maximo": 600},
+    FALLO_RED: {"intentos": 5, "espera": 3, "maximo": 120},
+    FALLO_EXTRACCION: {"intentos": 2, "espera": 5, "maximo": 60},
+    FALLO_PROCESAMIENTO: {"intentos": 1, "espera": 1, "maximo": 5},
+    FALLO_PERMANENTE: {"intentos": 0, "espera": 0, "maximo": 0},
+}
+
+# Clientes de YouTube que se prueban, en orden, cuando el actual recibe 403
+CLIENTES_ALTERNATIVOS = ("tv", "web_safari", "ios", "android")
+
+_PATRONES_FALLO = (
+    # 4xx del servidor (salvo 403, 408 y 429, que tienen su propia clase o son pasajeros) no cambian reintentando
+    (FALLO_PERMANENTE, re.compile(r"private video|video unavailable|has been removed|not available in your country"
+                                  r"|copyright|members-only|unsupported url|is not a valid url"
+                                  r"|http error 4(?!03|08|29)\d\d", re.IGNORECASE)),
+    (FALLO_PROHIBIDO, re.compile(r"\b403\b|forbidden", re.IGNORECASE)),
+    (FALLO_LIMITE, re.compile(r"\b429\b|too many requests|rate.?limit", re.IGNORECASE)),
+    (FALLO_RED, re.compile(r"timed? ?out|connection (reset|refused|aborted)|temporary failure|name resolution"
+                           r"|network is unreachable|incompleteread|remote end closed|\b50[234]\b", re.IGNORECASE)),
+)
+
+
+def _clase_conocida(error):
+    """Clase de fallo por el texto o el tipo del error (o de su causa), o None si no hay pistas"""
+    # DownloadError y ExtractorError guardan la excepción original en exc_info
+    causa = (getattr(error, "exc_info", None) or (None, None))[1]
+    if isinstance(causa, BaseException) and causa is not error:
+        clase = _clase_conocida(causa)
+        if clase:
+            return clase
+    mensaje = str(error)
+    for clase, patron in _PATRONES_FALLO:
+        if patron.search(mensaje):
+            return clase
+    tipos = {t.__name__ for t in type(error).__mro__}
+    if "PostProcessingError" in tipos or isinstance(error, RuntimeError):
+        return FALLO_PROCESAMIENTO
+    if "ExtractorError" in tipos:
+        return FALLO_EXTRACCION
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return FALLO_RED
+    return None
+
+
+def clasificar_error(error):
+    """Clase de fallo de una excepción de yt-dlp, de ffmpeg o de la red"""
+    clase = _clase_conocida(error)
+    if clase:
+        return clase
+    if "DownloadError" in {t.__name__ for t in type(error).__mro__}:
+        # Sin más pistas que el envoltorio de yt-dlp se trata como falla de red
+        return FALLO_RED
+    return FALLO_PERMANENTE
+
+
+class PoliticaReintentos:
+    """Decide si un trabajo se reintenta, cuánto espera y qué se cambia en el próximo intento.
+
+    Un 429 pausa a todos los trabajos: cualquier descarga que empiece espera a que pase.
+    """
+
+    def __init__(self, config):
+        seccion = dict(config.get("reintentos") or {})
+        self.cookies_navegador = seccion.pop("cookies_navegador", None)
+        self.politicas = {clase: dict(politica) for clase, politica in POLITICAS_REINTENTO.items()}
+        for clase, ajustes in seccion.items():
+            if clase in self.politicas and isinstance(ajustes, dict):
+                self.politicas[clase].update(ajustes)
+            else:
+                logger.warning(f"Se ignora reintentos.{clase} en la configuración")
+        self._pausa_hasta = 0.0
+        self._lock = threading.Lock()
+
+    def puede_reintentar(self, clase, intento):
+        """intento = cuántas veces falló ya el trabajo con esta clase de error"""
+        return intento <= self.politicas[clase]["intentos"]
+
+    def espera(self, clase, intento):
+        """Espera exponencial con jitter: espera * 2^(intento-1), entre la mitad y una vez y media"""
+        politica = self.politicas[clase]
+        base = min(politica["maximo"], politica["espera"] * 2 ** (intento - 1))
+        return base * random.uniform(0.5, 1.5)
+
+    def pausar_todos(self, segundos):
+        """Hace que las próximas descargas esperen (el servidor pidió bajar el ritmo)"""
+        with self._lock:
+            self._pausa_hasta = max(self._pausa_hasta, time.monotonic() + segundos)
+
+    def esperar_turno(self):
+        """Bloquea mientras dure una pausa general por 429"""
+        while True:
+            with self._lock:
+                restante = self._pausa_hasta - time.monotonic()
+            if restante <= 0:
+                return
+            time.sleep(min(restante, 1.0))
+
+    def ajustar_opciones(self, opciones, clase, intento):
+        """Modifica las opciones de yt-dlp para el próximo intento según el error anterior"""
+        if clase in (FALLO_PROHIBIDO, FALLO_EXTRACCION):
+            # Otro cliente de YouTube suele tener otras URLs firmadas y otros límites
+            cliente = CLIENTES_ALTERNATIVOS[(intento - 1) % len(CLIENTES_ALTERNATIVOS)]
+            opciones["extractor_args"] = {"youtube": {"player_client": [cliente]}}
+            if clase == FALLO_PROHIBIDO and self.cookies_navegador:
+                opciones["cookiesfrombrowser"] = (self.cookies_navegador,)
+        elif clase == FALLO_LIMITE:
+            # Más lento: un fragmento a la vez, pausas entre pedidos y la mitad de velocidad cada vez
+            opciones["concurrent_fragment_downloads"] = 1
+            opciones["sleep_interval_requests"] = max(opciones.get("sleep_interval_requests") or 0, 2 * intento)
+            # ratelimit ya trae lo que dejó el reintento anterior: se parte a la mitad una vez por intento
+            limite = opciones.get("ratelimit") or 4 * 1024 ** 2
+            opciones["ratelimit"] = max(256 * 1024, limite // 2)
+        elif clase == FALLO_RED:
+            opciones["socket_timeout"] = 20 + 10 * intento
+        return opciones
@@ -0,0 +1,117 @@
+"""Perfiles de rendimiento: traducen la sección "rendimiento" de config.json a opciones de yt-dlp.
+
+Ejemplo en config.json:
+
+    "rendimiento": {
+        "perfil": "maximo",
+        "concurrent_fragment_downloads": 16
+    }
+
+Las claves sueltas pisan las del perfil elegido.
+"""
+import re
+import shutil
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+PERFIL_POR_DEFECTO = "equilibrado"
+
+PERFILES_RENDIMIENTO = {
+    # Saturar el enlace: muchos fragmentos en paralelo y aria2c si está instalado
+    "maximo": {
+        "concurrent_fragment_downloads": 8,
+        "http_chunk_size": "10M",
+        "external_downloader": "auto",
+        "external_downloader_args": ["-x", "16", "-s", "16", "-k", "1M"],
+        "retries": 10,
+        "fragment_retries": 10,
+    },
+    "equilibrado": {
+        "concurrent_fragment_downloads": 4,
+        "http_chunk_size": "10M",
+        "external_downloader": None,
+        "retries": 10,
+        "fragment_retries": 10,
+    },
+    # No llamar la atención: un fragmento a la vez, velocidad limitada y pausas entre pedidos
+    "moderado": {
+        "concurrent_fragment_downloads": 1,
+        "http_chunk_size": "1M",
+        "external_downloader": None,
+        "ratelimit": "2M",
+        "sleep_interval": 2,
+        "max_sleep_interval": 6,
+        "sleep_interval_requests": 1,
+        "retries": 5,
+        "fragment_retries": 5,
+    },
+}
+
+# Claves que se pasan tal cual a yt-dlp
+OPCIONES_DIRECTAS = ("concurrent_fragment_downloads", "retries", "fragment_retries",
+                     "sleep_interval", "max_sleep_interval", "sleep_interval_requests")
+# Claves que aceptan tamaños como "10M" o "512K"
+OPCIONES_TAMANO = ("http_chunk_size", "ratelimit", "throttledratelimit")
+
+_UNIDADES = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parsear_tamano(valor):
+    """Convierte 10485760, "10M" o "512K" a bytes (None si no hay valor)"""
+    if valor is None or valor == "":
+        return None
+    if isinstance(valor, (int, float)):
+        return int(valor)
+    coincidencia = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?)i?B?\s*", str(valor), re.IGNORECASE)
+    if not coincidencia:
+        raise ValueError(f"Tamaño inválido: {valor!r}")
+    return int(float(coincidencia.group(1)) * _UNIDADES[coincidencia.group(2).upper()])
+
+
+@lru_cache(maxsize=None)
+def ruta_aria2c():
+    """Ruta de aria2c si está en el PATH (se busca una sola vez)"""
+    ruta = shutil.which("aria2c")
+    if ruta:
+        logger.info(f"aria2c detectado en {ruta}")
+    return ruta
+
+
+def ajustes_rendimiento(config):
+    """Ajustes efectivos: el perfil elegido más las claves que se pisen en config.json"""
+    seccion = dict(config.get("rendimiento") or {})
+    nombre = seccion.pop("perfil", PERFIL_POR_DEFECTO)
+    if nombre not in PERFILES_RENDIMIENTO:
+        logger.warning(f"Perfil de rendimiento desconocido '{nombre}', se usa '{PERFIL_POR_DEFECTO}'")
+        nombre = PERFIL_POR_DEFECTO
+    ajustes = dict(PERFILES_RENDIMIENTO[nombre])
+    ajustes.update(seccion)
+    return ajustes
+
+
+def opciones_rendimiento(config):
+    """Opciones de yt-dlp que corresponden a la sección "rendimiento" de la configuración"""
+    ajustes = ajustes_rendimiento(config)
+    opciones = {}
+    for clave in OPCIONES_DIRECTAS:
+        if ajustes.get(clave) is not None:
+            opciones[clave] = ajustes[clave]
+    for clave in OPCIONES_TAMANO:
+        try:
+            tamano = parsear_tamano(ajustes.get(clave))
+        except ValueError as e:
+            logger.warning(f"Se ignora rendimiento.{clave}: {e}")
+            continue
+        if tamano:
+            opciones[clave] = tamano
+
+    externo = ajustes.get("external_downloader")
+    if externo == "auto":
+        externo = "aria2c" if ruta_aria2c() else None
+    if externo:
+        opciones["external_downloader"] = {"default": externo}
+        if ajustes.get("external_downloader_args"):
+            opciones["external_downloader_args"] = {externo: list(ajustes["external_downloader_args"])}
+    return opciones
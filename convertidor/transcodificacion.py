@@ -0,0 +1,212 @@
+"""Etapa de conversión separada de la descarga.
+
+El worker de descarga deja el audio original en disco y sigue con la próxima URL;
+la conversión corre acá, con tantas conversiones simultáneas como núcleos haya.
+
+Los mp3 pueden pasar además por un posproceso, configurado en la sección "posproceso"
+de config.json y hecho en la misma pasada de ffmpeg que la conversión:
+
+    "posproceso": {
+        "recortar_silencio": true,
+        "normalizar": true,
+        "etiquetas": true,
+        "portada": true
+    }
+
+recortar_silencio saca el silencio del principio y del final (más bajo que umbral_silencio);
+los silencios internos no se tocan.
+normalizar aplica loudnorm (EBU R128, en una sola pasada) con los valores de "loudnorm",
+etiquetas escribe título, artista, álbum, año y URL en ID3, y portada incrusta la miniatura.
+"""
+import os
+import subprocess
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Evita que se abra una consola por cada ffmpeg cuando corre desde el .exe sin consola
+CREATIONFLAGS = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+
+def ejecutable_ffmpeg(carpeta_ffmpeg):
+    """Ruta del ejecutable de ffmpeg dentro de su carpeta"""
+    return os.path.join(carpeta_ffmpeg, "ffmpeg.exe" if os.name == "nt" else "ffmpeg")
+
+
+# Qué hacer con el audio descargado
+CONVERSION_NINGUNA = "ninguna"  # ya está en el formato pedido
+CONVERSION_REMUX = "remux"      # mismo códec, otro contenedor: se copia el audio sin recodificar
+CONVERSION_MP3 = "mp3"          # hay que recodificar
+
+# Contenedor propio de cada códec de audio, para copiarlo sin recodificar
+EXTENSION_POR_CODEC = {"mp3": "mp3", "opus": "opus", "mp4a": "m4a", "aac": "m4a"}
+
+POSPROCESO_POR_DEFECTO = {
+    "recortar_silencio": False,
+    "umbral_silencio": "-50dB",
+    "normalizar": False,
+    "loudnorm": "I=-16:TP=-1.5:LRA=11",
+    "etiquetas": False,
+    "portada": False,
+}
+FRECUENCIA_POR_DEFECTO = 44100  # loudnorm sale a 192 kHz si no se le indica otra
+VENTANA_FINAL = 30  # segundos del final que se invierten para recortarles el silencio
+
+
+def planear_conversion(formato, info, origen):
+    """Decide cómo llegar del archivo descargado al formato pedido: (conversión, destino)"""
+    extension = os.path.splitext(origen)[1][1:].lower()
+    codec = (info.get("acodec") or "").split(".")[0].lower()
+    base = os.path.splitext(origen)[0]
+
+    if formato == "mp3":
+        if extension == "mp3":
+            return CONVERSION_NINGUNA, origen
+        if codec == "mp3":
+            return CONVERSION_REMUX, base + ".mp3"
+        return CONVERSION_MP3, base + ".mp3"
+
+    # Audio original: solo se cambia de contenedor si hace falta (por ejemplo opus dentro de webm)
+    destino_extension = EXTENSION_POR_CODEC.get(codec)
+    if not destino_extension or destino_extension == extension:
+        return CONVERSION_NINGUNA, origen
+    return CONVERSION_REMUX, f"{base}.{destino_extension}"
+
+
+def ajustes_posproceso(config):
+    """Ajustes de la sección "posproceso" con sus valores por defecto, o None si no hay nada activado"""
+    ajustes = dict(POSPROCESO_POR_DEFECTO, **(config.get("posproceso") or {}))
+    if not any(ajustes[clave] for clave in ("recortar_silencio", "normalizar", "etiquetas", "portada")):
+        return None
+    return ajustes
+
+
+def recodifica(ajustes):
+    """True si el posproceso cambia el audio (y entonces no se puede copiar el stream)"""
+    return bool(ajustes and (ajustes["recortar_silencio"] or ajustes["normalizar"]))
+
+
+def portada_descargada(info):
+    """Miniatura que yt-dlp dejó en disco (writethumbnail), si hay alguna"""
+    for miniatura in reversed(info.get("thumbnails") or []):
+        if miniatura.get("filepath") and os.path.exists(miniatura["filepath"]):
+            return miniatura["filepath"]
+    return None
+
+
+def etiquetas_id3(info):
+    """Metadatos de yt-dlp que van como etiquetas del mp3"""
+    fecha = info.get("release_year") or (info.get("release_date") or info.get("upload_date") or "")[:4]
+    etiquetas = {
+        "title": info.get("track") or info.get("title"),
+        "artist": info.get("artist") or info.get("creator") or info.get("uploader") or info.get("channel"),
+        "album": info.get("album"),
+        "date": fecha,
+        "comment": info.get("webpage_url"),
+    }
+    return {clave: str(valor) for clave, valor in etiquetas.items() if valor}
+
+
+def filtro_silencio(umbral, duracion):
+    """Filtro que recorta el silencio del principio y del final de la pista, sin tocar los internos.
+
+    silenceremove solo sabe recortar el principio, así que el final se invierte con areverse,
+    que guarda en memoria todo lo que invierte: en pistas largas se invierten solo los
+    últimos VENTANA_FINAL segundos. Sin duración conocida se recorta solo el principio.
+    """
+    principio = f"silenceremove=start_periods=1:start_threshold={umbral}:start_silence=0.2"
+    if not duracion:
+        return principio
+    if duracion <= VENTANA_FINAL:
+        return f"{principio},areverse,{principio},areverse"
+    corte = f"{duracion - VENTANA_FINAL:.3f}"
+    return (f"asetpts=PTS-STARTPTS,asplit=2[cuerpo][cola];"
+            f"[cola]atrim=start={corte},asetpts=PTS-STARTPTS,areverse,{principio},areverse[final];"
+            f"[cuerpo]atrim=end={corte}[inicio];"
+            f"[inicio][final]concat=n=2:v=0:a=1,{principio}")
+
+
+def argumentos_posproceso(ajustes, info):
+    """Filtros y metadatos del posproceso, para agregar a la misma llamada a ffmpeg"""
+    argumentos = []
+    filtros = []
+    if ajustes["recortar_silencio"]:
+        filtros.append(filtro_silencio(ajustes["umbral_silencio"], info.get("duration")))
+    if ajustes["normalizar"]:
+        filtros.append(f"loudnorm={ajustes['loudnorm']}")
+        argumentos += ["-ar", str(info.get("asr") or FRECUENCIA_POR_DEFECTO)]
+    if filtros:
+        argumentos += ["-af", ",".join(filtros)]
+    if ajustes["etiquetas"]:
+        for clave, valor in etiquetas_id3(info).items():
+            argumentos += ["-metadata", f"{clave}={valor}"]
+    return argumentos
+
+
+def _ejecutar_ffmpeg(carpeta_ffmpeg, origen, destino, argumentos, portada=None):
+    """Corre ffmpeg hacia un temporal y lo renombra al final; borra el original (y la portada)"""
+    temporal = f"{destino}.convirtiendo{os.path.splitext(destino)[1]}"
+    if portada:
+        # La imagen entra como segunda entrada y queda como tapa (APIC) del mp3
+        entradas = ["-i", origen, "-i", portada, "-map", "0:a:0", "-map", "1:v:0", "-c:v", "mjpeg",
+                    "-disposition:v", "attached_pic", "-metadata:s:v", "comment=Cover (front)"]
+    else:
+        entradas = ["-i", origen, "-vn"]
+    comando = [
+        ejecutable_ffmpeg(carpeta_ffmpeg), "-y", "-hide_banner", "-loglevel", "error",
+        *entradas, *argumentos, temporal,
+    ]
+    resultado = subprocess.run(comando, capture_output=True, text=True, creationflags=CREATIONFLAGS)
+    if resultado.returncode != 0:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise RuntimeError(f"ffmpeg terminó con código {resultado.returncode}: {resultado.stderr.strip()}")
+    os.replace(temporal, destino)
+    if os.path.abspath(origen) != os.path.abspath(destino):
+        os.remove(origen)
+    if portada:
+        os.remove(portada)
+    return destino
+
+
+def convertir_a_mp3(carpeta_ffmpeg, origen, destino, calidad="192"):
+    """Convierte un archivo de audio (o video) a mp3 y borra el original"""
+    return _ejecutar_ffmpeg(carpeta_ffmpeg, origen, destino, ["-codec:a", "libmp3lame", "-b:a", f"{calidad}k"])
+
+
+def remuxear_audio(carpeta_ffmpeg, origen, destino):
+    """Pasa el audio a otro contenedor copiando el stream, sin recodificar"""
+    return _ejecutar_ffmpeg(carpeta_ffmpeg, origen, destino, ["-codec:a", "copy"])
+
+
+def procesar_mp3(carpeta_ffmpeg, origen, destino, ajustes, info, recodificar=True, calidad="192"):
+    """Conversión y posproceso en una sola pasada: se decodifica y se codifica una vez por archivo.
+
+    Si el origen ya es mp3 y el posproceso no toca el audio (solo etiquetas o portada),
+    el stream se copia. destino puede ser el mismo origen.
+    """
+    if recodificar or recodifica(ajustes):
+        codec = ["-codec:a", "libmp3lame", "-b:a", f"{calidad}k"]
+    else:
+        codec = ["-codec:a", "copy"]
+    portada = portada_descargada(info) if ajustes["portada"] else None
+    return _ejecutar_ffmpeg(carpeta_ffmpeg, origen, destino,
+                            codec + argumentos_posproceso(ajustes, info) + ["-id3v2_version", "3"], portada)
+
+
+class EtapaTranscodificacion:
+    """Pool de conversiones con ffmpeg, independiente de los workers de descarga.
+
+    Cada conversión es un proceso ffmpeg aparte, así que un pool de hilos del tamaño
+    de la cantidad de núcleos ya reparte el trabajo entre todas las CPUs.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or os.cpu_count() or 2
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="conversion")
+        logger.info(f"Etapa de conversión con {self.max_workers} conversiones simultáneas")
+
+    def enviar(self, funcion, *args):
+        """Encola una conversión y retorna su Future"""
+        return self._pool.submit(funcion, *args)
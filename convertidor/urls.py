@@ -0,0 +1,75 @@
+import re
+import csv
+from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
+
+
+def limpiar_url_youtube(url):
+    # Parsear la URL
+    parsed_url = urlparse(url)
+
+    # Extraer los parámetros de la query
+    query_params = parse_qs(parsed_url.query)
+
+    # Mantener solo 'v' (el video) y 'list' (la playlist, que se expande en un trabajo por video)
+    params_filtrados = {clave: query_params[clave] for clave in ('v', 'list') if clave in query_params}
+
+    # Reconstruir la query limpia
+    query_limpia = urlencode(params_filtrados, doseq=True)
+
+    # Reconstruir la URL final sin los parámetros no deseados
+    url_limpia = urlunparse((
+        parsed_url.scheme,
+        parsed_url.netloc,
+        parsed_url.path,
+        parsed_url.params,
+        query_limpia,
+        parsed_url.fragment
+    ))
+
+    return url_limpia
+
+
+def extraer_id_video(url):
+    """Retorna el id de un video de YouTube (youtu.be, watch?v=, shorts, embed), o None"""
+    parsed_url = urlparse(url)
+    host = parsed_url.netloc.lower().split(":")[0]
+    if host.startswith("www."):
+        host = host[4:]
+    if host == "youtu.be":
+        video_id = parsed_url.path.strip("/").split("/")[0]
+    elif host in ("youtube.com", "m.youtube.com", "music.youtube.com", "youtube-nocookie.com"):
+        partes = parsed_url.path.strip("/").split("/")
+        if partes[0] == "watch":
+            video_id = parse_qs(parsed_url.query).get("v", [""])[0]
+        elif partes[0] in ("shorts", "embed", "live", "v") and len(partes) > 1:
+            video_id = partes[1]
+        else:
+            return None
+    else:
+        return None
+    return video_id if re.fullmatch(r"[A-Za-z0-9_-]{11}", video_id) else None
+
+
+def extraer_id_lista(url):
+    """Retorna el id de la playlist (parámetro list=) de una URL, o None"""
+    return parse_qs(urlparse(url).query).get("list", [None])[0]
+
+
+def extraer_urls(texto):
+    """Retorna las URLs (limpias y sin repetir) que aparecen en un texto"""
+    urls = []
+    for candidata in re.findall(r"https?://[^\s,;\"']+", texto):
+        url = limpiar_url_youtube(candidata)
+        if url not in urls:
+            urls.append(url)
+    return urls
+
+
+def leer_lista_urls(ruta):
+    """Lee las URLs de un archivo .txt (una por línea) o .csv (en cualquier columna)"""
+    with open(ruta, "r", encoding="utf-8-sig", newline="") as f:
+        if ruta.lower().endswith(".csv"):
+            texto = " ".join(celda for fila in csv.reader(f) for celda in fila)
+        else:
+            texto = f.read()
+    return extraer_urls(texto)
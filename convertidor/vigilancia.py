@@ -0,0 +1,167 @@
+"""Vigilancia de la carpeta de descargas: avisa qué archivos cambiaron sin volver a recorrerla entera.
+
+En Linux usa inotify (por ctypes, sin dependencias); en el resto compara fotos de os.scandir
+cada algunos segundos. Los eventos se juntan y se entregan después de un momento sin cambios.
+"""
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import logging
+import threading
+
+from .biblioteca import es_archivo_biblioteca
+
+logger = logging.getLogger(__name__)
+
+ESPERA_EVENTOS = 0.5  # segundos sin eventos nuevos antes de avisar
+ESPERA_MAXIMA = 3.0  # con eventos constantes (una copia grande), avisar igual cada tanto
+INTERVALO_SONDEO = 2.0  # cada cuánto se compara la carpeta cuando no hay inotify
+
+# Constantes de <sys/inotify.h>
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0)
+_EVENTO_INOTIFY = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class VigilanteCarpeta:
+    """Hilo que vigila una carpeta y llama a al_cambiar(carpeta, nombres) con los archivos tocados.
+
+    nombres es un set de nombres de archivo (agregados, borrados, renombrados o modificados:
+    quien recibe el aviso mira el disco para saber qué pasó), o None si hay que releer todo.
+    """
+
+    def __init__(self, carpeta, al_cambiar, espera=ESPERA_EVENTOS, intervalo_sondeo=INTERVALO_SONDEO):
+        self.carpeta = carpeta
+        self.al_cambiar = al_cambiar
+        self.espera = espera
+        self.intervalo_sondeo = intervalo_sondeo
+        self._detener = threading.Event()
+        self._hilo = None
+        self._fd = None  # descriptor de inotify, si se pudo usar
+        self._foto = None  # nombre -> (tamaño, mtime), para el sondeo
+
+    def iniciar(self):
+        if sys.platform.startswith("linux"):
+            self._fd = self._abrir_inotify()
+        if self._fd is None:
+            self._foto = self._fotografiar()
+        self._hilo = threading.Thread(target=self._vigilar, name="vigilancia", daemon=True)
+        self._hilo.start()
+        logger.info(f"Vigilando {self.carpeta} con {'inotify' if self._fd is not None else 'sondeo'}")
+
+    def detener(self):
+        self._detener.set()
+
+    def _abrir_inotify(self):
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_init1")
+            mascara = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+                       | IN_DELETE_SELF | IN_MOVE_SELF)
+            if libc.inotify_add_watch(fd, os.fsencode(self.carpeta), mascara) < 0:
+                error = ctypes.get_errno()
+                os.close(fd)
+                raise OSError(error, os.strerror(error))
+            return fd
+        except (OSError, AttributeError) as e:
+            logger.info(f"inotify no disponible para {self.carpeta} ({e}), se usa sondeo")
+            return None
+
+    def _vigilar(self):
+        pendientes = set()
+        primero = ultimo = 0.0  # momento del primer y del último evento sin entregar
+        try:
+            while not self._detener.is_set():
+                nombres = self._leer_inotify() if self._fd is not None else self._sondear()
+                ahora = time.monotonic()
+                if nombres is None:
+                    self._avisar(None)  # se perdieron eventos: hay que releer la carpeta
+                    pendientes.clear()
+                    continue
+                nombres = {n for n in nombres if es_archivo_biblioteca(n)}
+                if nombres:
+                    if not pendientes:
+                        primero = ahora
+                    pendientes |= nombres
+                    ultimo = ahora
+                # El sondeo ya junta todo lo que pasó entre dos fotos: se avisa enseguida
+                if pendientes and (self._fd is None or ahora - ultimo >= self.espera
+                                   or ahora - primero >= ESPERA_MAXIMA):
+                    self._avisar(pendientes)
+                    pendientes = set()
+        finally:
+            if self._fd is not None:
+                os.close(self._fd)
+
+    def _avisar(self, nombres):
+        try:
+            self.al_cambiar(self.carpeta, nombres)
+        except Exception as e:
+            logger.error(f"Error al aplicar cambios de {self.carpeta}: {e}")
+
+    def _leer_inotify(self):
+        """Nombres con eventos en el último momento; None si la cola de inotify se desbordó"""
+        listos, _, _ = select.select([self._fd], [], [], min(self.espera, 0.5))
+        if not listos:
+            return set()
+        try:
+            datos = os.read(self._fd, 64 * 1024)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return set()
+            raise
+        nombres = set()
+        posicion = 0
+        while posicion + _EVENTO_INOTIFY.size <= len(datos):
+            _, mascara, _, largo = _EVENTO_INOTIFY.unpack_from(datos, posicion)
+            posicion += _EVENTO_INOTIFY.size
+            nombre = datos[posicion:posicion + largo].rstrip(b"\0")
+            posicion += largo
+            if mascara & IN_Q_OVERFLOW:
+                return None
+            if mascara & (IN_DELETE_SELF | IN_MOVE_SELF):
+                logger.warning(f"La carpeta {self.carpeta} se borró o se movió, se deja de vigilar")
+                self._detener.set()
+                return None
+            if nombre:
+                nombres.add(os.fsdecode(nombre))
+        return nombres
+
+    def _fotografiar(self):
+        foto = {}
+        try:
+            with os.scandir(self.carpeta) as entradas:
+                for entrada in entradas:
+                    if not es_archivo_biblioteca(entrada.name):
+                        continue
+                    try:
+                        datos = entrada.stat()
+                    except OSError:
+                        continue
+                    foto[entrada.name] = (datos.st_size, datos.st_mtime)
+        except OSError as e:
+            logger.warning(f"No se pudo leer {self.carpeta}: {e}")
+        return foto
+
+    def _sondear(self):
+        """Nombres que aparecieron, desaparecieron o cambiaron desde la foto anterior"""
+        if self._detener.wait(self.intervalo_sondeo):
+            return set()
+        foto = self._fotografiar()
+        anterior, self._foto = self._foto, foto
+        return {nombre for nombre in anterior.keys() | foto.keys() if anterior.get(nombre) != foto.get(nombre)}
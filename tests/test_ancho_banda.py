@@ -0,0 +1,106 @@
+import threading
+from datetime import datetime
+
+import pytest
+
+from convertidor import ancho_banda
+from convertidor.ancho_banda import CuboTokens, ProgramadorAnchoBanda, host_de_url
+
+
+class Reloj:
+    """monotonic y sleep de mentira: dormir solo adelanta el reloj"""
+
+    def __init__(self):
+        self.ahora = 1000.0
+        self.dormido = 0.0
+
+    def monotonic(self):
+        return self.ahora
+
+    def sleep(self, segundos):
+        self.dormido += segundos
+        self.ahora += segundos
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(ancho_banda.time, "monotonic", reloj.monotonic)
+    monkeypatch.setattr(ancho_banda.time, "sleep", reloj.sleep)
+    return reloj
+
+
+def test_sin_tasa_no_espera(reloj):
+    cubo = CuboTokens()
+    cubo.consumir(10 ** 9)
+    assert reloj.dormido == 0
+
+
+def test_espera_lo_que_falta_para_la_tasa(reloj):
+    cubo = CuboTokens(1000)
+    cubo.consumir(1000)  # el primer segundo ya está disponible
+    assert reloj.dormido == 0
+    cubo.consumir(500)
+    assert reloj.dormido == pytest.approx(0.5)
+    cubo.consumir(2000)
+    assert reloj.dormido == pytest.approx(2.5)
+
+
+def test_despues_de_una_pausa_acumula_como_mucho_un_segundo(reloj):
+    cubo = CuboTokens(1000)
+    cubo.consumir(1000)
+    reloj.ahora += 60
+    cubo.consumir(3000)
+    assert reloj.dormido == pytest.approx(2.0)
+
+
+def test_bajar_la_tasa_recorta_los_tokens(reloj):
+    cubo = CuboTokens(1000)
+    cubo.cambiar_tasa(100)
+    cubo.consumir(200)
+    assert reloj.dormido == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize("url, host", [
+    ("https://www.youtube.com/watch?v=x", "youtube.com"),
+    ("https://m.youtube.com/watch?v=x", "youtube.com"),
+    ("https://music.youtube.com/watch?v=x", "youtube.com"),
+    ("https://youtu.be/x", "youtube.com"),
+    ("https://rr3---sn-abc.googlevideo.com/videoplayback", "rr3---sn-abc.googlevideo.com"),
+])
+def test_host_de_url(url, host):
+    assert host_de_url(url) == host
+
+
+def test_limite_por_sitio_incluye_subdominios():
+    programador = ProgramadorAnchoBanda({"ancho_banda": {"limites_host": {"googlevideo.com": 2}}})
+    assert programador.limite_host("rr3---sn-abc.googlevideo.com") == 2
+    assert programador.limite_host("otrogooglevideo.com") is None
+
+
+def test_entrar_espera_un_lugar_libre_del_sitio():
+    programador = ProgramadorAnchoBanda({"ancho_banda": {"limites_host": {"youtube.com": 1}}})
+    host = programador.entrar("https://youtu.be/a")
+    # Otro sitio no espera
+    programador.salir(programador.entrar("https://vimeo.com/1"))
+    entro = threading.Event()
+
+    def segundo():
+        programador.salir(programador.entrar("https://www.youtube.com/watch?v=b"))
+        entro.set()
+
+    threading.Thread(target=segundo, daemon=True).start()
+    assert not entro.wait(0.2)
+    programador.salir(host)
+    assert entro.wait(2)
+    assert programador._activos == {}
+
+
+@pytest.mark.parametrize("hora, limite", [("10:00", "2M"), ("23:30", "1M"), ("03:00", "1M"), ("19:00", "8M")])
+def test_horarios(hora, limite):
+    programador = ProgramadorAnchoBanda({"ancho_banda": {
+        "limite_total": "8M",
+        "horarios": [{"desde": "09:00", "hasta": "18:00", "limite_total": "2M"},
+                     {"desde": "22:00", "hasta": "06:00", "limite_total": "1M"}]}})
+    horas, minutos = map(int, hora.split(":"))
+    assert programador.ajustes(datetime(2024, 1, 1, horas, minutos))["limite_total"] == limite
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from convertidor.api import ServidorAPI, ErrorHTTP
+
+
+def leer(datos):
+    return ServidorAPI(None, None)._leer_trabajos(json.dumps(datos).encode("utf-8"))
+
+
+def test_leer_trabajos():
+    urls, formato = leer({"url": "https://youtu.be/dQw4w9WgXcQ?si=a", "urls": ["https://vimeo.com/1"],
+                          "formato": "audio"})
+    assert urls == ["https://youtu.be/dQw4w9WgXcQ", "https://vimeo.com/1"]
+    assert formato == "audio"
+
+
+def test_formato_por_defecto():
+    assert leer({"urls": ["https://vimeo.com/1"]}) == (["https://vimeo.com/1"], "mp3")
+
+
+@pytest.mark.parametrize("datos", [
+    {"urls": 5},
+    {"urls": "https://vimeo.com/1"},
+    {"urls": ["https://vimeo.com/1", 5]},
+    {"urls": {"a": "https://vimeo.com/1"}},
+    {"url": ["https://vimeo.com/1"]},
+    {"url": 5},
+    {"url": "sin urls"},
+    {"url": "https://vimeo.com/1", "formato": "flac"},
+    ["https://vimeo.com/1"],
+])
+def test_pedido_invalido_es_400(datos):
+    with pytest.raises(ErrorHTTP) as error:
+        leer(datos)
+    assert error.value.estado == 400
+
+
+def test_cuerpo_que_no_es_json():
+    with pytest.raises(ErrorHTTP) as error:
+        ServidorAPI(None, None)._leer_trabajos(b"{url")
+    assert error.value.estado == 400
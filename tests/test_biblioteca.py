@@ -0,0 +1,102 @@
+from datetime import datetime
+
+import pytest
+
+from convertidor.biblioteca import ArchivoDescargado, ColeccionArchivos, IndiceArchivos, es_archivo_biblioteca
+
+
+def archivo(nombre, formato="mp3", tamano=100, dia=1):
+    return ArchivoDescargado(nombre, formato, "/musica", fecha_descarga=datetime(2024, 1, dia), tamano=tamano)
+
+
+def nombres(coleccion):
+    return [coleccion[i].nombre for i in range(len(coleccion))]
+
+
+def test_reemplazar_ignora_repetidos_y_ordena_por_fecha():
+    coleccion = ColeccionArchivos()
+    coleccion.reemplazar([archivo("viejo", dia=1), archivo("nuevo", dia=3), archivo("viejo", dia=2)])
+    assert nombres(coleccion) == ["nuevo", "viejo"]
+    assert coleccion.total == 2
+
+
+def test_mismo_nombre_en_otro_formato_no_es_repetido():
+    coleccion = ColeccionArchivos()
+    coleccion.reemplazar([archivo("tema", "mp3"), archivo("tema", "mp4")])
+    assert len(coleccion) == 2
+
+
+def test_agregar_y_quitar_mantienen_orden_y_totales():
+    coleccion = ColeccionArchivos(orden="nombre", descendente=False)
+    coleccion.reemplazar([archivo("b", tamano=10), archivo("d", "mp4", tamano=30)])
+    assert coleccion.agregar(archivo("c", tamano=20))
+    assert not coleccion.agregar(archivo("c", tamano=99))
+    assert nombres(coleccion) == ["b", "c", "d"]
+    assert coleccion.tamano_por_formato() == {"mp3": (2, 30), "mp4": (1, 30)}
+    assert coleccion.quitar("b", "mp3")
+    assert not coleccion.quitar("b", "mp3")
+    assert nombres(coleccion) == ["c", "d"]
+    assert coleccion.tamano_total() == 50
+
+
+def test_actualizar_reemplaza_los_datos():
+    coleccion = ColeccionArchivos(orden="tamano")
+    coleccion.reemplazar([archivo("a", tamano=10), archivo("b", tamano=20)])
+    coleccion.actualizar(archivo("a", tamano=30))
+    assert nombres(coleccion) == ["a", "b"]
+    assert coleccion.tamano_total() == 50
+
+
+def test_filtrar_por_nombre_y_formato():
+    coleccion = ColeccionArchivos(orden="nombre", descendente=False)
+    coleccion.reemplazar([archivo("Rock Uno"), archivo("Jazz"), archivo("rock dos", "mp4")])
+    coleccion.filtrar("ROCK")
+    assert nombres(coleccion) == ["rock dos", "Rock Uno"]
+    coleccion.filtrar("rock d")
+    assert nombres(coleccion) == ["rock dos"]
+    coleccion.filtrar("mp3")
+    assert nombres(coleccion) == ["Jazz", "Rock Uno"]
+    coleccion.agregar(archivo("Rock Tres"))
+    assert nombres(coleccion) == ["Jazz", "Rock Tres", "Rock Uno"]
+    coleccion.filtrar("")
+    assert len(coleccion) == 4
+    assert coleccion.total == 4
+
+
+def test_ordenar_invierte_al_repetir_el_criterio():
+    coleccion = ColeccionArchivos()
+    coleccion.reemplazar([archivo("b"), archivo("a"), archivo("c")])
+    coleccion.ordenar("nombre")
+    assert nombres(coleccion) == ["a", "b", "c"]
+    coleccion.ordenar("nombre")
+    assert nombres(coleccion) == ["c", "b", "a"]
+
+
+def test_indice_fuera_de_rango():
+    coleccion = ColeccionArchivos()
+    coleccion.reemplazar([archivo("a")])
+    with pytest.raises(IndexError):
+        coleccion[1]
+
+
+@pytest.mark.parametrize("nombre", ["tema.mp3", "Video.MP4", "a.b.c.m4a", "feat. otro.opus", "Mr.fx.mp3"])
+def test_archivos_de_biblioteca(nombre):
+    assert es_archivo_biblioteca(nombre)
+
+
+@pytest.mark.parametrize("nombre", ["tema.f137.mp4", "tema.f140.m4a", "tema.f251-drc.opus", "tema.temp.mp4",
+                                    "tema.mp3.convirtiendo.mp3", "tema.webm", "tema.mp4.part", "tema.webp"])
+def test_intermedios_fuera_de_la_biblioteca(nombre):
+    assert not es_archivo_biblioteca(nombre)
+
+
+def test_sincronizar_ignora_intermedios_y_archivos_en_proceso(tmp_path):
+    for nombre in ("listo.mp3", "tema.f137.mp4", "tema.temp.mp4", "espera.m4a"):
+        (tmp_path / nombre).write_bytes(b"x")
+    indice = IndiceArchivos(str(tmp_path / "indice.db"))
+    indice.marcar_en_proceso(str(tmp_path / "espera.m4a"))
+    indice.sincronizar(str(tmp_path))
+    assert [fila[:2] for fila in indice.listar(str(tmp_path))] == [("listo", "mp3")]
+    indice.liberar(str(tmp_path / "espera.m4a"))
+    indice.sincronizar(str(tmp_path))
+    assert sorted(fila[0] for fila in indice.listar(str(tmp_path))) == ["espera", "listo"]
@@ -0,0 +1,31 @@
+from convertidor.cola import ColaDescargas, ESTADO_COMPLETADO
+
+
+def cola_sin_workers():
+    return ColaDescargas(lambda trabajo: True, 1)
+
+
+def test_mismo_video_con_otra_url_no_se_encola_dos_veces():
+    cola = cola_sin_workers()
+    corto = cola.agregar("https://youtu.be/dQw4w9WgXcQ?si=x", "mp3")
+    largo = cola.agregar("https://www.youtube.com/watch?v=dQw4w9WgXcQ", "mp3")
+    assert largo is corto
+    assert len(cola.trabajos) == 1
+
+
+def test_mismo_video_en_otro_formato_es_otro_trabajo():
+    cola = cola_sin_workers()
+    assert cola.agregar("https://youtu.be/dQw4w9WgXcQ", "mp3") is not cola.agregar(
+        "https://youtu.be/dQw4w9WgXcQ", "mp4")
+
+
+def test_urls_que_no_son_de_youtube_se_comparan_enteras():
+    cola = cola_sin_workers()
+    assert cola.agregar("https://ejemplo.com/a.mp4", "mp4") is not cola.agregar("https://ejemplo.com/b.mp4", "mp4")
+
+
+def test_terminado_se_puede_volver_a_encolar():
+    cola = cola_sin_workers()
+    trabajo = cola.agregar("https://youtu.be/dQw4w9WgXcQ", "mp3")
+    cola._cambiar_estado(trabajo, ESTADO_COMPLETADO)
+    assert cola.agregar("https://www.youtube.com/watch?v=dQw4w9WgXcQ", "mp3") is not trabajo
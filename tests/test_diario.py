@@ -0,0 +1,62 @@
+import json
+
+from convertidor.cola import DiarioTrabajos, TrabajoDescarga, ESTADO_COMPLETADO, ESTADO_DESCARGANDO
+
+
+def trabajo(url, estado=ESTADO_DESCARGANDO, parcial=None):
+    nuevo = TrabajoDescarga(url, "mp3", estado=estado)
+    nuevo.parcial = parcial
+    return nuevo
+
+
+def test_vale_la_ultima_linea_de_cada_trabajo(tmp_path):
+    diario = DiarioTrabajos(str(tmp_path / "cola.jsonl"))
+    primero, segundo = trabajo("https://a"), trabajo("https://b")
+    diario.registrar(primero)
+    diario.registrar(segundo)
+    segundo.parcial = "/descargas/b.m4a.part"
+    diario.registrar(segundo)
+    primero.estado = ESTADO_COMPLETADO
+    diario.registrar(primero)
+    diario.cerrar()
+    pendientes = diario.leer()
+    assert [(t.id, t.parcial) for t in pendientes] == [(segundo.id, "/descargas/b.m4a.part")]
+
+
+def test_linea_cortada_se_ignora(tmp_path):
+    archivo = tmp_path / "cola.jsonl"
+    guardado = trabajo("https://a")
+    archivo.write_text(json.dumps(guardado.a_dict()) + "\n" + '{"id": "cortado", "url": "https://b", "for',
+                       encoding="utf-8")
+    assert [t.id for t in DiarioTrabajos(str(archivo)).leer()] == [guardado.id]
+
+
+def test_registrar_despues_de_una_linea_cortada(tmp_path):
+    archivo = tmp_path / "cola.jsonl"
+    archivo.write_text('{"id": "cortado", "url": "https://b", "for', encoding="utf-8")
+    diario = DiarioTrabajos(str(archivo))
+    nuevo = trabajo("https://c")
+    diario.registrar(nuevo)
+    diario.cerrar()
+    assert [t.id for t in diario.leer()] == [nuevo.id]
+
+
+def test_compactar_deja_solo_los_indicados(tmp_path):
+    archivo = tmp_path / "cola.jsonl"
+    diario = DiarioTrabajos(str(archivo))
+    pendiente, terminado = trabajo("https://a"), trabajo("https://b", ESTADO_COMPLETADO)
+    for t in (pendiente, terminado, pendiente):
+        diario.registrar(t)
+    diario.compactar([pendiente])
+    assert len(archivo.read_text(encoding="utf-8").splitlines()) == 1
+    assert not (tmp_path / "cola.jsonl.tmp").exists()
+    assert [t.id for t in diario.leer()] == [pendiente.id]
+    # El diario sigue abierto para agregar después de compactar
+    otro = trabajo("https://c")
+    diario.registrar(otro)
+    diario.cerrar()
+    assert [t.id for t in diario.leer()] == [pendiente.id, otro.id]
+
+
+def test_sin_archivo_no_hay_pendientes(tmp_path):
+    assert DiarioTrabajos(str(tmp_path / "no_existe.jsonl")).leer() == []
@@ -0,0 +1,74 @@
+import time
+
+from convertidor.metadatos import (CacheMetadatos, vencimiento_urls, TTL_URLS_SIN_VENCIMIENTO,
+                                   MARGEN_VENCIMIENTO)
+
+VIDEO = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+
+def info_con_vencimiento(vence):
+    return {"id": "dQw4w9WgXcQ", "title": "Tema",
+            "formats": [{"url": f"https://rr1.googlevideo.com/videoplayback?expire={vence}&itag=140"}]}
+
+
+def test_vencimiento_de_la_primera_url():
+    info = {"formats": [{"url": "https://x/videoplayback?expire=1700000500&a=1"},
+                        {"manifest_url": "https://x/api/manifest/hls/expire/1700000100/id/1"},
+                        {"url": "https://x/sin_firma.mp4"}]}
+    assert vencimiento_urls(info, 1600000000) == 1700000100
+
+
+def test_sin_vencimiento_se_asume_desde_que_se_guardo():
+    assert vencimiento_urls({"formats": [{"url": "https://x/a.mp4"}]}, 1000) == 1000 + TTL_URLS_SIN_VENCIMIENTO
+    assert vencimiento_urls({}, 1000) == 1000 + TTL_URLS_SIN_VENCIMIENTO
+
+
+def test_misma_entrada_para_distintas_urls_del_video():
+    cache = CacheMetadatos()
+    cache.guardar(VIDEO, info_con_vencimiento(int(time.time()) + 3600))
+    assert cache.info("https://youtu.be/dQw4w9WgXcQ?si=x")["title"] == "Tema"
+
+
+def test_urls_por_vencer_no_sirven_para_descargar():
+    cache = CacheMetadatos()
+    cache.guardar(VIDEO, info_con_vencimiento(int(time.time()) + MARGEN_VENCIMIENTO // 2))
+    assert cache.para_descargar(VIDEO) is None
+    assert cache.info(VIDEO)["title"] == "Tema"
+    cache.guardar(VIDEO, info_con_vencimiento(int(time.time()) + 3600))
+    assert cache.para_descargar(VIDEO)["title"] == "Tema"
+
+
+def test_ttl_vencido(monkeypatch):
+    cache = CacheMetadatos(ttl=60)
+    cache.guardar(VIDEO, info_con_vencimiento(int(time.time()) + 3600))
+    ahora = time.time()
+    monkeypatch.setattr(time, "time", lambda: ahora + 61)
+    assert cache.info(VIDEO) is None
+    assert VIDEO not in cache
+
+
+def test_descarta_claves_de_descarga_y_pesadas():
+    cache = CacheMetadatos()
+    info = dict(info_con_vencimiento(int(time.time()) + 3600), requested_downloads=[{}], subtitles={"es": []},
+                filepath="/tmp/a.mp3", __postprocessors=[])
+    cache.guardar(VIDEO, info)
+    assert set(cache.info(VIDEO)) == {"id", "title", "formats"}
+
+
+def test_lru_descarta_la_menos_usada():
+    cache = CacheMetadatos(max_entradas=2)
+    for numero in range(3):
+        cache.guardar(f"https://ejemplo.com/{numero}", {"title": str(numero)})
+        if numero == 1:
+            cache.info("https://ejemplo.com/0")  # la 0 pasa a ser la más reciente
+    assert "https://ejemplo.com/0" in cache
+    assert "https://ejemplo.com/1" not in cache
+
+
+def test_persistencia_en_disco(tmp_path):
+    archivo = str(tmp_path / "metadatos.db")
+    CacheMetadatos(archivo=archivo).guardar(VIDEO, info_con_vencimiento(int(time.time()) + 3600))
+    otra = CacheMetadatos(archivo=archivo)
+    assert otra.para_descargar(VIDEO)["title"] == "Tema"
+    otra.descartar(VIDEO)
+    assert CacheMetadatos(archivo=archivo).info(VIDEO) is None
@@ -0,0 +1,76 @@
+import sys
+
+import pytest
+from yt_dlp.utils import DownloadError, ExtractorError, PostProcessingError
+
+from convertidor.reintentos import (clasificar_error, PoliticaReintentos, FALLO_PROHIBIDO, FALLO_LIMITE, FALLO_RED,
+                                    FALLO_EXTRACCION, FALLO_PROCESAMIENTO, FALLO_PERMANENTE)
+
+
+def envuelto(error):
+    """Lo que hace extract_info: un DownloadError con la excepción original en exc_info"""
+    try:
+        raise error
+    except Exception:
+        return DownloadError(f"ERROR: {error}", sys.exc_info())
+
+
+@pytest.mark.parametrize("mensaje, clase", [
+    ("HTTP Error 403: Forbidden", FALLO_PROHIBIDO),
+    ("HTTP Error 429: Too Many Requests", FALLO_LIMITE),
+    ("Read timed out", FALLO_RED),
+    ("HTTP Error 503: Service Unavailable", FALLO_RED),
+    ("HTTP Error 404: Not Found", FALLO_PERMANENTE),
+    ("HTTP Error 410: Gone", FALLO_PERMANENTE),
+    ("Private video. Sign in if you've been granted access", FALLO_PERMANENTE),
+])
+def test_clasifica_por_mensaje(mensaje, clase):
+    assert clasificar_error(DownloadError(f"ERROR: {mensaje}")) == clase
+
+
+def test_extractor_envuelto_en_download_error():
+    error = envuelto(ExtractorError("Sign in to confirm you're not a bot", expected=True))
+    assert clasificar_error(error) == FALLO_EXTRACCION
+
+
+def test_posproceso_envuelto_en_download_error():
+    assert clasificar_error(envuelto(PostProcessingError("Conversion failed!"))) == FALLO_PROCESAMIENTO
+
+
+def test_causa_de_red_dentro_de_extractor():
+    causa = envuelto(TimeoutError("The read operation timed out"))
+    assert clasificar_error(envuelto(ExtractorError("Unable to download webpage", cause=causa))) == FALLO_RED
+
+
+def test_download_error_sin_pistas_es_de_red():
+    assert clasificar_error(DownloadError("ERROR: algo salió mal")) == FALLO_RED
+
+
+def test_errores_de_ffmpeg_y_desconocidos():
+    assert clasificar_error(RuntimeError("ffmpeg terminó con código 1")) == FALLO_PROCESAMIENTO
+    assert clasificar_error(ValueError("otra cosa")) == FALLO_PERMANENTE
+
+
+def test_politica_desde_config():
+    politica = PoliticaReintentos({"reintentos": {FALLO_RED: {"intentos": 1}}})
+    assert politica.puede_reintentar(FALLO_RED, 1)
+    assert not politica.puede_reintentar(FALLO_RED, 2)
+    assert not politica.puede_reintentar(FALLO_PERMANENTE, 1)
+
+
+def test_extraccion_cambia_de_cliente():
+    opciones = PoliticaReintentos({}).ajustar_opciones({}, FALLO_EXTRACCION, 1)
+    assert opciones["extractor_args"]["youtube"]["player_client"]
+
+
+def test_limite_baja_a_la_mitad_en_cada_reintento():
+    politica = PoliticaReintentos({})
+    opciones = {}
+    limites = [politica.ajustar_opciones(opciones, FALLO_LIMITE, intento)["ratelimit"] for intento in range(1, 6)]
+    assert limites == [2 * 1024 ** 2, 1024 ** 2, 512 * 1024, 256 * 1024, 256 * 1024]
+    assert opciones["concurrent_fragment_downloads"] == 1
+
+
+def test_limite_parte_del_perfil():
+    opciones = PoliticaReintentos({}).ajustar_opciones({"ratelimit": 2 * 1024 ** 2}, FALLO_LIMITE, 1)
+    assert opciones["ratelimit"] == 1024 ** 2
@@ -0,0 +1,25 @@
+import pytest
+
+from convertidor.rendimiento import parsear_tamano
+
+
+@pytest.mark.parametrize("valor, esperado", [
+    (None, None),
+    ("", None),
+    (1048576, 1048576),
+    (1.5, 1),
+    ("512", 512),
+    ("512K", 512 * 1024),
+    ("10M", 10 * 1024 ** 2),
+    ("1.5G", int(1.5 * 1024 ** 3)),
+    (" 2 MiB ", 2 * 1024 ** 2),
+    ("4kb", 4 * 1024),
+])
+def test_parsear_tamano(valor, esperado):
+    assert parsear_tamano(valor) == esperado
+
+
+@pytest.mark.parametrize("valor", ["rápido", "10X", "-1M", "M"])
+def test_parsear_tamano_invalido(valor):
+    with pytest.raises(ValueError):
+        parsear_tamano(valor)
@@ -0,0 +1,68 @@
+import pytest
+
+from convertidor.transcodificacion import (planear_conversion, argumentos_posproceso, ajustes_posproceso,
+                                           CONVERSION_NINGUNA, CONVERSION_REMUX, CONVERSION_MP3)
+
+
+@pytest.mark.parametrize("formato, origen, acodec, esperado", [
+    ("mp3", "/d/tema.mp3", "mp3", (CONVERSION_NINGUNA, "/d/tema.mp3")),
+    ("mp3", "/d/tema.mp4", "mp3", (CONVERSION_REMUX, "/d/tema.mp3")),
+    ("mp3", "/d/tema.m4a", "mp4a.40.2", (CONVERSION_MP3, "/d/tema.mp3")),
+    ("mp3", "/d/tema.webm", "opus", (CONVERSION_MP3, "/d/tema.mp3")),
+    ("audio", "/d/tema.m4a", "mp4a.40.2", (CONVERSION_NINGUNA, "/d/tema.m4a")),
+    ("audio", "/d/tema.webm", "opus", (CONVERSION_REMUX, "/d/tema.opus")),
+    ("audio", "/d/tema.opus", "opus", (CONVERSION_NINGUNA, "/d/tema.opus")),
+    ("audio", "/d/tema.mp4", "aac", (CONVERSION_REMUX, "/d/tema.m4a")),
+    ("audio", "/d/tema.ogg", "vorbis", (CONVERSION_NINGUNA, "/d/tema.ogg")),
+    ("audio", "/d/tema.webm", None, (CONVERSION_NINGUNA, "/d/tema.webm")),
+])
+def test_planear_conversion(formato, origen, acodec, esperado):
+    assert planear_conversion(formato, {"acodec": acodec}, origen) == esperado
+
+
+def test_extension_en_mayusculas():
+    assert planear_conversion("mp3", {"acodec": "mp3"}, "/d/tema.MP3") == (CONVERSION_NINGUNA, "/d/tema.MP3")
+
+
+def _filtro(argumentos):
+    return argumentos[argumentos.index("-af") + 1]
+
+
+def test_posproceso_sin_nada_activado():
+    assert ajustes_posproceso({}) is None
+    assert argumentos_posproceso(ajustes_posproceso({"posproceso": {"portada": True}}), {}) == []
+
+
+def test_recortar_silencio_no_toca_los_silencios_internos():
+    ajustes = ajustes_posproceso({"posproceso": {"recortar_silencio": True}})
+    filtro = _filtro(argumentos_posproceso(ajustes, {"duration": 200}))
+    assert "stop_periods" not in filtro
+    # El final se recorta invirtiendo solo los últimos 30 segundos
+    assert "atrim=start=170.000" in filtro and "atrim=end=170.000" in filtro
+    assert filtro.count("areverse") == 2
+
+
+def test_recortar_silencio_en_pista_corta_invierte_la_pista_entera():
+    ajustes = ajustes_posproceso({"posproceso": {"recortar_silencio": True}})
+    filtro = _filtro(argumentos_posproceso(ajustes, {"duration": 12}))
+    assert "atrim" not in filtro and filtro.count("areverse") == 2
+
+
+def test_recortar_silencio_sin_duracion_recorta_solo_el_principio():
+    ajustes = ajustes_posproceso({"posproceso": {"recortar_silencio": True, "umbral_silencio": "-40dB"}})
+    filtro = _filtro(argumentos_posproceso(ajustes, {}))
+    assert filtro == "silenceremove=start_periods=1:start_threshold=-40dB:start_silence=0.2"
+
+
+def test_normalizar_va_despues_del_recorte_y_fija_la_frecuencia():
+    ajustes = ajustes_posproceso({"posproceso": {"recortar_silencio": True, "normalizar": True}})
+    argumentos = argumentos_posproceso(ajustes, {"duration": 200, "asr": 48000})
+    assert _filtro(argumentos).endswith(",loudnorm=I=-16:TP=-1.5:LRA=11")
+    assert argumentos[argumentos.index("-ar") + 1] == "48000"
+
+
+def test_etiquetas():
+    ajustes = ajustes_posproceso({"posproceso": {"etiquetas": True}})
+    argumentos = argumentos_posproceso(ajustes, {"title": "Tema", "uploader": "Canal", "upload_date": "20190101"})
+    assert "-af" not in argumentos
+    assert argumentos == ["-metadata", "title=Tema", "-metadata", "artist=Canal", "-metadata", "date=2019"]
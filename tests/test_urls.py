@@ -0,0 +1,55 @@
+import pytest
+
+from convertidor.urls import extraer_id_video, extraer_id_lista, limpiar_url_youtube, extraer_urls
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://youtube.com/watch?v=dQw4w9WgXcQ&list=PL123&t=42",
+    "https://m.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://music.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://youtu.be/dQw4w9WgXcQ?si=abc",
+    "https://www.youtube.com/shorts/dQw4w9WgXcQ",
+    "https://www.youtube.com/embed/dQw4w9WgXcQ",
+    "https://www.youtube-nocookie.com/embed/dQw4w9WgXcQ",
+    "https://www.youtube.com/live/dQw4w9WgXcQ",
+    "https://WWW.YOUTUBE.COM:443/watch?v=dQw4w9WgXcQ",
+])
+def test_extraer_id_video(url):
+    assert extraer_id_video(url) == "dQw4w9WgXcQ"
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.youtube.com/playlist?list=PL123",
+    "https://www.youtube.com/watch?v=corto",
+    "https://www.youtube.com/@canal",
+    "https://vimeo.com/123456",
+    "https://youtu.be/",
+    "no es una url",
+])
+def test_extraer_id_video_sin_id(url):
+    assert extraer_id_video(url) is None
+
+
+@pytest.mark.parametrize("url, esperada", [
+    ("https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42&si=abc", "https://www.youtube.com/watch?v=dQw4w9WgXcQ"),
+    ("https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL123&index=3",
+     "https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL123"),
+    ("https://www.youtube.com/playlist?list=PL123&si=abc", "https://www.youtube.com/playlist?list=PL123"),
+    ("https://youtu.be/dQw4w9WgXcQ?si=abc", "https://youtu.be/dQw4w9WgXcQ"),
+])
+def test_limpiar_url_youtube(url, esperada):
+    assert limpiar_url_youtube(url) == esperada
+
+
+def test_video_dentro_de_playlist_conserva_la_lista():
+    url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL123&index=3"
+    assert extraer_urls(f"mirá esto: {url}") == ["https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL123"]
+    # expandir_url solo toma como video suelto las URLs sin lista
+    assert extraer_id_lista(extraer_urls(url)[0]) == "PL123"
+    assert extraer_id_lista("https://www.youtube.com/watch?v=dQw4w9WgXcQ") is None
+
+
+def test_extraer_urls_sin_repetir():
+    texto = "https://youtu.be/dQw4w9WgXcQ?si=a, https://youtu.be/dQw4w9WgXcQ?si=b;https://vimeo.com/1"
+    assert extraer_urls(texto) == ["https://youtu.be/dQw4w9WgXcQ", "https://vimeo.com/1"]
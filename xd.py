@@ -1,89 +1,42 @@
+import time
+INICIO_ARRANQUE = time.perf_counter()  # antes de los demás imports: el arranque se mide desde acá
 import tkinter as tk
 import threading
 from tkinter import ttk, messagebox, filedialog
-import yt_dlp
-import os, json, sys
+import os
+import sys
 import subprocess
-import shutil
 from datetime import datetime
-import rarfile
-import tempfile
-from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
 import logging
+import queue
+import csv
+import sqlite3
+
+from convertidor.config import cargar_config, guardar_config, COLA_FILE, COLA_FILE_ANTERIOR, SIZE_TEXT
+from convertidor.logs import configurar_logging
+from convertidor.urls import extraer_urls, leer_lista_urls
+from convertidor.cola import (ColaDescargas, migrar_cola_json, ESTADO_EN_COLA, ESTADO_DESCARGANDO, ESTADO_CONVIRTIENDO,
+                              ESTADO_COMPLETADO, ESTADO_FALLIDO, ESTADO_OMITIDO)
+from convertidor.biblioteca import ArchivoDescargado, ColeccionArchivos
+from convertidor.descarga import Descargador
+from convertidor.metricas import FASES
+from convertidor.vigilancia import VigilanteCarpeta
 
 # Configurar logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('convertidor_errors.log', encoding='utf-8'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+configurar_logging()
 logger = logging.getLogger(__name__)
 
+INTERVALO_UI_MS = 100  # cada cuánto la ventana aplica el progreso que mandan los workers
+INTERVALO_VELOCIDAD_MS = 1000  # cada cuánto se actualiza la velocidad total
+ESPERA_FILTRO_MS = 150  # pausa al escribir en el buscador antes de filtrar la biblioteca
+INTERVALO_ESTADISTICAS_MS = 2000  # cada cuánto se refresca el panel de estadísticas abierto
+PRESUPUESTO_ARRANQUE_MS = 300  # la ventana tendría que responder antes de esto
 
-class ArchivoDescargado:
-    """Clase para almacenar información de archivos descargados"""
-    
-    def __init__(self, nombre, formato, ubicacion, fecha_descarga=None):
-        self.nombre = nombre
-        self.formato = formato
-        self.ubicacion = ubicacion
-        self.fecha_descarga = fecha_descarga or datetime.now()
-    
-    def __str__(self):
-        return f"{self.nombre} ({self.formato})"
-    
-    def ruta_completa(self):
-        """Retorna la ruta completa del archivo"""
-        return os.path.join(self.ubicacion, f"{self.nombre}.{self.formato}")
-    
-    def existe_archivo(self):
-        """Verifica si el archivo existe en el sistema"""
-        return os.path.exists(self.ruta_completa())
-    
-    def obtener_tamaño(self):
-        """Retorna el tamaño del archivo en bytes"""
-        if self.existe_archivo():
-            return os.path.getsize(self.ruta_completa())
-        return 0
-    
-    def obtener_fecha_creacion(self):
-        """Retorna la fecha de creación del archivo"""
-        if self.existe_archivo():
-            return datetime.fromtimestamp(os.path.getctime(self.ruta_completa()))
-        return None
-
-
-# Lista interna con objetos ArchivoDescargado
-archivos_descargados = []
-# Lista para URLs ya descargadas (para evitar duplicados)
-
-CONFIG_FILE = "config.json"
-SIZE_TEXT = 14
-
-def cargar_config():
-    """Carga la configuración desde config.json, si existe. Si no existe, lo crea automáticamente."""
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    
-    # Si no existe el archivo, crear configuración por defecto y guardarla
-    config_default = {"carpeta_descargas": os.path.expanduser("~/Downloads"),
-                      "font_size": SIZE_TEXT
-                }
-    guardar_config(config_default)
-    return config_default
-
-def guardar_config(config):
-    """Guarda la configuración en config.json"""
-    with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-        json.dump(config, f, indent=4)
+# Archivos de la biblioteca (ArchivoDescargado) sin repetidos, con filtro y orden
+archivos_descargados = ColeccionArchivos()
 
 config = cargar_config()
 
-
 def seleccionar_carpeta():
     """Abre un diálogo para seleccionar carpeta de descargas."""
     carpeta = filedialog.askdirectory(title="Selecciona carpeta de descargas")
@@ -93,321 +46,349 @@ def seleccionar_carpeta():
         messagebox.showinfo("Carpeta seleccionada", f"Los archivos se guardarán en:\n{carpeta}")
         lbl_carpeta.config(text=f"Carpeta actual: {config['carpeta_descargas']}")
         cargar_archivos()
-def descargar(url, formato):
-    logger.info(f"Iniciando descarga: URL={url}, Formato={formato}")
-    try:
-        carpeta = config["carpeta_descargas"]  # siempre obtiene la última guardada
-        
-        # Verificar que la carpeta de descargas existe
-        if not os.path.exists(carpeta):
-            error_msg = f"La carpeta de descargas no existe: {carpeta}"
-            logger.error(error_msg)
-            messagebox.showerror("Error", error_msg)
-            download_btn.config(state='active')
-            return
-            
-        if getattr(sys, 'frozen', False):  # Si está en .exe
-            base_path = sys._MEIPASS
-        else:  # Si está en Python normal
-            base_path = os.path.abspath(".")
 
-        try:
-            rarfile.UNRAR_TOOL = os.path.join(base_path, "bin", "unrar.exe")  # Usa unrar.exe local
-             
-            # Ruta del .rar que contiene ffmpeg y otros
-            rar_path = os.path.join(base_path, "bin", "bin.rar")
-            # Ruta de descompresión
-            ffmpeg_extract_path = os.path.join(tempfile.gettempdir(), "ffmpeg_bin")
-            # Copiar SOLO bin.rar
-            # Queremos que termine en ffmpeg_bin/bin/bin.rar
-            rar_dest_dir = os.path.join(ffmpeg_extract_path, "bin")
-            os.makedirs(rar_dest_dir, exist_ok=True)
-
-            rar_dest = os.path.join(rar_dest_dir, "bin.rar")
-            if not os.path.exists(rar_dest):
-                shutil.copy2(rar_path, rar_dest)
-
-            
-            ffmpeg_path = os.path.join(ffmpeg_extract_path, "bin")
-            
-            # Verificar que ffmpeg.exe exista
-            ffmpeg_exe = os.path.join(ffmpeg_path, "ffmpeg.exe")
-
-            # Extraer solo si no existe
-            if not os.path.exists(ffmpeg_exe):
-                with rarfile.RarFile(rar_path) as rf:
-                    logger.info(f"Archivos en el RAR: {rf.namelist()}")
-                    rf.extractall(ffmpeg_extract_path)
-
-
-            if not os.path.exists(ffmpeg_exe):
-                messagebox.showerror("Error", f"No se encontró ffmpeg.exe en {ffmpeg_exe}")
-                download_btn.config(state='active')
-                return
-                
-        except rarfile.BadRarFile:
-            error_msg = "El archivo bin.rar está corrupto o no se puede leer"
-            logger.error(error_msg)
-            messagebox.showerror("Error", error_msg)
-            download_btn.config(state='active')
-            return
-        except FileNotFoundError as e:
-            error_msg = f"No se encontró un archivo necesario: {e}"
-            logger.error(error_msg)
-            messagebox.showerror("Error", error_msg)
-            download_btn.config(state='active')
-            return
-        except Exception as e:
-            error_msg = f"Error al configurar ffmpeg: {e}"
-            logger.error(error_msg)
-            messagebox.showerror("Error", error_msg)
-            download_btn.config(state='active')
-            return
-
-         # --- Detectar navegador principal (puedes cambiar "chrome" por "edge" o "firefox") ---
-        navegador = "cookies.txt"
-
-        # Opciones base
-        opciones = {
-            "outtmpl": os.path.join(carpeta, "%(title)s.%(ext)s"),
-            "cookiefile": navegador,  # 👈 Usa cookies del navegador
-            "ffmpeg_location": ffmpeg_path,
-            "http_headers": {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/120.0.0.0 Safari/537.36"
-        )
-    },
-            "progress_hooks": [progreso_hook]
-        }
-
-        # Ajustar según formato
-        if formato == "mp4":
-            opciones.update({
-                "format": "bestvideo+bestaudio/best",
-                "merge_output_format": "mp4"
-            })
-        else:  # mp3
-            opciones.update({
-                "format": "bestaudio/best",
-                "postprocessors": [{
-                    "key": "FFmpegExtractAudio",
-                    "preferredcodec": "mp3",
-                    "preferredquality": "192",
-                }]
-            })
+def encolar_urls(urls, formato):
+    """Analiza las URLs en segundo plano para no bloquear la ventana"""
+    logger.info(f"Importando {len(urls)} URLs en formato {formato}")
+    status_label.config(text=f"🔎 Analizando {len(urls)} URLs...")
+    threading.Thread(target=descargador.importar_urls, args=(urls, formato, cola_descargas),
+                     daemon=True).start()
 
-        try:
-            with yt_dlp.YoutubeDL(opciones) as ydl:
-                info = ydl.extract_info(url, download=True) 
-                archivo_descargado = ydl.prepare_filename(info) 
-                
-                if formato == "mp3":
-                    archivo_descargado = os.path.splitext(archivo_descargado)[0] + ".mp3"
-                
-                # Crear objeto ArchivoDescargado
-                nombre_archivo = os.path.splitext(os.path.basename(archivo_descargado))[0]
-                archivo_obj = ArchivoDescargado(
-                    nombre=nombre_archivo,
-                    formato=formato,
-                    ubicacion=carpeta
-                )
-                
-                messagebox.showinfo("Éxito", f"Descarga completa en {opciones['outtmpl']}")
-                progress['value'] = 0
-                agregar_archivo_descargado(archivo_obj)
-                download_btn.config(state='active')
-                url_entry.delete(0, tk.END)
-                
-        except yt_dlp.DownloadError as e:
-            error_msg = f"Error al descargar el video: {e}"
-            logger.error(f"DownloadError: {error_msg}")
-            messagebox.showerror("Error de descarga", error_msg)
-            download_btn.config(state='active')
-            progress['value'] = 0
-            label_progreso.config(text="❌ Error en la descarga")
-            
-        except yt_dlp.ExtractorError as e:
-            error_msg = f"Error al extraer información del video: {e}"
-            logger.error(f"ExtractorError: {error_msg}")
-            messagebox.showerror("Error de extracción", error_msg)
-            download_btn.config(state='active')
-            progress['value'] = 0
-            label_progreso.config(text="❌ Error al extraer información")
-            
-        except yt_dlp.PostProcessingError as e:
-            error_msg = f"Error al procesar el archivo: {e}"
-            logger.error(f"PostProcessingError: {error_msg}")
-            messagebox.showerror("Error de procesamiento", error_msg)
-            download_btn.config(state='active')
-            progress['value'] = 0
-            label_progreso.config(text="❌ Error al procesar archivo")
-            
-        except Exception as e:
-            error_msg = f"Error inesperado durante la descarga: {e}"
-            logger.error(f"Unexpected error: {error_msg}")
-            messagebox.showerror("Error inesperado", error_msg)
-            download_btn.config(state='active')
-            progress['value'] = 0
-            label_progreso.config(text="❌ Error inesperado")
-            
-    except Exception as e:
-        error_msg = f"Error crítico en la aplicación: {e}"
-        logger.critical(error_msg)
-        messagebox.showerror("Error crítico", error_msg)
-        download_btn.config(state='active')
-        progress['value'] = 0
-        label_progreso.config(text="❌ Error crítico")
-    
-def limpiar_url_youtube(url):
-    # Parsear la URL
-    parsed_url = urlparse(url)
-
-    # Extraer los parámetros de la query
-    query_params = parse_qs(parsed_url.query)
-
-    # Mantener solo el parámetro 'v' (que indica el video)
-    params_filtrados = {}
-    if 'v' in query_params:
-        params_filtrados['v'] = query_params['v']
-
-    # Reconstruir la query limpia
-    query_limpia = urlencode(params_filtrados, doseq=True)
-
-    # Reconstruir la URL final sin los parámetros no deseados
-    url_limpia = urlunparse((
-        parsed_url.scheme,
-        parsed_url.netloc,
-        parsed_url.path,
-        parsed_url.params,
-        query_limpia,
-        parsed_url.fragment
-    ))
-
-    return url_limpia
 def iniciar_descarga():
     logger.info("Función iniciar_descarga() llamada")
     try:
-        url = limpiar_url_youtube(url_entry.get())
-        print(url)
+        texto = url_entry.get()
         formato = formato_var.get()
         
-        if not url:
+        if not texto.strip():
             logger.warning("URL vacía ingresada por el usuario")
             messagebox.showerror("Error", "Debes ingresar una URL")
             return
 
-        # Validar formato de URL básico
-        if not url.startswith(('http://', 'https://')):
-            logger.warning(f"URL con formato inválido: {url}")
+        # Se pueden pegar varias URLs separadas por espacios, comas o saltos de línea
+        urls = extraer_urls(texto)
+        if not urls:
+            logger.warning(f"URL con formato inválido: {texto}")
             messagebox.showerror("Error", "La URL debe comenzar con http:// o https://")
             return
-            
-        # Verificar que la URL no esté vacía después de limpiar
-        if not url.strip():
-            logger.warning("URL vacía después de limpiar")
-            messagebox.showerror("Error", "La URL ingresada no es válida")
-            return
 
-        # if url in urls_descargadas:
-        #     messagebox.showerror("Error", "Ya descargaste esa canción!")
-        #     url_entry.delete(0, tk.END)
-        #     return
-        
-        # Verificar que el botón no esté ya deshabilitado (evitar múltiples descargas)
-        if download_btn['state'] == 'disabled':
-            logger.warning("Intento de iniciar descarga mientras ya hay una en progreso")
-            messagebox.showwarning("Advertencia", "Ya hay una descarga en progreso")
-            return
-            
-        logger.info(f"Iniciando hilo de descarga para URL: {url}")
-        download_btn.config(state='disabled')
-        label_progreso.config(text="🔄 Iniciando descarga...")
-        progress['value'] = 0
-        
-        hilo = threading.Thread(target=descargar, args=(url, formato), daemon=True)
-        hilo.start()
+        encolar_urls(urls, formato)
+        url_entry.delete(0, tk.END)
         
     except Exception as e:
         error_msg = f"Error al iniciar la descarga: {e}"
         logger.error(error_msg)
         messagebox.showerror("Error", error_msg)
-        download_btn.config(state='active')
         label_progreso.config(text="❌ Error al iniciar descarga")
+
+def importar_archivo():
+    """Abre un archivo .txt o .csv con URLs y las agrega a la cola"""
+    ruta = filedialog.askopenfilename(title="Selecciona una lista de URLs",
+                                      filetypes=[("Listas de URLs", "*.txt *.csv"), ("Todos", "*.*")])
+    if not ruta:
+        return
+    try:
+        urls = leer_lista_urls(ruta)
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        logger.error(f"No se pudo leer la lista {ruta}: {e}")
+        messagebox.showerror("Error", f"No se pudo leer el archivo:\n{e}")
+        return
+    if not urls:
+        messagebox.showwarning("Advertencia", "El archivo no contiene URLs")
+        return
+    encolar_urls(urls, formato_var.get())
+
+# Los hilos de descarga nunca tocan la ventana: mandan eventos que el loop de Tk aplica
+eventos_ui = queue.Queue()
+_trabajos_pendientes = set()  # ids con un evento de actualización todavía sin aplicar
+_lock_pendientes = threading.Lock()
+
+def en_ui(funcion, *args):
+    """Ejecuta una función en el hilo de Tk (se puede llamar desde cualquier hilo)"""
+    eventos_ui.put(("llamada", funcion, args))
+
+def notificar_trabajo(trabajo):
+    """Pide redibujar la fila de un trabajo; varias llamadas seguidas se juntan en una sola"""
+    if servidor_api:
+        servidor_api.notificar(trabajo)  # también a los clientes de la API
+    with _lock_pendientes:
+        if trabajo.id in _trabajos_pendientes:
+            return
+        _trabajos_pendientes.add(trabajo.id)
+    eventos_ui.put(("trabajo", trabajo, None))
+
+def drenar_eventos():
+    """Aplica en la ventana los eventos acumulados, como máximo cada INTERVALO_UI_MS"""
+    trabajos = {}
+    try:
+        while True:
+            try:
+                tipo, dato, args = eventos_ui.get_nowait()
+            except queue.Empty:
+                break
+            if tipo == "trabajo":
+                trabajos[dato.id] = dato
+            else:
+                try:
+                    dato(*args)
+                except Exception as e:
+                    logger.error(f"Error al actualizar la ventana: {e}")
+
+        if trabajos:
+            with _lock_pendientes:
+                _trabajos_pendientes.difference_update(trabajos)
+            for trabajo in trabajos.values():
+                actualizar_trabajo(trabajo)
+            actualizar_resumen()
+    finally:
+        root.after(INTERVALO_UI_MS, drenar_eventos)
+
+def actualizar_trabajo(trabajo):
+    """Refleja el estado de un trabajo en su fila de la tabla de descargas"""
+    valores = (trabajo.titulo or trabajo.url, trabajo.formato, trabajo.estado, f"{trabajo.progreso:.1f}%", trabajo.detalle)
+    if tabla_trabajos.exists(trabajo.id):
+        tabla_trabajos.item(trabajo.id, values=valores)
+    else:
+        tabla_trabajos.insert("", tk.END, iid=trabajo.id, values=valores)
+    if trabajo.estado == ESTADO_DESCARGANDO and trabajo.detalle:
+        label_progreso.config(text=trabajo.detalle)
+
+def mostrar_velocidad():
+    """Velocidad de todas las descargas juntas (y el límite total, si hay uno)"""
+    velocidad = descargador.ancho_banda.velocidad()
+    texto = f"⬇ {formatear_tamano(velocidad) or '0 B'}/s"
+    if descargador.ancho_banda.cubo.tasa:
+        texto += f" (límite {formatear_tamano(descargador.ancho_banda.cubo.tasa)}/s)"
+    label_velocidad.config(text=texto)
+    root.after(INTERVALO_VELOCIDAD_MS, mostrar_velocidad)
+
+def abrir_estadisticas():
+    """Ventana con los tiempos por fase y los totales de los trabajos terminados"""
+    global ventana_estadisticas
+    if ventana_estadisticas is not None and ventana_estadisticas.winfo_exists():
+        ventana_estadisticas.lift()
+        return
+    ventana_estadisticas = tk.Toplevel(root)
+    ventana_estadisticas.title("Estadísticas de descargas")
+    totales = tk.Label(ventana_estadisticas, text="", justify="left", font=("Arial", config["font_size"]))
+    totales.pack(padx=10, pady=10, anchor="w")
+    tabla = ttk.Treeview(ventana_estadisticas, columns=("fase", "promedio", "p95", "maximo", "total", "cantidad"),
+                         show="headings", height=len(FASES))
+    for columna, titulo, ancho in (("fase", "Fase", 150), ("promedio", "Promedio", 90), ("p95", "p95", 90),
+                                   ("maximo", "Máximo", 90), ("total", "Total", 90), ("cantidad", "Trabajos", 70)):
+        tabla.heading(columna, text=titulo)
+        tabla.column(columna, width=ancho, anchor="w" if columna == "fase" else "e")
+    tabla.pack(padx=10, pady=(0, 10), fill="both", expand=True)
+    actualizar_estadisticas(ventana_estadisticas, totales, tabla)
+
+def actualizar_estadisticas(ventana, totales, tabla):
+    if not ventana.winfo_exists():
+        return  # se cerró el panel
+    resumen = descargador.metricas.resumen()
+    trabajos = resumen["trabajos"]
+    totales.config(text=(f"Completados: {trabajos.get(ESTADO_COMPLETADO, 0)} | "
+                         f"Fallidos: {trabajos.get(ESTADO_FALLIDO, 0)} | "
+                         f"Reintentos: {resumen['reintentos']}\n"
+                         f"Descargado: {formatear_tamano(resumen['bytes']) or '0 B'} | "
+                         f"Velocidad media: {formatear_tamano(resumen['velocidad_media']) or '0 B'}/s | "
+                         f"Pico: {formatear_tamano(resumen['velocidad_pico']) or '0 B'}/s"))
+    tabla.delete(*tabla.get_children())
+    for fase, datos in resumen["fases"].items():
+        tabla.insert("", tk.END, values=(fase, f"{datos['promedio']:.2f} s", f"{datos['p95']:.2f} s",
+                                         f"{datos['maximo']:.2f} s", f"{datos['total']:.1f} s", datos["cantidad"]))
+    ventana.after(INTERVALO_ESTADISTICAS_MS, actualizar_estadisticas, ventana, totales, tabla)
+
+def mostrar_error_descarga(titulo, mensaje):
+    """Muestra el último error en la barra de estado; el detalle queda en la fila del trabajo"""
+    # Sin ventanas modales: un lote desatendido sigue aunque fallen varios videos
+    label_progreso.config(text=f"❌ {titulo}: {mensaje[:200]}")
+
+def actualizar_resumen():
+    """Muestra el progreso total y la cantidad de trabajos por estado"""
+    trabajos = list(cola_descargas.trabajos.values())
+    if trabajos:
+        terminados = (ESTADO_COMPLETADO, ESTADO_FALLIDO, ESTADO_OMITIDO)
+        progress['value'] = sum(100 if t.estado in terminados else t.progreso
+                                for t in trabajos) / len(trabajos)
+    status_label.config(text=(f"En cola: {cola_descargas.contar(ESTADO_EN_COLA)} | "
+                              f"Descargando: {cola_descargas.contar(ESTADO_DESCARGANDO)} | "
+                              f"Convirtiendo: {cola_descargas.contar(ESTADO_CONVIRTIENDO)} | "
+                              f"Completadas: {cola_descargas.contar(ESTADO_COMPLETADO)} | "
+                              f"Fallidas: {cola_descargas.contar(ESTADO_FALLIDO)} | "
+                              f"Ya descargadas: {cola_descargas.contar(ESTADO_OMITIDO)}"))
+
 def agregar_archivo(archivo_obj):
-    """Agrega archivo descargado al Listbox usando objeto ArchivoDescargado"""
-    # Verificar si ya existe un archivo con el mismo nombre y formato
-    existe = any(a.nombre == archivo_obj.nombre and a.formato == archivo_obj.formato 
-                for a in archivos_descargados)
-    
-    if not existe:
-        archivos_descargados.append(archivo_obj)
-        lista.insert(tk.END, str(archivo_obj))  # muestra nombre y formato en la UI
+    """Agrega archivo descargado a la biblioteca usando objeto ArchivoDescargado"""
+    # La colección ignora los repetidos (mismo nombre y formato) y lo ubica según el orden actual
+    if archivos_descargados.agregar(archivo_obj):
+        lista.refrescar()
+        actualizar_cantidad()
 
 def agregar_archivo_descargado(archivo_obj):
-    """Agrega archivo descargado al Listbox usando objeto ArchivoDescargado"""
-    # Verificar si ya existe un archivo con el mismo nombre y formato
-    existe = any(a.nombre == archivo_obj.nombre and a.formato == archivo_obj.formato 
-                for a in archivos_descargados)
-    
-    if not existe:
-        archivos_descargados.insert(0,archivo_obj)
-        lista.insert(0, str(archivo_obj))  # muestra nombre y formato en la UI
+    """Agrega archivo descargado a la biblioteca usando objeto ArchivoDescargado"""
+    agregar_archivo(archivo_obj)
+
+def actualizar_cantidad():
+    """Cantidad de archivos y espacio que ocupa cada formato (sumas que la colección mantiene al día)"""
+    if archivos_descargados.texto:
+        texto = f"Cantidad de archivos: {len(archivos_descargados)} de {archivos_descargados.total}"
+    else:
+        texto = f"Cantidad de archivos: {archivos_descargados.total}"
+    por_formato = archivos_descargados.tamano_por_formato()
+    if por_formato:
+        texto += " | " + " · ".join(f"{formato}: {cantidad} ({formatear_tamano(tamano) or '0 B'})"
+                                    for formato, (cantidad, tamano) in sorted(por_formato.items()))
+    label_size.config(text=texto)
+
+def leer_biblioteca(carpeta):
+    """Archivos que el índice conoce en la carpeta (corre en segundo plano)"""
+    return [
+        ArchivoDescargado(
+            nombre=nombre,
+            formato=formato,
+            ubicacion=carpeta,
+            fecha_descarga=datetime.fromtimestamp(ctime),
+            tamano=tamano,
+            ctime=ctime
+        )
+        for nombre, formato, ctime, tamano in descargador.indice.listar(carpeta)]
+
+def mostrar_archivos(carpeta, archivos):
+    """Llena la lista con los archivos leídos del índice, ordenados por fecha de creación (más reciente primero)"""
+    if carpeta != config["carpeta_descargas"]:
+        return  # el usuario cambió de carpeta mientras se sincronizaba
+    archivos_descargados.reemplazar(archivos)
+    lista.refrescar()
+    actualizar_cantidad()
+
+def filtrar_archivos(*_):
+    """Filtra la biblioteca mientras se escribe, esperando una pausa entre teclas"""
+    global filtro_pendiente
+    if filtro_pendiente:
+        root.after_cancel(filtro_pendiente)
+    filtro_pendiente = root.after(ESPERA_FILTRO_MS, aplicar_filtro)
+
+def aplicar_filtro():
+    global filtro_pendiente
+    filtro_pendiente = None
+    archivos_descargados.filtrar(busqueda_var.get())
+    lista.inicio = 0
+    lista.refrescar()
+    actualizar_cantidad()
+
+def ordenar_archivos(columna):
+    """Ordena la biblioteca por la columna elegida; otro clic invierte el orden"""
+    archivos_descargados.ordenar(columna)
+    lista.refrescar()
+
+def formatear_tamano(tamano):
+    if not tamano:
+        return ""
+    for unidad in ("B", "KB", "MB"):
+        if tamano < 1024:
+            return f"{tamano:.0f} {unidad}" if unidad == "B" else f"{tamano:.1f} {unidad}"
+        tamano /= 1024
+    return f"{tamano:.1f} GB"
+
+def valores_archivo(archivo_obj):
+    return (archivo_obj.nombre, archivo_obj.formato, formatear_tamano(archivo_obj.tamano),
+            archivo_obj.fecha_descarga.strftime("%Y-%m-%d %H:%M"))
+
+def sincronizar_indice(carpeta):
+    """Actualiza el índice en segundo plano y refresca la lista al terminar"""
+    try:
+        descargador.indice.sincronizar(carpeta)
+        archivos = leer_biblioteca(carpeta)
+    except (OSError, sqlite3.Error) as e:
+        logger.error(f"Error al sincronizar el índice de {carpeta}: {e}")
+        return
+    en_ui(mostrar_archivos, carpeta, archivos)
+
+def cargar_biblioteca(carpeta):
+    """Corre en segundo plano: muestra lo que ya conoce el índice y después sincroniza la carpeta"""
+    try:
+        # Primero lo que ya conoce el índice, para que la lista aparezca enseguida
+        en_ui(mostrar_archivos, carpeta, leer_biblioteca(carpeta))
+    except (OSError, sqlite3.Error) as e:
+        logger.error(f"Error al leer el índice de {carpeta}: {e}")
+    # La sincronización completa es solo para lo que pasó con la app cerrada
+    sincronizar_indice(carpeta)
+
+def cambios_en_carpeta(carpeta, nombres):
+    """Corre en el hilo del vigilante: actualiza el índice con los archivos tocados y avisa a la ventana"""
+    if nombres is None:
+        sincronizar_indice(carpeta)  # se perdieron eventos: se vuelve a recorrer la carpeta
+        return
+    try:
+        presentes, borrados = descargador.indice.aplicar_cambios(carpeta, nombres)
+    except (OSError, sqlite3.Error) as e:
+        logger.error(f"Error al actualizar el índice de {carpeta}: {e}")
+        return
+    en_ui(aplicar_cambios_biblioteca, carpeta, presentes, borrados)
+
+def aplicar_cambios_biblioteca(carpeta, presentes, borrados):
+    """Aplica en la biblioteca los archivos agregados, modificados, borrados o renombrados"""
+    if carpeta != config["carpeta_descargas"]:
+        return
+    for nombre, formato in borrados:
+        archivos_descargados.quitar(nombre, formato)
+    for archivo_obj in presentes:
+        archivos_descargados.actualizar(archivo_obj)
+    lista.refrescar()
+    actualizar_cantidad()
+
+def vigilar_carpeta(carpeta):
+    """Empieza a vigilar la carpeta de descargas (y deja de vigilar la anterior)"""
+    global vigilante
+    if vigilante:
+        vigilante.detener()
+        vigilante = None
+    if carpeta:
+        vigilante = VigilanteCarpeta(carpeta, cambios_en_carpeta)
+        vigilante.iniciar()
 
 def cargar_archivos():
-    """Carga los archivos de la carpeta de descargas en la lista, ordenados por fecha de creación (más reciente primero)"""
-    archivos_descargados.clear()
-   # Limpiar también las URLs
-    lista.delete(0, tk.END)  # limpia lista anterior
+    """Muestra los archivos de la carpeta de descargas desde el índice y lo actualiza en segundo plano"""
+    carpeta = config["carpeta_descargas"]
     
-    if not os.path.exists(config["carpeta_descargas"] ):
-        messagebox.showerror("Error", f"No existe la carpeta: {config['carpeta_descargas']}")
+    if not os.path.exists(carpeta):
+        vigilar_carpeta(None)
+        archivos_descargados.reemplazar([])
+        lista.refrescar()
+        actualizar_cantidad()
+        messagebox.showerror("Error", f"No existe la carpeta: {carpeta}")
         return
     
-    # Lista para almacenar objetos ArchivoDescargado con su información de fecha
-    archivos_con_fecha = []
-    
-    for archivo in os.listdir(config["carpeta_descargas"] ):
-        ruta_completa = os.path.join(config["carpeta_descargas"] , archivo)
-        if os.path.isfile(ruta_completa) and archivo.lower().endswith((".mp3", ".mp4")):  # solo archivos, no carpetas
-            # Extraer nombre y formato del archivo
-            nombre_archivo = os.path.splitext(archivo)[0]
-            formato_archivo = os.path.splitext(archivo)[1][1:].lower()  # quita el punto
-            
-            # Crear objeto ArchivoDescargado
-            archivo_obj = ArchivoDescargado(
-                nombre=nombre_archivo,
-                formato=formato_archivo,
-                ubicacion=config["carpeta_descargas"]
-            )
-            
-            # Obtener la fecha de creación del archivo
-            fecha_creacion = os.path.getctime(ruta_completa)
-            archivos_con_fecha.append((archivo_obj, fecha_creacion))
-    
-    # Ordenar por fecha de creación (más reciente primero)
-    archivos_con_fecha.sort(key=lambda x: x[1], reverse=True)
-    label_size.config(text= f"Cantidad de archivos: {len(archivos_con_fecha)}")
-    
-    # Agregar archivos ordenados a la lista
-    for archivo_obj, _ in archivos_con_fecha:
-        agregar_archivo(archivo_obj)
-
-def abrir_archivo(event):
-    """Abre la ubicación del archivo con doble clic y lo selecciona en el explorador."""
-    seleccion = lista.curselection()
-    if not seleccion:
+    # Desde ahora los cambios llegan solos; el índice se lee sin frenar la ventana
+    vigilar_carpeta(carpeta)
+    threading.Thread(target=cargar_biblioteca, args=(carpeta,), daemon=True).start()
+
+def iniciar_api():
+    """Si está habilitada, atiende la API HTTP con la misma cola y los mismos workers que la ventana"""
+    global servidor_api
+    if not (config.get("api") or {}).get("habilitada"):
         return
-    
-    index = seleccion[0]
-    archivo_obj = archivos_descargados[index]
-
+    from convertidor.api import ServidorAPI  # solo si se usa: asyncio suma al arranque
+    servidor_api = ServidorAPI.desde_config(descargador, cola_descargas, config)
+    servidor_api.iniciar()
+
+def registrar_arranque():
+    """Anota cuánto tardó la ventana en estar dibujada y lista para usar"""
+    root.update_idletasks()
+    transcurrido = (time.perf_counter() - INICIO_ARRANQUE) * 1000
+    if transcurrido > PRESUPUESTO_ARRANQUE_MS:
+        logger.warning(f"La ventana tardó {transcurrido:.0f} ms en responder "
+                       f"(presupuesto: {PRESUPUESTO_ARRANQUE_MS} ms)")
+    else:
+        logger.info(f"Ventana lista en {transcurrido:.0f} ms")
+
+def mostrar_en_explorador(ruta_completa):
+    """Abre el explorador con el archivo seleccionado."""
     try:
-        ruta_completa = os.path.normpath(archivo_obj.ruta_completa()) 
+        ruta_completa = os.path.normpath(ruta_completa) 
 
         # Verificar existencia
-        if not archivo_obj.existe_archivo():
+        if not os.path.exists(ruta_completa):
             messagebox.showerror("Error", f"El archivo no existe:\n{ruta_completa}")
             return
 
@@ -425,52 +406,21 @@ def abrir_archivo(event):
     except Exception as e:
         messagebox.showerror("Error", f"No se pudo abrir el archivo:\n{e}")
 
-def progreso_hook(d):
-    try:
-        if d['status'] == 'downloading':
-            porcentaje = d.get('_percent_str', '0.0%')
-            velocidad = d.get('_speed_str', '0.0KiB/s')
-            eta = d.get('_eta_str', 'N/A')
+def abrir_archivo(event):
+    """Abre la ubicación del archivo con doble clic y lo selecciona en el explorador."""
+    archivo_obj = lista.seleccion
+    if archivo_obj is None:
+        return
+    mostrar_en_explorador(archivo_obj.ruta_completa())
 
-            # Actualizar progressbar
-            try:
-                percent_float = float(d['_percent_str'].replace('%', '').strip())
-                progress['value'] = percent_float
-                root.update_idletasks()
-            except (ValueError, KeyError, AttributeError) as e:
-                # Si hay error al convertir el porcentaje, usar 0
-                progress['value'] = 0
-                print(f"Error al procesar porcentaje: {e}")
-
-            # También podrías mostrar en consola o en la UI
-            texto = f"{porcentaje} | {velocidad} | ETA: {eta}"
-            label_progreso.config(text=texto)
-
-        elif d['status'] == 'finished':
-            progress['value'] = 100
-            root.update_idletasks()
-            label_progreso.config(text="✅ Descarga completa")
-            
-        elif d['status'] == 'error':
-            # Manejar errores específicos del hook
-            error_msg = d.get('error', 'Error desconocido en la descarga')
-            label_progreso.config(text=f"❌ Error: {error_msg}")
-            progress['value'] = 0
-            download_btn.config(state='active')
-            
-    except KeyError as e:
-        # Si falta alguna clave en el diccionario d
-        error_msg = f"Error en progreso_hook - clave faltante: {e}"
-        logger.warning(error_msg)
-        print(error_msg)
-        label_progreso.config(text="⚠️ Error en el progreso de descarga")
-        
-    except Exception as e:
-        # Cualquier otro error en el hook
-        error_msg = f"Error inesperado en progreso_hook: {e}"
-        logger.error(error_msg)
-        print(error_msg)
-        label_progreso.config(text="⚠️ Error inesperado en el progreso")
+def abrir_trabajo(event):
+    """Con doble clic en un trabajo terminado (o ya descargado) muestra su archivo."""
+    seleccion = tabla_trabajos.selection()
+    if not seleccion:
+        return
+    trabajo = cola_descargas.trabajos.get(seleccion[0])
+    if trabajo and trabajo.ruta:
+        mostrar_en_explorador(trabajo.ruta)
 
 def mostrar_menu(event):
     menu = tk.Menu(root, tearoff=0)
@@ -494,10 +444,119 @@ def pegar(widget):
         pass  # portapapeles vacío       
 
 
+class ListaVirtual:
+    """Treeview que solo tiene las filas que se ven: al desplazarse se reutilizan con otros datos.
+
+    datos es cualquier secuencia (len e índice); con decenas de miles de archivos,
+    desplazarse, filtrar u ordenar cuesta lo mismo que con diez.
+    """
+
+    def __init__(self, padre, columnas, filas_visibles, datos, formatear, al_ordenar=None):
+        self.datos = datos
+        self.formatear = formatear
+        self.filas_visibles = filas_visibles
+        self.inicio = 0  # índice en datos de la primera fila visible
+        self.seleccion = None  # objeto seleccionado (sigue seleccionado aunque salga de la vista)
+        self.tabla = ttk.Treeview(padre, columns=[c for c, _, _ in columnas], show="headings",
+                                  height=filas_visibles, selectmode="browse")
+        for columna, titulo, ancho in columnas:
+            self.tabla.heading(columna, text=titulo,
+                               command=(lambda c=columna: al_ordenar(c)) if al_ordenar else "")
+            self.tabla.column(columna, width=ancho)
+        # La barra de desplazamiento recorre los datos, no las filas del Treeview
+        self.scroll = ttk.Scrollbar(padre, orient="vertical", command=self._barra)
+        self.tabla.bind("<<TreeviewSelect>>", self._seleccionar)
+        self.tabla.bind("<MouseWheel>", lambda e: self.desplazar(-3 if e.delta > 0 else 3))
+        self.tabla.bind("<Button-4>", lambda e: self.desplazar(-3))
+        self.tabla.bind("<Button-5>", lambda e: self.desplazar(3))
+        self.tabla.bind("<Up>", lambda e: self._mover_seleccion(-1))
+        self.tabla.bind("<Down>", lambda e: self._mover_seleccion(1))
+        self.tabla.bind("<Prior>", lambda e: self._mover_seleccion(-filas_visibles))
+        self.tabla.bind("<Next>", lambda e: self._mover_seleccion(filas_visibles))
+
+    def bind(self, evento, funcion):
+        self.tabla.bind(evento, funcion)
+
+    def refrescar(self):
+        """Vuelve a dibujar las filas visibles a partir de inicio"""
+        total = len(self.datos)
+        self.inicio = max(0, min(self.inicio, total - self.filas_visibles))
+        seleccionada = None
+        for fila in range(self.filas_visibles):
+            iid = f"fila{fila}"
+            indice = self.inicio + fila
+            if indice < total:
+                dato = self.datos[indice]
+                if dato is self.seleccion:
+                    seleccionada = iid
+                if self.tabla.exists(iid):
+                    self.tabla.item(iid, values=self.formatear(dato))
+                else:
+                    self.tabla.insert("", tk.END, iid=iid, values=self.formatear(dato))
+            elif self.tabla.exists(iid):
+                self.tabla.delete(iid)
+        if seleccionada:
+            self.tabla.selection_set(seleccionada)
+        elif self.tabla.selection():
+            self.tabla.selection_remove(*self.tabla.selection())
+        if total:
+            self.scroll.set(self.inicio / total, min(1.0, (self.inicio + self.filas_visibles) / total))
+        else:
+            self.scroll.set(0.0, 1.0)
+
+    def desplazar(self, filas):
+        self.inicio += filas
+        self.refrescar()
+        return "break"  # el Treeview no tiene nada propio que desplazar
+
+    def _barra(self, accion, cantidad, unidad=None):
+        if accion == "moveto":
+            self.inicio = int(float(cantidad) * len(self.datos))
+            self.refrescar()
+        else:
+            self.desplazar(int(cantidad) * (self.filas_visibles if unidad == "pages" else 1))
+
+    def _seleccionar(self, event):
+        seleccion = self.tabla.selection()
+        if seleccion:
+            indice = self.inicio + int(seleccion[0][len("fila"):])
+            if indice < len(self.datos):
+                self.seleccion = self.datos[indice]
+
+    def _mover_seleccion(self, filas):
+        total = len(self.datos)
+        if not total:
+            return "break"
+        actual = self.tabla.selection()
+        indice = self.inicio + int(actual[0][len("fila"):]) if actual else self.inicio - filas
+        indice = max(0, min(total - 1, indice + filas))
+        self.seleccion = self.datos[indice]
+        # Mover la ventana lo justo para que la nueva fila se vea
+        if indice < self.inicio:
+            self.inicio = indice
+        elif indice >= self.inicio + self.filas_visibles:
+            self.inicio = indice - self.filas_visibles + 1
+        self.refrescar()
+        return "break"
+
+
+# Pipeline de descarga (sin Tk): sus avisos llegan a la ventana por la cola de eventos
+descargador = Descargador(
+    config,
+    al_progreso=lambda trabajo: notificar_trabajo(trabajo),
+    al_error=lambda titulo, mensaje: en_ui(mostrar_error_descarga, titulo, mensaje),
+    al_completar=lambda trabajo, archivo_obj: en_ui(agregar_archivo_descargado, archivo_obj),
+)
+descargador.iniciar()
+
 # --- UI ---
 root = tk.Tk()
 root.title("YouTube Downloader 🎧")
-root.state('zoomed')
+# 'zoomed' solo existe en Windows y macOS; en X11 se maximiza con el atributo -zoomed
+if sys.platform in ("win32", "darwin"):
+    root.state('zoomed')
+else:
+    root.attributes('-zoomed', True)
 root.resizable(True, True)
 label_progreso = tk.Label(root, text="Esperando descarga...", font=("Arial", SIZE_TEXT))
 label_progreso.pack(pady=5, fill="both", expand= True)
@@ -525,11 +584,37 @@ frame_format.pack(pady=10)
 tk.Label(frame_format, text="Formato:", font=("Arial", config["font_size"])).pack(side=tk.LEFT, padx=5)
 ttk.Radiobutton(frame_format, text="MP3", variable=formato_var, value="mp3").pack(side=tk.LEFT, padx=5)
 ttk.Radiobutton(frame_format, text="MP4", variable=formato_var, value="mp4").pack(side=tk.LEFT, padx=5)
+ttk.Radiobutton(frame_format, text="Audio original (m4a/opus, sin convertir)", variable=formato_var,
+                value="audio").pack(side=tk.LEFT, padx=5)
 
 # Botón descargar
 download_btn = tk.Button(root, text="⬇ Descargar", font=("Arial", config["font_size"]), bg="#1DB954", fg="white", command=iniciar_descarga)
 download_btn.pack(pady=20)
 
+# Botón para importar listas de URLs
+btn_importar = tk.Button(root, text="📄 Importar lista (.txt / .csv)", command=importar_archivo)
+btn_importar.pack(pady=5)
+
+# Panel con los tiempos por fase de los trabajos terminados
+ventana_estadisticas = None
+btn_estadisticas = tk.Button(root, text="📊 Estadísticas", command=abrir_estadisticas)
+btn_estadisticas.pack(pady=5)
+
+# Tabla con una fila de progreso por trabajo de la cola
+frame_trabajos = tk.Frame(root)
+frame_trabajos.pack(pady=5, fill="both", expand=True)
+tabla_trabajos = ttk.Treeview(frame_trabajos, columns=("url", "formato", "estado", "progreso", "detalle"),
+                              show="headings", height=6)
+for columna, titulo, ancho in (("url", "Título / URL", 300), ("formato", "Formato", 60), ("estado", "Estado", 100),
+                               ("progreso", "Progreso", 80), ("detalle", "Detalle", 300)):
+    tabla_trabajos.heading(columna, text=titulo)
+    tabla_trabajos.column(columna, width=ancho)
+scroll_trabajos = ttk.Scrollbar(frame_trabajos, orient="vertical", command=tabla_trabajos.yview)
+tabla_trabajos.configure(yscrollcommand=scroll_trabajos.set)
+tabla_trabajos.pack(side=tk.LEFT, fill="both", expand=True)
+scroll_trabajos.pack(side=tk.RIGHT, fill="y")
+tabla_trabajos.bind("<Double-1>", abrir_trabajo)
+
 # Botón para cambiar carpeta
 btn_carpeta = tk.Button(root, text="Cambiar carpeta de descargas", command=seleccionar_carpeta)
 btn_carpeta.pack(pady=10)
@@ -541,18 +626,51 @@ lbl_carpeta.pack(pady=5)
 # Estado
 status_label = tk.Label(root, text="Listo para descargar.", fg="gray")
 status_label.pack(pady=5)
+label_velocidad = tk.Label(root, text="", fg="gray")
+label_velocidad.pack()
 
 
 label_size = tk.Label(root, text= "Cantidad de archivos: ", font=("Arial", config["font_size"]))
 label_size.pack(pady=5)
 
-# Listbox para mostrar descargas
-lista = tk.Listbox(root, width=400, height=12, font=("Arial", config["font_size"]))
-lista.pack(pady=20)
+# Buscador: filtra la biblioteca a medida que se escribe
+frame_busqueda = tk.Frame(root)
+frame_busqueda.pack(pady=5)
+tk.Label(frame_busqueda, text="Buscar:", font=("Arial", config["font_size"])).pack(side=tk.LEFT, padx=5)
+busqueda_var = tk.StringVar()
+filtro_pendiente = None
+vigilante = None  # VigilanteCarpeta de la carpeta de descargas actual
+busqueda_var.trace_add("write", filtrar_archivos)
+tk.Entry(frame_busqueda, textvariable=busqueda_var, width=40,
+         font=("Arial", config["font_size"])).pack(side=tk.LEFT, padx=5)
+
+# Lista virtual de descargas: solo existen las filas visibles
+frame_archivos = tk.Frame(root)
+frame_archivos.pack(pady=20, fill="both", expand=True)
+lista = ListaVirtual(frame_archivos,
+                     (("nombre", "Nombre", 400), ("formato", "Formato", 70),
+                      ("tamano", "Tamaño", 90), ("fecha", "Fecha", 130)),
+                     12, archivos_descargados, valores_archivo, al_ordenar=ordenar_archivos)
+lista.tabla.pack(side=tk.LEFT, fill="both", expand=True)
+lista.scroll.pack(side=tk.RIGHT, fill="y")
 
 # Vincular doble clic
 lista.bind("<Double-1>", abrir_archivo)
-cargar_archivos()
+
+# Cola de descargas con varios workers en paralelo
+servidor_api = None  # ServidorAPI, si config["api"]["habilitada"]
+migrar_cola_json(COLA_FILE_ANTERIOR, COLA_FILE)
+cola_descargas = ColaDescargas(descargador.descargar, config["max_concurrent_downloads"], COLA_FILE,
+                               al_cambiar=notificar_trabajo, metricas=descargador.metricas)
+# La cola se crea después del descargador: los .part se anotan en su diario
+descargador.al_parcial = cola_descargas.registrar_parcial
+cola_descargas.iniciar()
+drenar_eventos()
+mostrar_velocidad()
+# La biblioteca se carga cuando la ventana ya está en pantalla
+root.after_idle(cargar_archivos)
+root.after_idle(iniciar_api)
+root.after_idle(registrar_arranque)
 
 
 root.mainloop()
\ No newline at end of file